@@ -0,0 +1,108 @@
+"""Embedding throughput in-process versus on a pool of worker processes
+
+    python -m benchmarks.embedding_pool --texts 2000 --processes 1 2 4
+    python -m benchmarks.embedding_pool --model BAAI/bge-small-en-v1.5
+
+Embeds the same texts through EmbeddingManager, first with the model in
+this process and then on a ProcessEmbeddingPool of each `--processes` size,
+and reports texts/sec and the speedup over in-process. The default model is
+benchmarks.suite.StubModel with `--layers` dense layers, so no download is
+needed; `--model` benchmarks a real SentenceTransformer instead. Worker
+start-up (model load) is reported separately and not counted in throughput.
+Speedups need free cores: pass `--cores-per-process` so that processes x
+cores fits the machine.
+"""
+
+import argparse
+import functools
+import json
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.suite import StubModel
+from src.domain.embedding_pool import ProcessEmbeddingPool, load_sentence_transformer
+from src.domain.embeddings import EmbeddingManager
+
+_WORDS = (
+    "def return self index chunk embed vector query token batch file path cache "
+    "model search score rank merge split line class import value result error"
+).split()
+
+
+def make_texts(count: int, words: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(_WORDS) + str(rng.randrange(100)) for _ in range(words))
+        for _ in range(count)
+    ]
+
+
+def _throughput(manager: EmbeddingManager, texts: List[str], batch_size: int) -> float:
+    # Warm up on other texts, so the measured ones all miss the cache
+    manager.encode(make_texts(batch_size, 8, seed=1), batch_size=batch_size)
+    started = time.perf_counter()
+    manager.encode(texts, batch_size=batch_size)
+    return len(texts) / (time.perf_counter() - started)
+
+
+def run(
+    texts: List[str],
+    factory,
+    processes: List[int],
+    batch_size: int,
+    cores_per_process: Optional[int] = None,
+) -> Dict:
+    baseline = _throughput(
+        EmbeddingManager("bench", model=factory(), store_dir=None), texts, batch_size
+    )
+    report = {"in_process": {"texts_per_sec": baseline}, "pool": []}
+    for n in processes:
+        pool = ProcessEmbeddingPool(factory, processes=n, cores_per_process=cores_per_process)
+        with pool:
+            started = time.perf_counter()
+            pool.encode(texts[:1])
+            start_seconds = time.perf_counter() - started
+            rate = _throughput(
+                EmbeddingManager("bench", model=pool, store_dir=None), texts, batch_size
+            )
+        report["pool"].append({
+            "processes": n,
+            "start_seconds": start_seconds,
+            "texts_per_sec": rate,
+            "speedup": rate / baseline,
+        })
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=64, help="words per text")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--cores-per-process", type=int, default=None)
+    parser.add_argument("--model", default=None, help="SentenceTransformer name (default: stub)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--layers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if args.model:
+        factory = functools.partial(load_sentence_transformer, args.model)
+    else:
+        factory = functools.partial(StubModel, dim=args.dim, layers=args.layers)
+    report = {
+        "model": args.model or f"stub(dim={args.dim}, layers={args.layers})",
+        "texts": args.texts,
+        "cores": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None,
+        **run(
+            make_texts(args.texts, args.words), factory, args.processes, args.batch_size,
+            args.cores_per_process,
+        ),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
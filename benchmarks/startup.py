@@ -0,0 +1,111 @@
+"""Worker cold start and memory with and without preload-and-fork
+
+    python -m benchmarks.startup --workers 4 --model-mb 512
+    python -m benchmarks.startup --mode per-worker preload
+
+Simulates a pre-fork server with a stub model holding `--model-mb` of
+weights. `per-worker` forks workers that each load the model, as gunicorn
+does without preload; `preload` loads once in the parent and forks workers
+that only warm up, as deploy/gunicorn.conf.py does. Reports each worker's
+time to ready and its RSS and PSS once all workers are up; summed PSS is
+the real memory cost. Also times `import src.app.main` in a fresh process.
+Linux only (fork, /proc).
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.suite import StubModel
+from src.app.core.models import ModelRegistry, process_memory
+from src.domain.embeddings import EmbeddingManager
+
+
+def _registry(model_mb: int, dim: int) -> ModelRegistry:
+    buckets = max(1, model_mb * 2**20 // (dim * 4))
+
+    def load(name: str):
+        return EmbeddingManager(name, model=StubModel(dim=dim, buckets=buckets), store_dir=None)
+
+    return ModelRegistry(loader=load, default="stub")
+
+
+def _worker(registry: ModelRegistry, started: float, barrier, results) -> None:
+    registry.warm_up()
+    ready = time.perf_counter() - started
+    barrier.wait()  # measure while every worker is alive, so sharing shows in PSS
+    results.put({"ready_seconds": ready, "inherited": registry.inherited, **process_memory()})
+    barrier.wait()
+
+
+def run_mode(mode: str, workers: int, model_mb: int, dim: int) -> Dict:
+    ctx = multiprocessing.get_context("fork")
+    registry = _registry(model_mb, dim)
+    parent_load = None
+    if mode == "preload":
+        started = time.perf_counter()
+        registry.preload()
+        gc.freeze()
+        parent_load = time.perf_counter() - started
+
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    started = time.perf_counter()
+    procs = [
+        ctx.Process(target=_worker, args=(registry, started, barrier, results))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    stats: List[Dict] = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    if mode == "preload":
+        gc.unfreeze()
+
+    return {
+        "parent_load_seconds": parent_load,
+        "workers": stats,
+        "max_ready_seconds": max(s["ready_seconds"] for s in stats),
+        "total_rss_mb": sum(s.get("rss_bytes", 0) for s in stats) / 2**20,
+        "total_pss_mb": sum(s.get("pss_bytes", 0) for s in stats) / 2**20,
+    }
+
+
+def time_app_import() -> float:
+    code = (
+        "import time; t = time.perf_counter(); import src.app.main; "
+        "print(time.perf_counter() - t)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--model-mb", type=int, default=512)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument(
+        "--mode", nargs="*", choices=["per-worker", "preload"], default=["per-worker", "preload"]
+    )
+    args = parser.parse_args(argv)
+
+    report = {
+        "workers": args.workers,
+        "model_mb": args.model_mb,
+        "app_import_seconds": time_app_import(),
+    }
+    for mode in args.mode:
+        report[mode] = run_mode(mode, args.workers, args.model_mb, args.dim)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
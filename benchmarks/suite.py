@@ -0,0 +1,303 @@
+"""Offline benchmark suite: chunking, embedding, search and end-to-end indexing
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+
+Everything runs on a synthetic repository (see benchmarks.synthetic_repo)
+with a deterministic stub embedding model, so no network or GPU is needed
+and runs with the same configuration are comparable. Timed phases are
+repeated and the best run is kept. Exits with status 1 when a metric is
+worse than the baseline by more than the threshold.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from benchmarks.synthetic_repo import generate_repo
+from benchmarks.vector_index import _percentiles
+from src.domain.chunker import CodeChunker
+from src.domain.embeddings import EmbeddingManager
+from src.domain.pipeline import PipelinedIndexingService
+from src.domain.tokens import TokenCounter, heuristic_count
+from src.domain.walker import RepoWalker
+from src.infra.bm25_index import BM25Index
+from src.infra.numpy_index import NumpyVectorIndex
+
+# Metrics compared against the baseline and which direction is better
+METRICS = {
+    "chunking.files_per_sec": "higher",
+    "chunking.mb_per_sec": "higher",
+    "embedding.texts_per_sec": "higher",
+    "embedding.cached_texts_per_sec": "higher",
+    "search.p50_ms": "lower",
+    "search.p95_ms": "lower",
+    "search.p99_ms": "lower",
+    "indexing.seconds": "lower",
+}
+
+
+class StubModel:
+    """Deterministic stand-in for a SentenceTransformer
+
+    Embeds a text as the sum of fixed random vectors of its hashed tokens,
+    so cost grows with text length like a real model's and similar texts
+    get similar vectors. Identical inputs always give identical outputs.
+    `layers` adds that many dense dim x dim layers over the token vectors,
+    to give it a transformer-like, compute-bound cost per token.
+    """
+
+    def __init__(self, dim: int = 256, buckets: int = 1 << 14, seed: int = 0, layers: int = 0):
+        self.dim = dim
+        self.buckets = buckets
+        rng = np.random.default_rng(seed)
+        self.table = rng.normal(size=(buckets, dim)).astype(np.float32)
+        self.weights = [
+            (rng.normal(size=(dim, dim)) / np.sqrt(dim)).astype(np.float32) for _ in range(layers)
+        ]
+
+    def _embed(self, text: str) -> np.ndarray:
+        tokens = text.split() or [""]
+        rows = [zlib.crc32(t.encode("utf-8")) % self.buckets for t in tokens]
+        hidden = self.table[rows]
+        for weight in self.weights:
+            hidden = np.tanh(hidden @ weight)
+        return hidden.sum(axis=0)
+
+    def encode(self, texts, batch_size: int = 32, show_progress_bar: bool = False,
+               normalize_embeddings: bool = True):
+        vectors = np.stack([self._embed(t) for t in texts])
+        if normalize_embeddings:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+
+def _chunker(max_tokens: int) -> CodeChunker:
+    # Heuristic token counts: no tokenizer download, same numbers everywhere
+    return CodeChunker(max_tokens=max_tokens, token_counter=TokenCounter(use_tokenizer=False))
+
+
+def _embedder(dim: int) -> EmbeddingManager:
+    return EmbeddingManager("stub", model=StubModel(dim), store_dir=None)
+
+
+def _best(runs: Sequence[float]) -> float:
+    return min(runs)
+
+
+def bench_chunking(files: List[Path], max_tokens: int, repeat: int) -> Dict:
+    size = sum(f.stat().st_size for f in files)
+    runs, chunks = [], 0
+    for _ in range(repeat):
+        chunker = _chunker(max_tokens)
+        started = time.perf_counter()
+        chunks = sum(len(chunker.chunk_file(f)) for f in files)
+        runs.append(time.perf_counter() - started)
+    seconds = _best(runs)
+    return {
+        "files": len(files),
+        "bytes": size,
+        "chunks": chunks,
+        "seconds": seconds,
+        "files_per_sec": len(files) / seconds,
+        "mb_per_sec": size / seconds / 1e6,
+    }
+
+
+def bench_embedding(texts: List[str], dim: int, repeat: int) -> Dict:
+    cold, warm = [], []
+    for _ in range(repeat):
+        embedder = _embedder(dim)
+        started = time.perf_counter()
+        embedder.encode(texts)
+        cold.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        embedder.encode(texts)
+        warm.append(time.perf_counter() - started)
+    return {
+        "texts": len(texts),
+        "tokens": sum(heuristic_count(t) for t in texts),
+        "seconds": _best(cold),
+        "texts_per_sec": len(texts) / _best(cold),
+        "cached_texts_per_sec": len(texts) / _best(warm),
+    }
+
+
+def bench_search(chunks, dim: int, queries: int, k: int, seed: int) -> Dict:
+    embedder = _embedder(dim)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NumpyVectorIndex(tmp)
+        index.upsert_batch(embedder.encode_batch(chunks))
+        # Queries are chunk fragments, as a user would paste
+        rng = np.random.default_rng(seed)
+        picks = rng.integers(0, len(chunks), size=queries)
+        texts = [" ".join(chunks.content(int(i)).split()[:12]) for i in picks]
+        vectors = embedder.encode(texts)
+        samples = []
+        for vec in vectors:
+            started = time.perf_counter()
+            index.search(vec, k=k)
+            samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "rows": len(chunks),
+        "queries": queries,
+        "k": k,
+        **{f"{name}_ms": value for name, value in _percentiles(samples).items()},
+    }
+
+
+def bench_indexing(repo: Path, dim: int, max_tokens: int, repeat: int) -> Dict:
+    runs, stats, pipeline = [], None, None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            service = PipelinedIndexingService(
+                _chunker(max_tokens),
+                _embedder(dim),
+                NumpyVectorIndex(Path(tmp) / "vectors"),
+                manifest_path=Path(tmp) / "manifest.json",
+                lexical=BM25Index(),
+            )
+            started = time.perf_counter()
+            stats = service.index_files(RepoWalker().walk(repo))
+            runs.append(time.perf_counter() - started)
+            pipeline = service.pipeline_stats
+    seconds = _best(runs)
+    return {
+        "files": stats.files_scanned,
+        "chunks": stats.chunks_embedded,
+        "seconds": seconds,
+        "files_per_sec": stats.files_scanned / seconds,
+        "bottleneck": pipeline.bottleneck if pipeline is not None else None,
+    }
+
+
+def run_suite(
+    files: int = 300,
+    lines: int = 150,
+    dim: int = 256,
+    queries: int = 200,
+    k: int = 10,
+    max_tokens: int = 200,
+    repeat: int = 3,
+    seed: int = 0,
+    workdir: Optional[Path] = None,
+) -> Dict:
+    """Generate a repository and time every stage on it; returns a JSON-able report"""
+    config = {
+        "files": files, "lines": lines, "dim": dim, "queries": queries, "k": k,
+        "max_tokens": max_tokens, "seed": seed,
+    }
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        repo = Path(tmp) / "repo"
+        generate_repo(repo, files=files, lines=lines, seed=seed)
+        paths = sorted(RepoWalker().walk(repo))
+        batch = _chunker(max_tokens).chunk_batch(paths)
+        report = {
+            "config": config,
+            "environment": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "processor": platform.processor(),
+            },
+            "chunking": bench_chunking(paths, max_tokens, repeat),
+            "embedding": bench_embedding(batch.contents(), dim, repeat),
+            "search": bench_search(batch, dim, queries, k, seed),
+            "indexing": bench_indexing(repo, dim, max_tokens, repeat),
+        }
+    return report
+
+
+def _lookup(report: Dict, metric: str) -> Optional[float]:
+    value = report
+    for part in metric.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare(report: Dict, baseline: Dict, threshold: float = 0.25) -> List[Dict]:
+    """Metrics worse than the baseline by more than `threshold` (a fraction)
+
+    Raises ValueError when the two runs used different configurations, since
+    their numbers are not comparable.
+    """
+    if report.get("config") != baseline.get("config"):
+        raise ValueError(
+            f"Baseline config {baseline.get('config')} differs from {report.get('config')}"
+        )
+    regressions = []
+    for metric, better in METRICS.items():
+        current, reference = _lookup(report, metric), _lookup(baseline, metric)
+        if current is None or not reference:
+            continue
+        change = (current - reference) / reference
+        worse = change < -threshold if better == "higher" else change > threshold
+        if worse:
+            regressions.append({
+                "metric": metric,
+                "baseline": reference,
+                "current": current,
+                "change": change,
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--lines", type=int, default=150)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", type=Path, help="Write the report here as JSON")
+    parser.add_argument("--baseline", type=Path, help="Report to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25,
+        help="Allowed relative slowdown per metric before failing (default 0.25)",
+    )
+    parser.add_argument("--save-baseline", type=Path, help="Write the report as the new baseline")
+    args = parser.parse_args(argv)
+
+    report = run_suite(
+        files=args.files, lines=args.lines, dim=args.dim, queries=args.queries, k=args.k,
+        max_tokens=args.max_tokens, repeat=args.repeat, seed=args.seed,
+    )
+    text = json.dumps(report, indent=2)
+    print(text)
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        try:
+            regressions = compare(report, baseline, args.threshold)
+        except ValueError as e:
+            sys.stderr.write(f"{e}\n")
+            sys.exit(2)
+        for r in regressions:
+            sys.stderr.write(
+                f"REGRESSION {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} "
+                f"({r['change']:+.0%})\n"
+            )
+        if regressions:
+            sys.exit(1)
+        sys.stderr.write(f"No regressions beyond {args.threshold:.0%} of {args.baseline}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Deterministic synthetic multi-language repositories for benchmarks
+
+    python -m benchmarks.synthetic_repo /tmp/repo --files 500 --lines 200
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+_WORDS = (
+    "index chunk token vector query cache batch file path embed score rank merge "
+    "parse walk commit symbol buffer offset stream reader writer model limit"
+).split()
+
+
+def _name(rng: random.Random, parts: int = 2) -> str:
+    return "_".join(rng.choice(_WORDS) for _ in range(parts))
+
+
+def _camel(rng: random.Random) -> str:
+    return "".join(w.title() for w in _name(rng).split("_"))
+
+
+def _body(rng: random.Random, lines: int, comment: str, end: str = "") -> List[str]:
+    out = []
+    for i in range(lines):
+        if rng.random() < 0.2:
+            out.append(f"{comment} {' '.join(rng.choice(_WORDS) for _ in range(8))}")
+        else:
+            out.append(f"total = total + {_name(rng)}({i}, {rng.randint(0, 999)}){end}")
+    return out
+
+
+def _python(rng: random.Random, lines: int) -> str:
+    out = ['"""Generated module"""', "", "import os", ""]
+    while len(out) < lines:
+        if rng.random() < 0.3:
+            out += ["", f"class {_camel(rng)}:", f'    """{_name(rng, 4)}"""', ""]
+            for _ in range(rng.randint(1, 3)):
+                out.append(f"    def {_name(rng)}(self, total):")
+                out += ["        " + s for s in _body(rng, rng.randint(4, 20), "#")]
+                out += ["        return total", ""]
+        else:
+            out += ["", f"def {_name(rng)}(total):"]
+            out += ["    " + s for s in _body(rng, rng.randint(4, 30), "#")]
+            out += ["    return total", ""]
+    return "\n".join(out) + "\n"
+
+
+def _curly(rng: random.Random, lines: int, header: str, function: str, end: str) -> str:
+    out = [header, ""]
+    while len(out) < lines:
+        out.append(function.format(name=_name(rng), Name=_camel(rng)) + " {")
+        out += ["    " + s for s in _body(rng, rng.randint(4, 30), "//", end)]
+        out += [f"    return total{end}", "}", ""]
+    return "\n".join(out) + "\n"
+
+
+def _markdown(rng: random.Random, lines: int) -> str:
+    out = [f"# {_camel(rng)}", ""]
+    while len(out) < lines:
+        out += [f"## {_name(rng, 3).replace('_', ' ').title()}", ""]
+        out += [" ".join(rng.choice(_WORDS) for _ in range(14)) for _ in range(rng.randint(3, 8))]
+        out.append("")
+    return "\n".join(out) + "\n"
+
+
+GENERATORS = {
+    ".py": _python,
+    ".js": lambda rng, n: _curly(rng, n, "'use strict';", "function {name}(total)", ";"),
+    ".ts": lambda rng, n: _curly(
+        rng, n, "export {};", "export function {name}(total: number): number", ";"
+    ),
+    ".go": lambda rng, n: _curly(rng, n, "package main", "func {Name}(total int) int", ""),
+    ".rs": lambda rng, n: _curly(rng, n, "use std::fmt;", "pub fn {name}(total: i64) -> i64", ";"),
+    ".java": lambda rng, n: _curly(
+        rng, n, "package gen;", "    public static int {name}(int total)", ";"
+    ),
+    ".md": _markdown,
+}
+
+
+def generate_repo(
+    root: Path,
+    files: int = 200,
+    lines: int = 150,
+    extensions: Iterable[str] = tuple(GENERATORS),
+    seed: int = 0,
+    files_per_dir: int = 20,
+) -> Dict:
+    """Write `files` source files of about `lines` lines each under `root`
+
+    Extensions are used round-robin and files are spread over nested package
+    directories. The same arguments always produce the same bytes. Returns a
+    description of what was written.
+    """
+    root = Path(root)
+    rng = random.Random(seed)
+    extensions = list(extensions)
+    total_bytes = total_lines = 0
+    for i in range(files):
+        ext = extensions[i % len(extensions)]
+        package = root / f"pkg_{i // files_per_dir // 10}" / f"mod_{i // files_per_dir}"
+        package.mkdir(parents=True, exist_ok=True)
+        n = max(8, int(lines * rng.uniform(0.5, 1.5)))
+        text = GENERATORS[ext](rng, n)
+        path = package / f"{_name(rng)}_{i}{ext}"
+        path.write_text(text, encoding="utf-8")
+        total_bytes += len(text.encode("utf-8"))
+        total_lines += text.count("\n")
+    return {
+        "files": files,
+        "lines": total_lines,
+        "bytes": total_bytes,
+        "extensions": extensions,
+        "seed": seed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=150)
+    parser.add_argument("--ext", nargs="*", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(generate_repo(args.root, args.files, args.lines, args.ext, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Search latency of the NumPy vector index versus Qdrant local mode
+
+    python -m benchmarks.vector_index --rows 100000 --dim 1024 --queries 200
+    python -m benchmarks.vector_index --quantization none int8 binary --skip-qdrant
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.domain.entities import CodeChunk
+from src.infra.numpy_index import NumpyVectorIndex
+
+
+def _percentiles(samples_ms):
+    return {f"p{p}": float(np.percentile(samples_ms, p)) for p in (50, 95, 99)}
+
+
+def _time_queries(search, queries):
+    samples = []
+    for q in queries:
+        started = time.perf_counter()
+        search(q)
+        samples.append((time.perf_counter() - started) * 1000)
+    return _percentiles(samples)
+
+
+def _chunks(vectors):
+    for i, vec in enumerate(vectors):
+        yield CodeChunk(
+            id=f"c{i}",
+            content=f"chunk {i}",
+            file_path=f"src/mod_{i % 1000}.py",
+            language="python" if i % 3 else "go",
+            start_line=1,
+            end_line=1,
+            embedding=vec,
+        )
+
+
+def bench_numpy(vectors, queries, k, dtype, quantization=None, rescore=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NumpyVectorIndex(tmp, dtype=dtype, quantization=quantization, rescore=rescore)
+        chunks = list(_chunks(vectors))
+        started = time.perf_counter()
+        for start in range(0, len(chunks), 10_000):
+            index.upsert(chunks[start : start + 10_000])
+        build = time.perf_counter() - started
+        result = {
+            "build_s": build,
+            "search_ms": _time_queries(lambda q: index.search(q, k=k), queries),
+            "filtered_search_ms": _time_queries(
+                lambda q: index.search(q, k=k, language="go", path_prefix="src/mod_1"), queries
+            ),
+        }
+        if quantization:
+            codes = os.path.getsize(os.path.join(tmp, "codes.bin"))
+            scales = os.path.join(tmp, "scales.bin")
+            codes += os.path.getsize(scales) if os.path.exists(scales) else 0
+            result["scanned_bytes_per_vector"] = codes / len(vectors)
+            result[f"recall@{k}"] = index.recall_at_k(queries, k=k)
+        else:
+            result["scanned_bytes_per_vector"] = vectors.shape[1] * np.dtype(dtype).itemsize
+        return result
+
+
+def bench_qdrant(vectors, queries, k):
+    try:
+        from src.infra.qdrant_index import QdrantVectorIndex
+    except ImportError:
+        return {"skipped": "qdrant-client not installed"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = QdrantVectorIndex(path=tmp, collection_name="bench")
+        chunks = list(_chunks(vectors))
+        started = time.perf_counter()
+        for start in range(0, len(chunks), 10_000):
+            index.upsert(chunks[start : start + 10_000])
+        index.flush()
+        build = time.perf_counter() - started
+        result = {
+            "build_s": build,
+            "writer": index.stats(),
+            "search_ms": _time_queries(lambda q: index.search(q, k=k), queries),
+            "filtered_search_ms": _time_queries(
+                lambda q: index.search(q, k=k, language="go", path_prefix="src/mod_1"), queries
+            ),
+        }
+        index.close()
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument(
+        "--quantization", nargs="*", choices=["none", "int8", "binary"], default=["none"],
+        help="NumPy index storage modes to compare; quantized runs report recall@k",
+    )
+    parser.add_argument("--rescore", type=int, default=None)
+    parser.add_argument("--skip-qdrant", action="store_true")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.rows, args.dim)).astype(np.float32)
+    # Perturbed rows, so queries have true neighbours as real searches do
+    picks = rng.integers(0, args.rows, size=args.queries)
+    queries = vectors[picks] + rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+
+    report = {"rows": args.rows, "dim": args.dim}
+    for mode in args.quantization:
+        key = "numpy" if mode == "none" else f"numpy_{mode}"
+        report[key] = bench_numpy(
+            vectors, queries, args.k, args.dtype,
+            quantization=None if mode == "none" else mode, rescore=args.rescore,
+        )
+    if not args.skip_qdrant:
+        report["qdrant_local"] = bench_qdrant(vectors, queries, args.k)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Gunicorn settings: load the embedding model once in the master, share it with workers
+
+    gunicorn -c deploy/gunicorn.conf.py src.app.main:app
+
+With preload_app the application, and in on_starting the model weights,
+are loaded before workers are forked, so workers share those pages
+copy-on-write instead of each loading a copy. gc.freeze() moves everything
+allocated so far out of the collector's reach; otherwise collections in
+the workers write to object headers and un-share the pages. Each worker
+then warms the model up itself (see src.app.main lifespan), because the
+model runtime's thread pools do not survive fork. Set MODEL_THREADS to
+cores / workers to avoid oversubscription.
+"""
+
+import gc
+import os
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    from src.app.core.models import registry
+
+    try:
+        registry.preload()
+    except Exception as e:
+        # Workers will load their own copy on startup instead
+        server.log.warning(f"Model preload failed, workers will load it: {e}")
+    else:
+        server.log.info(f"Preloaded {registry.default} in {registry.load_seconds}")
+    gc.freeze()
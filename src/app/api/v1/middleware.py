@@ -1,8 +1,11 @@
+import time
 import uuid 
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
 
+from src.app.core import telemetry
+
 
 HEADER_NAME = "X-Trace-ID"
 
@@ -17,4 +20,44 @@ def add_correlation_id_middleware(app):
         response.headers.setdefault(HEADER_NAME, trace_id)
         return response
 
-    app.add_middleware(BaseHTTPMiddleware, dispatch=dispatch)
\ No newline at end of file
+    app.add_middleware(BaseHTTPMiddleware, dispatch=dispatch)
+
+
+def route_template(request: Request) -> str:
+    """Matched route path with its parameters unfilled, e.g. /api/v1/index-jobs/{job_id}
+
+    Routes of an included router may only know their path below the prefix;
+    the prefix is then taken from the request path, segment for segment.
+    """
+    route = request.scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    segments = request.scope["path"].rstrip("/").split("/")
+    depth = len(template.rstrip("/").split("/"))
+    prefix = "/".join(segments[: max(len(segments) - depth + 1, 1)])
+    return prefix + template
+
+
+def add_metrics_middleware(app):
+    """Record request latency per route template; not installed when metrics are off"""
+    if not telemetry.enabled():
+        return
+
+    async def dispatch(request: Request, call_next):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response: Response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            telemetry.observe(
+                "http_request_seconds",
+                time.perf_counter() - started,
+                method=request.method,
+                route=route_template(request),
+                status=status,
+            )
+
+    app.add_middleware(BaseHTTPMiddleware, dispatch=dispatch)
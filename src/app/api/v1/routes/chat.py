@@ -0,0 +1,83 @@
+"""Chat endpoints: answer questions about the indexed code, whole or streamed"""
+
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from src.app.core.factory import get_chat_service, get_query_batcher
+from src.domain.chat import ChatPrompt, ChatService
+from src.domain.microbatch import MicroBatcher, blocking_submit
+from src.domain.schemas import ChatRequest, ChatResponse
+
+router = APIRouter()
+
+
+def require_chat_service(
+    service: Optional[ChatService] = Depends(get_chat_service),
+) -> ChatService:
+    if service is None:
+        raise HTTPException(status_code=503, detail="No LLM configured; set LLM_URL")
+    return service
+
+
+def _sources(prepared: ChatPrompt):
+    return [block.to_dict() for block in prepared.context.blocks]
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+    body: ChatRequest,
+    service: ChatService = Depends(require_chat_service),
+    batcher: MicroBatcher = Depends(get_query_batcher),
+):
+    # Search and generation block, so they run in threads; the query embedding
+    # goes back to the event loop to share a model call with concurrent requests
+    embed = blocking_submit(batcher, asyncio.get_running_loop())
+    prepared = await asyncio.to_thread(
+        service.prepare,
+        body.query, k=body.k, language=body.language, path_prefix=body.path_prefix,
+        max_context_tokens=body.max_context_tokens, embed=embed,
+    )
+    answer = await asyncio.to_thread(service.answer, prepared)
+    return {
+        "answer": answer,
+        "sources": _sources(prepared),
+        "context": prepared.context.stats.as_dict(),
+    }
+
+
+@router.get("/chat/stream")
+async def chat_stream(
+    query: str = Query(min_length=1),
+    k: Optional[int] = Query(default=None, ge=1, le=200),
+    language: Optional[str] = None,
+    path_prefix: Optional[str] = None,
+    max_context_tokens: Optional[int] = Query(default=None, ge=1),
+    service: ChatService = Depends(require_chat_service),
+    batcher: MicroBatcher = Depends(get_query_batcher),
+):
+    """Server-sent events: `sources` with the context used, `token` per piece, then `done`"""
+    embed = blocking_submit(batcher, asyncio.get_running_loop())
+    prepared = await asyncio.to_thread(
+        service.prepare,
+        query, k=k, language=language, path_prefix=path_prefix,
+        max_context_tokens=max_context_tokens, embed=embed,
+    )
+
+    def stream():
+        sources = {"sources": _sources(prepared), "context": prepared.context.stats.as_dict()}
+        yield f"event: sources\ndata: {json.dumps(sources)}\n\n"
+        try:
+            for piece in service.stream(prepared):
+                yield f"event: token\ndata: {json.dumps(piece)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
@@ -0,0 +1,25 @@
+"""Liveness and readiness probes"""
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from src.app.core import models
+
+router = APIRouter()
+
+
+def get_registry() -> models.ModelRegistry:
+    return models.registry
+
+
+@router.get("/health")
+def health(registry: models.ModelRegistry = Depends(get_registry)):
+    """Liveness: the process answers; includes model state, timings and memory"""
+    return {"status": "ok", "models": registry.stats()}
+
+
+@router.get("/health/ready")
+def ready(registry: models.ModelRegistry = Depends(get_registry)):
+    """Readiness: 200 only once the models are loaded and warmed up"""
+    body = {"ready": registry.ready, "state": registry.state, "error": registry.error}
+    return JSONResponse(body, status_code=200 if registry.ready else 503)
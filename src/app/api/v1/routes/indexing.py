@@ -0,0 +1,97 @@
+"""Index job endpoints: submit, poll, cancel and stream progress"""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from src.app.core.config import settings
+from src.app.core.factory import resolve_commit, run_index_job
+from src.domain.jobs import IndexJob, IndexJobScheduler
+from src.domain.schemas import IndexJobRequest, IndexJobResponse
+
+router = APIRouter()
+
+_scheduler: Optional[IndexJobScheduler] = None
+
+
+def get_scheduler() -> IndexJobScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = IndexJobScheduler(
+            run_index_job,
+            max_concurrent=settings.index_max_concurrent_jobs,
+            niceness=settings.index_job_niceness,
+            # Shared by every API worker, so any of them can serve any job
+            state_dir=Path(settings.index_state_dir) / "jobs",
+        )
+    return _scheduler
+
+
+def _job_or_404(scheduler: IndexJobScheduler, job_id: str) -> IndexJob:
+    job = scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Index job {job_id} not found")
+    return job
+
+
+@router.post("/index-jobs", response_model=IndexJobResponse, status_code=202)
+def submit_job(body: IndexJobRequest, scheduler: IndexJobScheduler = Depends(get_scheduler)):
+    repo = Path(body.repo_path)
+    if not repo.is_dir():
+        raise HTTPException(status_code=400, detail=f"Not a directory: {body.repo_path}")
+    commit = body.commit or resolve_commit(repo)
+    job = scheduler.submit(body.tenant, str(repo.resolve()), commit=commit, full=body.full)
+    return job.as_dict()
+
+
+@router.get("/index-jobs", response_model=List[IndexJobResponse])
+def list_jobs(
+    tenant: Optional[str] = None, scheduler: IndexJobScheduler = Depends(get_scheduler)
+):
+    return [job.as_dict() for job in scheduler.list(tenant)]
+
+
+@router.get("/index-jobs/{job_id}", response_model=IndexJobResponse)
+def get_job(job_id: str, scheduler: IndexJobScheduler = Depends(get_scheduler)):
+    return _job_or_404(scheduler, job_id).as_dict()
+
+
+@router.delete("/index-jobs/{job_id}", response_model=IndexJobResponse)
+def cancel_job(job_id: str, scheduler: IndexJobScheduler = Depends(get_scheduler)):
+    _job_or_404(scheduler, job_id)
+    return scheduler.cancel(job_id).as_dict()
+
+
+@router.get("/index-jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    request: Request,
+    poll_seconds: float = 0.5,
+    scheduler: IndexJobScheduler = Depends(get_scheduler),
+):
+    """Server-sent events: one `progress` event per change, then `done`"""
+    job = _job_or_404(scheduler, job_id)
+
+    async def stream():
+        nonlocal job
+        version = -1
+        while True:
+            # Another worker's job is a snapshot; read it again
+            job = scheduler.get(job_id) or job
+            if job.version != version:
+                version = job.version
+                event = "done" if job.done else "progress"
+                yield f"event: {event}\ndata: {json.dumps(job.as_dict())}\n\n"
+                if job.done:
+                    return
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(poll_seconds)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
@@ -0,0 +1,15 @@
+"""Prometheus scrape endpoint"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.app.core import telemetry
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(telemetry.REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -20,24 +20,86 @@ class Settings(BaseSettings):
     cors_origins: list = Field(default=["*"], env="CORS_ORIGINS")
 
     # Vector Store
+    # Qdrant server, e.g. http://qdrant:6333; unset opens the embedded store at
+    # QDRANT_PATH, which only one process can hold (single worker / dev only)
+    qdrant_url: Optional[str] = Field(default=None, env="QDRANT_URL")
     qdrant_path: str = Field(default="./qdrant_data", env="QDRANT_PATH")
     collection_name: str = Field(default="code_chunks", env="COLLECTION_NAME")
+    vector_backend: str = Field(default="qdrant", env="VECTOR_BACKEND")  # qdrant | numpy
+    vector_index_path: str = Field(default="./vector_index", env="VECTOR_INDEX_PATH")
+    vector_index_dtype: str = Field(default="float32", env="VECTOR_INDEX_DTYPE")
+    # int8 | binary; unset stores only full-precision vectors
+    vector_index_quantization: Optional[str] = Field(
+        default=None, env="VECTOR_INDEX_QUANTIZATION"
+    )
+    vector_index_rescore: Optional[int] = Field(default=None, env="VECTOR_INDEX_RESCORE")
 
     # Embeddings
     embedding_model: str = Field(default="BAAI/bge-m3", env="EMBEDDING_MODEL")
     embedding_cache_dir: str = Field(default="./model_cache", env="MODEL_CACHE_DIR")
-    embedding_dimension: int = Field(default=768, env="EMBEDDING_DIM")
+    embedding_dimension: int = Field(default=1024, env="EMBEDDING_DIM")
+    embedding_cache_max_bytes: int = Field(
+        default=256 * 1024 * 1024, env="EMBEDDING_CACHE_MAX_BYTES"
+    )
+    embedding_store_dir: Optional[str] = Field(default=None, env="EMBEDDING_STORE_DIR")
+    embedding_batch_tokens: int = Field(default=8192, env="EMBEDDING_BATCH_TOKENS")
+    # Embed on this many CPU worker processes, each pinned to its own cores (0 = in-process)
+    embedding_processes: int = Field(default=0, env="EMBEDDING_PROCESSES")
+    embedding_cores_per_process: Optional[int] = Field(
+        default=None, env="EMBEDDING_CORES_PER_PROCESS"
+    )
+    # Load and warm the model in the background at startup; /health/ready waits for it
+    model_warmup: bool = Field(default=True, env="MODEL_WARMUP")
+    # Intra-op threads per process; set to cores / workers under gunicorn
+    model_threads: Optional[int] = Field(default=None, env="MODEL_THREADS")
+
+    # Index jobs
+    index_state_dir: str = Field(default="./index_state", env="INDEX_STATE_DIR")
+    index_max_concurrent_jobs: int = Field(default=1, env="INDEX_MAX_CONCURRENT_JOBS")
+    index_job_niceness: int = Field(default=10, env="INDEX_JOB_NICENESS")
+    # Pipeline stage sizing; 0 chunk processes chunks in a single thread
+    index_read_workers: int = Field(default=4, env="INDEX_READ_WORKERS")
+    index_chunk_processes: int = Field(default=2, env="INDEX_CHUNK_PROCESSES")
+    index_queue_size: int = Field(default=64, env="INDEX_QUEUE_SIZE")
+    # Also embed commits of git checkouts, incrementally per branch
+    index_git_history: bool = Field(default=True, env="INDEX_GIT_HISTORY")
+    # Link commits to the symbols they touch; makes git diff every commit
+    index_git_symbols: bool = Field(default=False, env="INDEX_GIT_SYMBOLS")
+
+    # Query result cache; similarity enables near-duplicate hits (cosine, e.g. 0.95)
+    query_cache_max_entries: int = Field(default=1024, env="QUERY_CACHE_MAX_ENTRIES")
+    query_cache_ttl_seconds: float = Field(default=600.0, env="QUERY_CACHE_TTL_SECONDS")
+    query_cache_similarity: Optional[float] = Field(default=None, env="QUERY_CACHE_SIMILARITY")
+
+    # Query embedding micro-batching
+    query_batch_max_size: int = Field(default=32, env="QUERY_BATCH_MAX_SIZE")
+    query_batch_max_wait_ms: float = Field(default=5.0, env="QUERY_BATCH_MAX_WAIT_MS")
+
+    # Chat: an Ollama-compatible LLM server; unset disables /chat
+    llm_url: Optional[str] = Field(default=None, env="LLM_URL")
+    llm_model: str = Field(default="llama3", env="LLM_MODEL")
+    llm_timeout_seconds: float = Field(default=120.0, env="LLM_TIMEOUT_SECONDS")
+    # Hits retrieved per question, then merged, deduplicated and packed into the budget
+    chat_top_k: int = Field(default=20, env="CHAT_TOP_K")
+    chat_context_tokens: int = Field(default=3000, env="CHAT_CONTEXT_TOKENS")
+    chat_mmr_diversity: float = Field(default=0.3, env="CHAT_MMR_DIVERSITY")
+    chat_duplicate_threshold: float = Field(default=0.85, env="CHAT_DUPLICATE_THRESHOLD")
 
     # Chunking
     max_tokens: int = Field(default=200, env="MAX_TOKENS")
+    # Count chunk tokens with the embedding model's tokenizer (downloads it); changes chunk IDs
+    chunk_tokenizer: bool = Field(default=False, env="CHUNK_TOKENIZER")
     chunk_overlap: int = Field(default=20, env="CHUNK_OVERLAP")
 
-    # Monitoring
+    # Monitoring; metrics_enabled=False leaves hot paths uninstrumented
+    metrics_enabled: bool = Field(default=True, env="METRICS_ENABLED")
     langfuse_public_key: Optional[str] = Field(default=None, env="LANGFUSE_PUBLIC_KEY")
     langfuse_secret_key: Optional[str] = Field(default=None, env="LANGFUSE_SECRET_KEY")
     otlp_endpoint: Optional[str] = Field(default=None, env="OTLP_ENDPOINT")
 
     # Repository Processing
+    max_file_bytes: int = Field(default=1024 * 1024, env="MAX_FILE_BYTES")
+    walk_workers: int = Field(default=1, env="WALK_WORKERS")
     ignore_patterns: set = Field(
         default={
             "__pycache__",
@@ -0,0 +1,237 @@
+"""Builds domain services from settings for the API process"""
+
+import hashlib
+import subprocess
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from src.app.core import models, telemetry
+from src.app.core.config import settings
+from src.app.core.logging import get_logger
+from src.domain.chat import ChatService
+from src.domain.chunker import CodeChunker
+from src.domain.context import ContextAssembler
+from src.domain.history import GitHistoryIndexer
+from src.domain.jobs import IndexJob
+from src.domain.microbatch import MicroBatcher, create_query_batcher
+from src.domain.pipeline import PipelinedIndexingService
+from src.domain.ports import Embedder, VectorIndex
+from src.domain.query_cache import QueryResultCache
+from src.domain.search import SearchService
+from src.domain.services import IndexStats
+from src.domain.symbols import OpenSymbolTables, SymbolTable
+from src.domain.tokens import TokenCounter
+from src.domain.walker import RepoWalker
+from src.infra.bm25_index import BM25Index
+
+logger = get_logger(__name__)
+
+_lock = threading.Lock()
+_embedder: Optional[Embedder] = None
+_index: Optional[VectorIndex] = None
+_lexical: Optional[BM25Index] = None
+_batcher: Optional[MicroBatcher] = None
+_chat: Optional[ChatService] = None
+_symbols: Optional[OpenSymbolTables] = None
+
+
+def get_embedder() -> Embedder:
+    """Process-wide embedding model from the model registry, loaded on first use"""
+    global _embedder
+    with _lock:
+        if _embedder is None:
+            _embedder = models.registry.get()
+            telemetry.REGISTRY.register_gauges(
+                "embedding_cache", _embedder.cache_stats, "Embedding cache counters"
+            )
+            telemetry.REGISTRY.register_gauges(
+                "embedding_model", _embedder.throughput_stats, "Model forward-pass throughput"
+            )
+        return _embedder
+
+
+def get_vector_index() -> VectorIndex:
+    """Process-wide vector index for `settings.vector_backend`"""
+    global _index
+    with _lock:
+        if _index is None:
+            if settings.vector_backend == "numpy":
+                from src.infra.numpy_index import NumpyVectorIndex
+
+                _index = NumpyVectorIndex(
+                    settings.vector_index_path,
+                    dtype=settings.vector_index_dtype,
+                    quantization=settings.vector_index_quantization,
+                    rescore=settings.vector_index_rescore,
+                )
+            else:
+                from src.infra.qdrant_index import QdrantVectorIndex
+
+                _index = QdrantVectorIndex(url=settings.qdrant_url)
+                telemetry.REGISTRY.register_gauges(
+                    "vector_index_writer", _index.stats, "Qdrant bulk writer counters"
+                )
+            telemetry.REGISTRY.register_gauges(
+                "vector_index", lambda: {"rows": _index.count()}, "Vectors in the index"
+            )
+        return _index
+
+
+def lexical_index_path() -> Path:
+    """Where the BM25 index shared by all repositories is saved"""
+    return Path(settings.index_state_dir) / "bm25"
+
+
+def get_lexical_index() -> BM25Index:
+    """Process-wide BM25 index next to the vector index's, loaded from the state dir
+
+    Like the vector index it holds every indexed repository; index jobs save
+    it when they finish and searches reload what other workers saved.
+    """
+    global _lexical
+    with _lock:
+        if _lexical is None:
+            _lexical = BM25Index.load(lexical_index_path())
+            telemetry.REGISTRY.register_gauges(
+                "lexical_index", lambda: {"rows": _lexical.count()}, "Chunks in the BM25 index"
+            )
+        return _lexical
+
+
+def get_query_batcher() -> MicroBatcher:
+    """Process-wide micro-batcher for query embeddings of concurrent requests"""
+    global _batcher
+    embedder = get_embedder()
+    with _lock:
+        if _batcher is None:
+            _batcher = create_query_batcher(embedder)
+            telemetry.REGISTRY.register_gauges(
+                "query_batcher", _batcher.stats.as_dict, "Coalesced query embedding batches"
+            )
+        return _batcher
+
+
+def symbol_tables() -> List[SymbolTable]:
+    """The symbol table of every indexed repository, kept open until replaced"""
+    global _symbols
+    with _lock:
+        if _symbols is None:
+            _symbols = OpenSymbolTables(Path(settings.index_state_dir))
+    return _symbols()
+
+
+def get_chat_service() -> Optional[ChatService]:
+    """Process-wide chat service, or None when no LLM is configured"""
+    global _chat
+    if not settings.llm_url:
+        return None
+    embedder, index, lexical = get_embedder(), get_vector_index(), get_lexical_index()
+    with _lock:
+        if _chat is None:
+            from src.infra.ollama_generator import OllamaGenerator
+
+            search = SearchService(
+                embedder,
+                index,
+                lexical,
+                cache=QueryResultCache(
+                    settings.query_cache_max_entries,
+                    settings.query_cache_ttl_seconds,
+                    settings.query_cache_similarity,
+                ),
+            )
+            assembler = ContextAssembler(
+                max_tokens=settings.chat_context_tokens,
+                diversity=settings.chat_mmr_diversity,
+                duplicate_threshold=settings.chat_duplicate_threshold,
+            )
+            _chat = ChatService(
+                search, OllamaGenerator(), assembler,
+                top_k=settings.chat_top_k, symbols=symbol_tables,
+            )
+            telemetry.REGISTRY.register_gauges(
+                "query_cache", search.cache_stats, "Query result cache counters"
+            )
+        return _chat
+
+
+def resolve_commit(repo: Path) -> Optional[str]:
+    """HEAD commit of a git checkout, or None if it is not one"""
+    try:
+        out = subprocess.run(
+            ["git", "-C", str(repo), "rev-parse", "HEAD"],
+            capture_output=True, text=True, timeout=10, check=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def state_dir(repo: Path) -> Path:
+    """Per-repository directory for the manifest and symbol table"""
+    digest = hashlib.sha1(str(repo.resolve()).encode("utf-8")).hexdigest()[:16]
+    return Path(settings.index_state_dir) / digest
+
+
+def build_indexing_service(repo: Path) -> PipelinedIndexingService:
+    state = state_dir(repo)
+    return PipelinedIndexingService(
+        CodeChunker(token_counter=TokenCounter(use_tokenizer=settings.chunk_tokenizer)),
+        get_embedder(),
+        get_vector_index(),
+        lexical=get_lexical_index(),
+        manifest_path=state / "manifest.json",
+        symbols_path=state / "symbols.bin",
+        read_workers=settings.index_read_workers,
+        chunk_processes=settings.index_chunk_processes,
+        queue_size=settings.index_queue_size,
+    )
+
+
+def run_index_job(job: IndexJob, report) -> Dict:
+    """Index a repository's working tree for the job scheduler
+
+    The checkout is indexed as it is on disk; `job.commit` identifies the
+    job for deduplication and is not checked out.
+    """
+    repo = Path(job.repo)
+    if not repo.is_dir():
+        raise FileNotFoundError(f"Repository not found: {repo}")
+    walker = RepoWalker(workers=settings.walk_workers)
+
+    def files() -> Iterator[Path]:
+        # Streamed into the pipeline, so reading and embedding start with the walk
+        yield from walker.walk(repo)
+        report(files_total=walker.stats.files_yielded)
+
+    def progress(stats: IndexStats) -> None:
+        report(
+            files_done=stats.files_scanned,
+            chunks=stats.chunks_embedded + stats.chunks_reused,
+            embeddings=stats.chunks_embedded,
+        )
+
+    # Start from what other workers have saved, so this job's save does not drop it
+    get_lexical_index().refresh(force=True)
+    service = build_indexing_service(repo)
+    try:
+        stats = service.index_files(
+            files(), full=job.full, progress=progress, cancel=job.cancel_event
+        )
+        result = asdict(stats)
+        result["walk"] = walker.stats.as_dict()
+        result["pipeline"] = service.pipeline_stats.as_dict()
+        if settings.index_git_history and resolve_commit(repo) is not None:
+            history = GitHistoryIndexer(
+                get_embedder(), get_vector_index(),
+                checkpoint_path=state_dir(repo) / "history.json",
+                lexical=get_lexical_index(),
+                symbols=settings.index_git_symbols,
+            )
+            result["history"] = asdict(history.index_history(repo, cancel=job.cancel_event))
+    finally:
+        # The BM25 index lives in memory; whatever reached it is kept, as in the vector index
+        get_lexical_index().save()
+    return result
@@ -0,0 +1,213 @@
+"""Process-wide registry of loaded embedding models
+
+Loading and warming are separate steps so that a pre-fork server can load
+weights once in its master process and let every worker share them
+copy-on-write (see deploy/gunicorn.conf.py), while each worker runs its own
+warm-up: forward passes must not happen before fork, since thread pools
+started by the model runtime do not survive it.
+
+States go cold -> loading -> loaded -> warming -> ready, or failed.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.app.core.config import settings
+from src.app.core.logging import get_logger
+from src.domain.ports import Embedder
+
+logger = get_logger(__name__)
+
+COLD, LOADING, LOADED, WARMING, READY, FAILED = (
+    "cold", "loading", "loaded", "warming", "ready", "failed"
+)
+
+# Short query and chunk-sized texts, so warm-up covers the common batch shapes
+WARMUP_TEXTS = [
+    "where is the embedding cache invalidated",
+    "def chunk_file(self, file_path: Path) -> List[CodeChunk]:\n"
+    '    """Chunk a single file into semantic units"""\n'
+    "    content = file_path.read_text(encoding='utf-8', errors='ignore')\n"
+    "    return self.chunk_text(content, file_path)\n",
+    "func (s *Server) Handle(w http.ResponseWriter, r *http.Request) {\n"
+    "    ctx := r.Context()\n    s.mux.ServeHTTP(w, r.WithContext(ctx))\n}\n",
+    "## Configuration\n\nSettings are read from environment variables and a .env file. "
+    "Vector storage, embedding model and chunk sizes can all be overridden.\n",
+] * 4
+
+
+def process_memory() -> Dict[str, int]:
+    """Resident and proportional set size of this process in bytes
+
+    PSS splits pages shared with other processes (such as weights inherited
+    from a pre-fork master) between them, so summing PSS over workers gives
+    their real footprint where summing RSS counts shared weights once per
+    worker. Linux only; elsewhere only peak RSS is reported.
+    """
+    memory: Dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty"):
+                    memory[f"{name.lower()}_bytes"] = int(rest.split()[0]) * 1024
+    except OSError:
+        import resource
+
+        memory["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return memory
+
+
+def load_embedding_model(name: str) -> Embedder:
+    from src.domain.embeddings import EmbeddingManager
+
+    if settings.embedding_processes > 0:
+        from src.domain.embedding_pool import sentence_transformer_pool
+
+        pool = sentence_transformer_pool(
+            name,
+            settings.embedding_cache_dir,
+            settings.embedding_processes,
+            settings.embedding_cores_per_process,
+        )
+        return EmbeddingManager(name, settings.embedding_cache_dir, model=pool)
+    return EmbeddingManager(name, settings.embedding_cache_dir)
+
+
+class ModelRegistry:
+    """Loads each named model once per process and tracks readiness
+
+    `get` loads on demand; `preload` loads ahead of time without running
+    the model; `warm_up` runs a few forward passes on every loaded model and
+    marks the registry ready; `start` does both on a background thread so a
+    server can answer liveness checks while the model loads.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Embedder] = load_embedding_model,
+        default: Optional[str] = None,
+        warmup_texts: Optional[List[str]] = None,
+    ):
+        self.loader = loader
+        self.default = default or settings.embedding_model
+        self.warmup_texts = warmup_texts or WARMUP_TEXTS
+        self.state = COLD
+        self.error: Optional[str] = None
+        self.load_seconds: Dict[str, float] = {}
+        self.warmup_seconds: Optional[float] = None
+        self._models: Dict[str, Embedder] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loaded_in: Optional[int] = None  # pid of the process that loaded the weights
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def get(self, name: Optional[str] = None) -> Embedder:
+        name = name or self.default
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            if name not in self._models:
+                self._load(name)
+            return self._models[name]
+
+    def _load(self, name: str) -> None:
+        # A model added on demand after warm-up does not take readiness away
+        if self.state != READY:
+            self.state = LOADING
+        started = time.perf_counter()
+        try:
+            self._models[name] = self.loader(name)
+        except Exception as e:
+            self.state, self.error = FAILED, f"{type(e).__name__}: {e}"
+            logger.error(f"Loading model {name} failed: {self.error}")
+            raise
+        self.load_seconds[name] = time.perf_counter() - started
+        self._loaded_in = os.getpid()
+        if self.state != READY:
+            self.state = LOADED
+        logger.info(f"Loaded model {name} in {self.load_seconds[name]:.2f}s")
+
+    def preload(self, names: Optional[List[str]] = None) -> None:
+        """Load models without running them; safe to call before forking workers"""
+        for name in names or [self.default]:
+            self.get(name)
+
+    def warm_up(self) -> None:
+        """Load the default model if needed, then run warm-up passes on every model"""
+        try:
+            self.get()
+            with self._lock:
+                self.state = WARMING
+                started = time.perf_counter()
+                _limit_threads()
+                for name, model in self._models.items():
+                    warm_up = getattr(model, "warm_up", None)
+                    if warm_up is not None:
+                        warm_up(self.warmup_texts)
+                    else:
+                        model.encode(self.warmup_texts)
+                self.warmup_seconds = time.perf_counter() - started
+                self.state = READY
+        except Exception as e:
+            self.state, self.error = FAILED, f"{type(e).__name__}: {e}"
+            logger.error(f"Model warm-up failed: {self.error}")
+            return
+        logger.info(
+            f"Models warm in {self.warmup_seconds:.2f}s (pid {os.getpid()}"
+            f"{', weights inherited' if self.inherited else ''})"
+        )
+
+    @property
+    def inherited(self) -> bool:
+        """True if the weights were loaded before this process was forked, so are shared"""
+        return self._loaded_in is not None and self._loaded_in != os.getpid()
+
+    def start(self) -> threading.Thread:
+        """Warm up on a background thread; returns the running thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.warm_up, name="model-warmup", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def metrics(self) -> Dict[str, float]:
+        """Flat numeric view of stats() for the metrics endpoint"""
+        return {
+            "ready": float(self.ready),
+            "load_seconds": sum(self.load_seconds.values()),
+            "warmup_seconds": self.warmup_seconds or 0.0,
+            **process_memory(),
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "error": self.error,
+            "models": list(self._models),
+            "load_seconds": dict(self.load_seconds),
+            "warmup_seconds": self.warmup_seconds,
+            "inherited": self.inherited,
+            "pid": os.getpid(),
+            "memory": process_memory(),
+        }
+
+
+def _limit_threads() -> None:
+    """Cap the model runtime's intra-op threads, so workers don't oversubscribe cores"""
+    if not settings.model_threads:
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(settings.model_threads)
+
+
+registry = ModelRegistry()
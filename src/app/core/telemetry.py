@@ -0,0 +1,301 @@
+"""Process-wide metrics for hot paths, with optional OTLP tracing
+
+Hot paths are wrapped with `timed`, which records a latency histogram and,
+once `configure_tracing` has found an OTLP endpoint, a span. `observe` and
+`count` record values inline. Stats objects that already keep their own
+counters (caches, writers) are exported with `register_gauges` and read
+only when metrics are scraped. Everything is rendered by `REGISTRY.render()`
+in the Prometheus text format.
+
+With `settings.metrics_enabled` off, `timed` returns the function itself
+and `observe`/`count` return after one flag check, so disabled
+instrumentation costs nothing measurable.
+"""
+
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.app.core.config import settings
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds, from sub-millisecond lookups to multi-second model calls
+LATENCY_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Counts: batch sizes, chunks per file
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+_enabled = settings.metrics_enabled
+_tracer = None
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic total per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1.0, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Bucketed observations per label set, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # label set -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        self.observe_key(value, _labels(labels))
+
+    def observe_key(self, value: float, key: Labels) -> None:
+        """observe() with labels already normalized by the caller"""
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[slot] += 1
+            row[-1] += value
+
+    def count(self, **labels) -> int:
+        row = self._values.get(_labels(labels))
+        return int(sum(row[:-1])) if row else 0
+
+    def sum(self, **labels) -> float:
+        row = self._values.get(_labels(labels))
+        return row[-1] if row else 0.0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(labels, list(row)) for labels, row in self._values.items()]
+        for labels, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), row[:-1]):
+                cumulative += n
+                le = ("le", _format_value(bound) if math.isinf(bound) else repr(bound))
+                yield f"{self.name}_bucket{_format_labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(row[-1])}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+class Registry:
+    """Named metrics plus gauge callbacks, rendered together for a scrape"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._gauges: Dict[str, Tuple[Callable[[], Dict], str, Labels, str]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, help, **kwargs)
+        if not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(Counter, name, help)
+
+    def histogram(
+        self, name: str, help: str = "", buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def register_gauges(
+        self, prefix: str, read: Callable[[], Dict], help: str = "", **labels
+    ) -> None:
+        """Export every numeric value of `read()` as gauge `<prefix>_<key>` on scrape
+
+        Registering the same prefix and labels again replaces the callback.
+        """
+        key = f"{prefix}{_format_labels(_labels(labels))}"
+        with self._lock:
+            self._gauges[key] = (read, help, _labels(labels), prefix)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for name, metric in sorted(self._metrics.items()):
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples())
+
+        gauges: Dict[str, List[str]] = {}
+        helps: Dict[str, str] = {}
+        for read, help, labels, prefix in list(self._gauges.values()):
+            try:
+                values = read()
+            except Exception as e:
+                logger.warning(f"Gauge callback for {prefix} failed: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                helps.setdefault(name, help)
+                gauges.setdefault(name, []).append(
+                    f"{name}{_format_labels(labels)} {_format_value(value)}"
+                )
+        for name in sorted(gauges):
+            if helps[name]:
+                lines.append(f"# HELP {name} {helps[name]}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(gauges[name])
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+REGISTRY = Registry()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(flag: bool) -> None:
+    """Turn recording on or off at runtime; functions decorated while disabled stay bare"""
+    global _enabled
+    _enabled = flag
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels):
+    if _enabled:
+        REGISTRY.histogram(name, buckets=buckets).observe(value, **labels)
+
+
+def count(name: str, value: float = 1.0, **labels) -> None:
+    if _enabled:
+        REGISTRY.counter(name).inc(value, **labels)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block into histogram `name` and, with tracing on, a span"""
+    if not _enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        if _tracer is not None:
+            with _tracer.start_as_current_span(name, attributes=attributes):
+                yield
+        else:
+            yield
+    finally:
+        REGISTRY.histogram(name).observe(time.perf_counter() - started, **attributes)
+
+
+def timed(name: str, help: str = "", **labels):
+    """Decorator: record each call's latency in histogram `name` (seconds)
+
+    `labels` are fixed per decorated function, e.g. the backend of an index.
+    """
+
+    def decorate(fn):
+        if not _enabled:
+            return fn
+        histogram = REGISTRY.histogram(name, help)
+        key = _labels(labels)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                if _tracer is not None:
+                    with _tracer.start_as_current_span(name, attributes=labels):
+                        return fn(*args, **kwargs)
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe_key(time.perf_counter() - started, key)
+
+        return wrapper
+
+    return decorate
+
+
+def configure_tracing(endpoint: Optional[str] = None, service_name: Optional[str] = None) -> bool:
+    """Export spans over OTLP/gRPC if an endpoint is set and OpenTelemetry is installed"""
+    global _tracer
+    endpoint = endpoint or settings.otlp_endpoint
+    if _tracer is not None:
+        return True
+    if not endpoint or not _enabled:
+        return False
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        logger.warning(f"OTLP endpoint {endpoint} set but OpenTelemetry is unavailable: {e}")
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name or settings.app_name})
+    )
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("codebase-copilot")
+    logger.info(f"Exporting traces to {endpoint}")
+    return True
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -5,11 +7,11 @@ from fastapi.middleware.cors import CORSMiddleware
 # logging helper (your fallback pattern)
 try:
     from src.app.core.logging import get_logger
-except Exception: # pragma: no cover
+except Exception:  # pragma: no cover
     import logging
 
-def get_logger(name: str):
-    return logging.getLogger(name)
+    def get_logger(name: str):
+        return logging.getLogger(name)
 
 log = get_logger(__name__)
 
@@ -24,12 +26,24 @@ except Exception:
     APP_VERSION = "0.1.0"
     CORS_ORIGINS = ["*"]
 
-from src.app.middleware import add_correlation_id_middleware
-from src.app.errors import install_error_handlers
-from src.app.routes import health, metrics, collections, indexing, search, chat, feedback
+from src.app.api.v1.middleware import add_correlation_id_middleware, add_metrics_middleware
+from src.app.api.v1.errors import install_error_handlers
+from src.app.api.v1.routes import chat, health, indexing, metrics
+from src.app.core import models, telemetry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the model (unless a pre-fork master already did) and warm it up off
+    # the event loop; /health/ready reports 503 until this finishes
+    telemetry.REGISTRY.register_gauges("model", models.registry.metrics, "Model readiness")
+    if settings.model_warmup:
+        models.registry.start()
+    yield
+
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=APP_NAME, version=APP_VERSION)
+    app = FastAPI(title=APP_NAME, version=APP_VERSION, lifespan=lifespan)
 
     # CORS
     app.add_middleware(
@@ -43,17 +57,18 @@ def create_app() -> FastAPI:
     # Correlation/trace header
     add_correlation_id_middleware(app)
 
+    # Request latency histogram; spans go to OTLP_ENDPOINT if one is set
+    add_metrics_middleware(app)
+    telemetry.configure_tracing()
+
     # Error envelopes
     install_error_handlers(app)
 
-    # Routers (versioned)
-    app.include_router(health.router, prefix="/api/v1", tags=["health"]) # /health, /healthz
-    app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"]) # /metrics/summary
-    app.include_router(collections.router, prefix="/api/v1", tags=["collections"]) # /collections
-    app.include_router(indexing.router, prefix="/api/v1", tags=["indexing"]) # /index-jobs
-    app.include_router(search.router, prefix="/api/v1", tags=["search"]) # /search
-    app.include_router(chat.router, prefix="/api/v1", tags=["chat"]) # /chat, /chat/stream
-    app.include_router(feedback.router, prefix="/api/v1", tags=["feedback"]) # /feedback
+    # Routers (versioned); metrics and health stay at the root for scrapers and probes
+    app.include_router(indexing.router, prefix="/api/v1", tags=["indexing"])  # /index-jobs
+    app.include_router(chat.router, prefix="/api/v1", tags=["chat"])  # /chat, /chat/stream
+    app.include_router(metrics.router, tags=["metrics"])  # /metrics, Prometheus format
+    app.include_router(health.router, tags=["health"])  # /health, /health/ready
 
     log.info("App created: %s v%s", APP_NAME, APP_VERSION)
     return app
@@ -1,65 +1,254 @@
 """Simple CLI for CodeChunker"""
 
+import argparse
+import json
+import os
+import sys
+import textwrap
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import is_dataclass, asdict
+from multiprocessing import get_context
 from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional
 
-from src.core.chunker import CodeChunker
+from src.app.core.config import settings
+from src.domain.chunk_file import ChunkFileWriter
+from src.domain.chunker import ChunkingStats, CodeChunker
+from src.domain.entities import ChunkBatch
+from src.domain.tokens import TokenCounter
+from src.domain.walker import RepoWalker
 from src.app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
-if __name__ == "__main__":
-    import argparse
-    import json
-    import sys
-    from dataclasses import is_dataclass, asdict
-
-    def chunk_to_dict(c) -> dict:
-        """Best-effort serializer for CodeChunk-like objects."""
-        if is_dataclass(c):
-            return asdict(c)
-        # Fallback: grab typical attributes if not a dataclass
-        fields = [
-            "id",
-            "content",
-            "file_path",
-            "language",
-            "start_line",
-            "end_line",
-            "metadata",
-        ]
-        return {f: getattr(c, f, None) for f in fields}
-
-    def iter_files(paths, recursive: bool, exts: set | None):
-        """Yield Path objects to process."""
-        seen = set()
-        for p in paths:
-            p = Path(p)
-            if not p.exists():
-                logger.warning(f"Path not found: {p}")
-                continue
-            if p.is_file():
-                if (not exts) or (p.suffix.lower() in exts):
-                    key = p.resolve()
-                    if key not in seen:
-                        seen.add(key)
-                        yield p
-            else:
-                # directory
-                if recursive:
-                    for fp in p.rglob("*"):
-                        if fp.is_file() and ((not exts) or (fp.suffix.lower() in exts)):
-                            key = fp.resolve()
-                            if key not in seen:
-                                seen.add(key)
-                                yield fp
-                else:
-                    for fp in p.glob("*"):
-                        if fp.is_file() and ((not exts) or (fp.suffix.lower() in exts)):
-                            key = fp.resolve()
-                            if key not in seen:
-                                seen.add(key)
-                                yield fp
 
+class FileResult(NamedTuple):
+    """Serialized chunks of one file, ready to be written
+
+    In binary mode `records` is empty and the chunks travel as `batch`.
+    """
+
+    path: str
+    language: str
+    records: List[str]
+    tokens: List[int]
+    chunk_type: Optional[str] = None
+    batch: Optional[ChunkBatch] = None
+
+    @property
+    def count(self) -> int:
+        return len(self.batch) if self.batch is not None else len(self.records)
+
+
+def chunk_to_dict(c) -> dict:
+    """Best-effort serializer for CodeChunk-like objects."""
+    if hasattr(c, "to_dict"):
+        return c.to_dict()
+    if is_dataclass(c):
+        return asdict(c)
+    # Fallback: grab typical attributes if not a dataclass
+    fields = [
+        "id",
+        "content",
+        "file_path",
+        "language",
+        "start_line",
+        "end_line",
+        "metadata",
+    ]
+    return {f: getattr(c, f, None) for f in fields}
+
+
+def iter_files(paths, recursive: bool, exts: set | None, walker: Optional[RepoWalker] = None):
+    """Yield Path objects to process.
+
+    Directories are listed with RepoWalker, so ignored directories, binary
+    and oversized files are skipped; files named explicitly are taken as is.
+    """
+    walker = walker or RepoWalker(extensions=exts or None)
+    seen = set()
+    for p in paths:
+        p = Path(p)
+        if p.is_file():
+            candidates = [p] if (not exts) or (p.suffix.lower() in exts) else []
+        elif p.is_dir():
+            candidates = walker.walk(p, recursive=recursive)
+        else:
+            logger.warning(f"Path not found: {p}")
+            continue
+        for fp in candidates:
+            key = os.path.abspath(fp)
+            if key not in seen:
+                seen.add(key)
+                yield fp
+
+
+# Per-process state, set once by _init_worker so each task only ships a path
+_chunker: Optional[CodeChunker] = None
+_indent: Optional[int] = None
+_binary = False
+
+
+def _init_worker(
+    max_tokens: Optional[int],
+    overlap: Optional[int],
+    indent: Optional[int],
+    binary: bool = False,
+):
+    global _chunker, _indent, _binary
+    _chunker = CodeChunker(
+        max_tokens=max_tokens,
+        overlap=overlap,
+        token_counter=TokenCounter(use_tokenizer=settings.chunk_tokenizer),
+    )
+    _indent = indent
+    _binary = binary
+
+
+def _chunk_one(path: str) -> FileResult:
+    """Chunk and serialize one file inside a worker"""
+    fp = Path(path)
+    chunks = _chunker.chunk_file(fp)
+    if _binary:
+        records, batch = [], ChunkBatch.from_chunks(chunks)
+    else:
+        records, batch = [
+            json.dumps(chunk_to_dict(c), ensure_ascii=False, indent=_indent) for c in chunks
+        ], None
+    return FileResult(
+        path,
+        _chunker._detect_language(fp),
+        records,
+        [c.metadata.get("tokens", 0) for c in chunks],
+        chunks[0].metadata.get("chunk_type") if chunks else None,
+        batch,
+    )
+
+
+def iter_chunked(
+    files: Iterable[Path],
+    max_tokens: Optional[int] = None,
+    overlap: Optional[int] = None,
+    jobs: int = 1,
+    ordered: bool = False,
+    indent: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    binary: bool = False,
+) -> Iterator[FileResult]:
+    """Chunk files, yielding serialized results as soon as each file is done
+
+    With `jobs > 1` files are fanned out to a process pool. At most
+    `max_in_flight` files are submitted ahead of the writer, so memory stays
+    bounded by the window rather than the repository size. `ordered=True`
+    yields results in input order; otherwise in completion order.
+    `binary=True` returns each file's chunks as a ChunkBatch instead of JSON.
+    """
+    if jobs <= 1:
+        _init_worker(max_tokens, overlap, indent, binary)
+        for fp in files:
+            yield _chunk_one(str(fp))
+        return
+
+    window = max_in_flight or jobs * 4
+    file_iter = iter(files)
+    # Spawned, not forked: workers start while walker threads run, and after
+    # the model is loaded with --embed
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(max_tokens, overlap, indent, binary),
+    ) as pool:
+
+        def submit_next():
+            fp = next(file_iter, None)
+            return None if fp is None else pool.submit(_chunk_one, str(fp))
+
+        if ordered:
+            pending = deque()
+            while len(pending) < window and (fut := submit_next()) is not None:
+                pending.append(fut)
+            while pending:
+                result = pending.popleft().result()
+                if (fut := submit_next()) is not None:
+                    pending.append(fut)
+                yield result
+        else:
+            pending = set()
+            while len(pending) < window and (fut := submit_next()) is not None:
+                pending.add(fut)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if (nxt := submit_next()) is not None:
+                        pending.add(nxt)
+                for fut in done:
+                    yield fut.result()
+
+
+class BinaryChunkWriter:
+    """Streams ChunkBatches into a chunk file, embedding them first if asked
+
+    Per-file batches are pooled until `embed_batch` chunks are pending so the
+    embedder sees reasonably sized inputs.
+    """
+
+    def __init__(self, path: str, dtype: str = "float16", embedder=None, embed_batch: int = 256):
+        self.file = ChunkFileWriter(Path(path), dtype=dtype)
+        self.embedder = embedder
+        self.embed_batch = embed_batch
+        self._pending: List[ChunkBatch] = []
+        self._pending_count = 0
+
+    def write(self, batch: ChunkBatch) -> None:
+        if self.embedder is None:
+            self.file.write_batch(batch)
+            return
+        self._pending.append(batch)
+        self._pending_count += len(batch)
+        if self._pending_count >= self.embed_batch:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending_count:
+            batch = ChunkBatch.concat(self._pending)
+            self.file.write_batch(self.embedder.encode_batch(batch))
+        self._pending, self._pending_count = [], 0
+
+    def close(self) -> None:
+        self._flush()
+        self.file.close()
+
+    def discard(self) -> None:
+        self.file.discard()
+
+
+class ChunkWriter:
+    """Streams serialized chunks to a file in jsonl, json or pretty format"""
+
+    def __init__(self, out_fp, fmt: str):
+        self.out_fp = out_fp
+        self.fmt = fmt
+        self.count = 0
+
+    def write(self, record: str) -> None:
+        if self.fmt == "jsonl":
+            self.out_fp.write(record + "\n")
+        elif self.fmt == "json":
+            self.out_fp.write(("," if self.count else "[") + record)
+        else:  # pretty
+            self.out_fp.write((",\n" if self.count else "[\n") + textwrap.indent(record, "  "))
+        self.count += 1
+
+    def close(self) -> None:
+        if self.fmt == "json":
+            self.out_fp.write("]" if self.count else "[]")
+        elif self.fmt == "pretty":
+            self.out_fp.write("\n]" if self.count else "[]")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(
         prog="code-chunker",
         description="Chunk source files into semantic or sliding-window chunks.",
@@ -92,20 +281,60 @@ if __name__ == "__main__":
     parser.add_argument(
         "-f",
         "--format",
-        choices=["jsonl", "json", "pretty"],
+        choices=["jsonl", "json", "pretty", "bin"],
         default="jsonl",
-        help="Output format: jsonl (default), json (compact array), pretty (indented array).",
+        help="Output format: jsonl (default), json (compact array), pretty (indented array), "
+        "bin (binary chunk file, see src.domain.chunk_file; needs --out).",
+    )
+    parser.add_argument(
+        "--embed",
+        action="store_true",
+        help="With --format bin, embed chunks with the configured model and store the vectors.",
+    )
+    parser.add_argument(
+        "--embed-dtype",
+        choices=["float16", "float32"],
+        default="float16",
+        help="Storage dtype of embeddings in a bin file (default float16).",
     )
     parser.add_argument(
         "-o", "--out", default="-", help='Output file path (default "-" for stdout).'
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes (default 1; 0 = one per CPU).",
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="With --jobs, emit files in input order instead of completion order.",
+    )
+    parser.add_argument(
+        "--no-ignore",
+        action="store_true",
+        help="Do not apply ignore patterns, .gitignore or .ignore files.",
+    )
+    parser.add_argument(
+        "--walk-workers",
+        type=int,
+        default=settings.walk_workers,
+        help="Threads listing directories (default settings.walk_workers).",
+    )
     parser.add_argument(
         "--summary",
         action="store_true",
         help="Print a brief summary to stderr after processing.",
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    binary = args.format == "bin"
+    if binary and args.out == "-":
+        parser.error("--format bin needs an output file (--out)")
+    if args.embed and not binary:
+        parser.error("--embed is only supported with --format bin")
 
     # Determine extensions
     if args.ext:
@@ -115,45 +344,77 @@ if __name__ == "__main__":
     else:
         exts = set(CodeChunker.LANGUAGE_EXTENSIONS.keys())
 
-    # Instantiate the chunker with optional overrides
-    chunker = CodeChunker(max_tokens=args.max_tokens, overlap=args.overlap)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
 
-    all_chunks = []
     total_files = 0
+    total_chunks = 0
+    by_lang = {}
+    stats = ChunkingStats(args.max_tokens or settings.max_tokens)
 
-    for file_path in iter_files(args.paths, recursive=args.recursive, exts=exts):
-        total_files += 1
-        chunks = chunker.chunk_file(file_path)
-        if not chunks:
-            logger.info(f"No chunks produced for: {file_path}")
-        for c in chunks:
-            all_chunks.append(chunk_to_dict(c))
+    walker = RepoWalker(
+        ignore_patterns=() if args.no_ignore else None,
+        extensions=exts,
+        use_ignore_files=not args.no_ignore,
+        workers=args.walk_workers,
+    )
+
+    if binary:
+        embedder = None
+        if args.embed:
+            # Imported lazily: the model stack is only needed when embedding
+            from src.domain.embeddings import EmbeddingManager
 
-    # Write output
-    out_fp = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+            embedder = EmbeddingManager(settings.embedding_model)
+        out_fp = None
+        writer = BinaryChunkWriter(args.out, args.embed_dtype, embedder)
+    else:
+        out_fp = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+        writer = ChunkWriter(out_fp, args.format)
 
     try:
-        if args.format == "jsonl":
-            for obj in all_chunks:
-                out_fp.write(json.dumps(obj, ensure_ascii=False) + "\n")
-        elif args.format == "json":
-            out_fp.write(json.dumps(all_chunks, ensure_ascii=False))
-        else:  # pretty
-            out_fp.write(json.dumps(all_chunks, ensure_ascii=False, indent=2))
-        if out_fp is not sys.stdout:
+        results = iter_chunked(
+            iter_files(args.paths, recursive=args.recursive, exts=exts, walker=walker),
+            max_tokens=args.max_tokens,
+            overlap=args.overlap,
+            jobs=jobs,
+            ordered=args.ordered,
+            indent=2 if args.format == "pretty" else None,
+            binary=binary,
+        )
+        for result in results:
+            total_files += 1
+            if not result.count:
+                logger.info(f"No chunks produced for: {result.path}")
+            if result.batch is not None:
+                writer.write(result.batch)
+            for record in result.records:
+                writer.write(record)
+            stats.record(result.tokens, result.chunk_type)
+            if result.count:
+                total_chunks += result.count
+                by_lang[result.language] = by_lang.get(result.language, 0) + result.count
+        writer.close()
+        if out_fp is not None:
             out_fp.flush()
+    except BaseException:
+        if binary:
+            writer.discard()
+        raise
     finally:
-        if out_fp is not sys.stdout:
+        if out_fp is not None and out_fp is not sys.stdout:
             out_fp.close()
 
     if args.summary:
         # Basic summary to stderr so it doesn't pollute machine-readable output
-        total_chunks = len(all_chunks)
-        by_lang = {}
-        for c in all_chunks:
-            lang = c.get("language", "unknown")
-            by_lang[lang] = by_lang.get(lang, 0) + 1
         sys.stderr.write(
             f"Processed {total_files} file(s); produced {total_chunks} chunk(s). "
             f"By language: {by_lang}\n"
+            f"Tokens: {stats.tokens} total, {stats.as_dict()['mean_tokens']:.1f} per chunk, "
+            f"{stats.utilization:.0%} of the {stats.budget}-token budget; "
+            f"{stats.small_chunks} small chunk(s). By type: {stats.by_type}\n"
+            f"Walk: {walker.stats.as_dict()}\n"
         )
+
+
+if __name__ == "__main__":
+    main()
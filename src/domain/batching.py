@@ -0,0 +1,77 @@
+"""Length-bucketed batch planning for embedding models"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token) for when no tokenizer is available"""
+    return max(1, len(text) // 4)
+
+
+def plan_batches(
+    lengths: Sequence[int], token_budget: int, max_batch_size: int
+) -> List[List[int]]:
+    """Group item indexes into batches of similar length
+
+    Items are sorted by token length and packed greedily so that the padded
+    size of each batch (longest item x batch size) stays within `token_budget`.
+    Short texts end up together in wide batches and long ones in narrow
+    batches, so little compute is spent on padding. Callers scatter results
+    back using the returned indexes to restore the original order.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for i in order:
+        # Sorted ascending, so the new item is the longest in the batch
+        longest = max(1, lengths[i])
+        if current and (
+            longest * (len(current) + 1) > token_budget or len(current) >= max_batch_size
+        ):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+@dataclass
+class EncodeStats:
+    """Cumulative embedding throughput counters"""
+
+    texts: int = 0
+    batches: int = 0
+    tokens: int = 0
+    padded_tokens: int = 0
+    seconds: float = 0.0
+
+    def record(self, lengths: Sequence[int], seconds: float) -> None:
+        self.texts += len(lengths)
+        self.batches += 1
+        self.tokens += sum(lengths)
+        self.padded_tokens += max(lengths, default=0) * len(lengths)
+        self.seconds += seconds
+
+    @property
+    def texts_per_sec(self) -> float:
+        return self.texts / self.seconds if self.seconds else 0.0
+
+    @property
+    def padding_ratio(self) -> float:
+        """Fraction of computed tokens that were padding"""
+        if not self.padded_tokens:
+            return 0.0
+        return 1.0 - self.tokens / self.padded_tokens
+
+    def as_dict(self) -> Dict:
+        return {
+            "texts": self.texts,
+            "batches": self.batches,
+            "tokens": self.tokens,
+            "padded_tokens": self.padded_tokens,
+            "seconds": self.seconds,
+            "texts_per_sec": self.texts_per_sec,
+            "padding_ratio": self.padding_ratio,
+        }
@@ -0,0 +1,181 @@
+"""Question answering over the index: search, assemble context, generate"""
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.domain.chunker import CodeChunker
+from src.domain.context import AssembledContext, ContextAssembler
+from src.domain.entities import SearchHit
+from src.domain.ports import Generator
+from src.domain.search import SearchService
+from src.domain.symbols import Reference, SymbolTable, parse_navigation
+from src.app.core import telemetry
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Prompt sizes in tokens
+PROMPT_BUCKETS = (128, 256, 512, 1024, 2048, 3072, 4096, 6144, 8192, 16384)
+
+PROMPT_TEMPLATE = """You are a code assistant answering questions about a repository.
+Answer from the code excerpts below. Cite files as path:line. If the excerpts
+do not contain the answer, say so.
+
+{context}
+
+Question: {question}
+Answer:"""
+
+# Lines around a reference that is not inside any definition
+_REFERENCE_CONTEXT = 2
+
+# (file path, start line, end line) of one symbol table result
+Span = Tuple[str, int, int]
+
+
+@dataclass
+class ChatPrompt:
+    question: str
+    prompt: str
+    context: AssembledContext
+
+
+def _reference_span(table: SymbolTable, ref: Reference) -> Span:
+    """The definition enclosing a reference, or a few lines around it"""
+    for d in table.definitions(ref.caller) if ref.caller else []:
+        if d.file_path == ref.file_path and d.start_line <= ref.line <= d.end_line:
+            return d.file_path, d.start_line, d.end_line
+    start = max(1, ref.line - _REFERENCE_CONTEXT)
+    return ref.file_path, start, ref.line + _REFERENCE_CONTEXT
+
+
+def _read_lines(path: str) -> Optional[List[str]]:
+    try:
+        return Path(path).read_text(encoding="utf-8", errors="ignore").split("\n")
+    except OSError as e:
+        logger.warning(f"Cannot read {path}: {e}")
+        return None
+
+
+def _lookup(table: SymbolTable, intent: str, name: str) -> List[Span]:
+    if intent == "definitions":
+        return [(d.file_path, d.start_line, d.end_line) for d in table.definitions(name)]
+    refs = table.references(name, calls_only=intent == "callers")
+    return [_reference_span(table, r) for r in refs]
+
+
+class ChatService:
+    """Answers a question from the top search hits, packed into a token budget
+
+    Navigational questions ("where is X defined", "who calls Y") are answered
+    from the symbol tables returned by `symbols`, when given, with the source
+    lines of each result read from disk; search only runs when the tables
+    have nothing for them. The tables stay open: `symbols` owns them.
+    """
+
+    def __init__(
+        self,
+        search: SearchService,
+        generator: Generator,
+        assembler: Optional[ContextAssembler] = None,
+        top_k: int = 20,
+        symbols: Optional[Callable[[], Iterable[SymbolTable]]] = None,
+    ):
+        self.search = search
+        self.generator = generator
+        self.assembler = assembler or ContextAssembler()
+        self.top_k = top_k
+        self.symbols = symbols
+
+    def prepare(
+        self,
+        question: str,
+        k: Optional[int] = None,
+        language: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+        max_context_tokens: Optional[int] = None,
+        embed: Optional[Callable[[str], np.ndarray]] = None,
+    ) -> ChatPrompt:
+        k = k or self.top_k
+        hits = self.navigate(question, k, language, path_prefix)
+        if hits:
+            telemetry.count("chat_questions_total", route="symbols")
+        else:
+            telemetry.count("chat_questions_total", route="search")
+            hits = self.search.search(
+                question, k=k, language=language, path_prefix=path_prefix, embed=embed
+            )
+        context = self.assembler.assemble(hits, max_context_tokens)
+        prompt = PROMPT_TEMPLATE.format(context=context.render(), question=question)
+        stats = context.stats
+        telemetry.observe("chat_context_tokens", stats.tokens, PROMPT_BUCKETS)
+        telemetry.count("chat_context_tokens_saved_total", stats.hit_tokens - stats.tokens)
+        logger.debug(
+            f"Context: {stats.hits} hits -> {stats.blocks} blocks, "
+            f"{stats.hit_tokens} -> {stats.tokens} tokens"
+        )
+        return ChatPrompt(question, prompt, context)
+
+    def navigate(
+        self,
+        question: str,
+        k: int,
+        language: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+    ) -> List[SearchHit]:
+        """Hits for a navigational question from the symbol tables; empty otherwise"""
+        parsed = parse_navigation(question) if self.symbols is not None else None
+        if parsed is None:
+            return []
+        intent, name = parsed
+        spans: List[Span] = []
+        for table in self.symbols():
+            spans.extend(_lookup(table, intent, name))
+        hits: List[SearchHit] = []
+        lines: Dict[str, Optional[List[str]]] = {}
+        for path, start, end in dict.fromkeys(spans):
+            file_language = CodeChunker.LANGUAGE_EXTENSIONS.get(Path(path).suffix.lower(), "text")
+            if path_prefix is not None and not path.startswith(path_prefix):
+                continue
+            if language is not None and file_language != language:
+                continue
+            if path not in lines:
+                lines[path] = _read_lines(path)
+            if not lines[path]:
+                continue
+            end = min(end, len(lines[path]))
+            if start > end:  # the file shrank since it was indexed
+                continue
+            hits.append(SearchHit(
+                id=f"{path}:{start}-{end}",
+                score=1.0,
+                payload={
+                    "content": "\n".join(lines[path][start - 1:end]),
+                    "file_path": path,
+                    "language": file_language,
+                    "start_line": start,
+                    "end_line": end,
+                },
+            ))
+            if len(hits) == k:
+                break
+        logger.debug(f"{intent} of {name}: {len(hits)} hits from the symbol tables")
+        return hits
+
+    def stream(self, prepared: ChatPrompt) -> Iterator[str]:
+        """Generate the answer piece by piece, timing the first piece"""
+        started = time.perf_counter()
+        first = True
+        for piece in self.generator.stream(prepared.prompt):
+            if first:
+                telemetry.observe("chat_first_token_seconds", time.perf_counter() - started)
+                first = False
+            yield piece
+        telemetry.observe("chat_generation_seconds", time.perf_counter() - started)
+
+    def answer(self, prepared: ChatPrompt) -> str:
+        return "".join(self.stream(prepared))
@@ -0,0 +1,309 @@
+"""Binary interchange format for chunks and their embeddings, read through mmap"""
+
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.domain.entities import ChunkBatch
+from src.domain.ports import LexicalIndex, VectorIndex
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_MAGIC = b"CCHUNKS1"
+_VERSION = 1
+# Section name -> dtype, in file order; `ids` is fixed-width "S<id_width>"
+_SECTIONS = {
+    "ids": None,
+    "content": np.uint8,
+    "content_offsets": "<u8",
+    "metadata": np.uint8,
+    "metadata_offsets": "<u8",
+    "metadata_keys": "<u2",
+    "path_index": "<u4",
+    "language_index": "<u2",
+    "start_lines": "<i4",
+    "end_lines": "<i4",
+    "embeddings": None,
+    "paths": np.uint8,
+    "path_offsets": "<u8",
+    "languages": np.uint8,
+    "language_offsets": "<u8",
+}
+
+
+def _string_table(strings: List[str]) -> Tuple[bytes, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return b"".join(encoded), offsets
+
+
+class ChunkFileWriter:
+    """Streams ChunkBatches into a single chunk file, written atomically on close
+
+    Layout: magic, then 8-byte-aligned sections, then a JSON footer with the
+    section offsets, its length and the magic again. Sections are the
+    columns of a ChunkBatch: fixed-width IDs, contents and metadata values as
+    UTF-8 blobs with u64 offsets, dictionary indexes into the path and
+    language string tables, line numbers, and all embeddings as one
+    row-major float16 or float32 block. Each section is spooled to its own
+    temporary file while writing, so memory does not grow with the corpus.
+    All batches must either carry embeddings of the same dimension or none.
+    """
+
+    def __init__(self, path: Path, dtype: str = "float16", id_width: int = 16):
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.id_width = id_width
+        self.count = 0
+        self.dim: Optional[int] = None
+        self._embedded: Optional[bool] = None
+        self._paths: Dict[str, int] = {}
+        self._languages: Dict[str, int] = {}
+        self._meta_keys: Dict[Tuple[str, ...], int] = {}
+        self._content_end = 0
+        self._metadata_end = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._spool = tempfile.TemporaryDirectory(dir=self.path.parent, prefix=".chunks-")
+        self._parts: Dict[str, BinaryIO] = {
+            name: open(os.path.join(self._spool.name, name), "w+b")
+            for name in _SECTIONS
+            if name not in ("paths", "path_offsets", "languages", "language_offsets")
+        }
+        np.zeros(1, dtype="<u8").tofile(self._parts["content_offsets"])
+        np.zeros(1, dtype="<u8").tofile(self._parts["metadata_offsets"])
+
+    @staticmethod
+    def _remap(local: List, table: Dict) -> np.ndarray:
+        return np.array([table.setdefault(v, len(table)) for v in local], dtype=np.int64)
+
+    def write_batch(self, batch: ChunkBatch) -> None:
+        n = len(batch)
+        if not n:
+            return
+        embedded = batch.embeddings is not None
+        if self._embedded is None:
+            self._embedded = embedded
+            self.dim = batch.embeddings.shape[1] if embedded else None
+        elif embedded != self._embedded:
+            raise ValueError("Cannot mix batches with and without embeddings")
+        if embedded and batch.embeddings.shape[1] != self.dim:
+            raise ValueError(f"Embedding dim {batch.embeddings.shape[1]} != {self.dim}")
+        if batch.id_array.dtype.itemsize > self.id_width:
+            raise ValueError(f"Chunk IDs longer than {self.id_width} bytes")
+
+        parts = self._parts
+        batch.id_array.astype(f"S{self.id_width}").tofile(parts["ids"])
+        text_offsets, meta_offsets = batch.text_offsets, batch.meta_offsets
+        parts["content"].write(
+            batch.text_buffer[int(text_offsets[0]):int(text_offsets[-1])]
+        )
+        (text_offsets[1:] - text_offsets[0] + self._content_end).astype("<u8").tofile(
+            parts["content_offsets"]
+        )
+        self._content_end += int(text_offsets[-1] - text_offsets[0])
+        parts["metadata"].write(
+            batch.meta_buffer[int(meta_offsets[0]):int(meta_offsets[-1])]
+        )
+        (meta_offsets[1:] - meta_offsets[0] + self._metadata_end).astype("<u8").tofile(
+            parts["metadata_offsets"]
+        )
+        self._metadata_end += int(meta_offsets[-1] - meta_offsets[0])
+
+        keys = self._remap(batch.meta_keys, self._meta_keys)
+        keys[batch.meta_key_index].astype("<u2").tofile(parts["metadata_keys"])
+        paths = self._remap(batch.paths, self._paths)
+        paths[batch.path_index].astype("<u4").tofile(parts["path_index"])
+        languages = self._remap(batch.languages, self._languages)
+        languages[batch.language_index].astype("<u2").tofile(parts["language_index"])
+        batch.start_lines.astype("<i4").tofile(parts["start_lines"])
+        batch.end_lines.astype("<i4").tofile(parts["end_lines"])
+        if embedded:
+            batch.embeddings.astype(self.dtype).tofile(parts["embeddings"])
+        self.count += n
+
+    def close(self) -> None:
+        """Assemble the sections into the output file and drop the spool"""
+        path_blob, path_offsets = _string_table(list(self._paths))
+        language_blob, language_offsets = _string_table(list(self._languages))
+        extra = {
+            "paths": path_blob,
+            "path_offsets": path_offsets.tobytes(),
+            "languages": language_blob,
+            "language_offsets": language_offsets.tobytes(),
+        }
+        sections: Dict[str, List[int]] = {}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, "wb") as out:
+                out.write(_MAGIC)
+                for name in _SECTIONS:
+                    out.write(b"\0" * (-out.tell() % 8))
+                    start = out.tell()
+                    if name in extra:
+                        out.write(extra[name])
+                    else:
+                        part = self._parts[name]
+                        part.flush()
+                        part.seek(0)
+                        shutil.copyfileobj(part, out, 1 << 20)
+                    sections[name] = [start, out.tell() - start]
+                footer = json.dumps({
+                    "version": _VERSION,
+                    "count": self.count,
+                    "id_width": self.id_width,
+                    "dim": self.dim,
+                    "dtype": self.dtype.name,
+                    "meta_keys": [list(k) for k in self._meta_keys],
+                    "sections": sections,
+                }).encode("utf-8")
+                out.write(footer + struct.pack("<Q", len(footer)) + _MAGIC)
+            os.replace(tmp, self.path)
+        finally:
+            self.discard()
+        logger.info(f"Wrote {self.count} chunks to {self.path}")
+
+    def discard(self) -> None:
+        """Drop everything written so far without producing the output file"""
+        for part in self._parts.values():
+            part.close()
+        self._spool.cleanup()
+
+    def __enter__(self) -> "ChunkFileWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class ChunkFile:
+    """Read-only, memory-mapped view of a chunk file
+
+    Opening reads only the footer; every section is wrapped as a NumPy view
+    of the mapping. `batch(start, stop)` returns a ChunkBatch whose contents
+    and embeddings are slices of the mapping rather than copies, so loading
+    pre-embedded chunks costs what the consumer does with them, not parsing.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        tail = len(_MAGIC) + 8
+        if self._mm[: len(_MAGIC)] != _MAGIC or self._mm[-len(_MAGIC):] != _MAGIC:
+            raise ValueError(f"{self.path} is not a chunk file")
+        (length,) = struct.unpack_from("<Q", self._mm, len(self._mm) - tail)
+        footer = json.loads(self._mm[len(self._mm) - tail - length: len(self._mm) - tail])
+        if footer["version"] != _VERSION:
+            raise ValueError(f"Unsupported chunk file version {footer['version']}")
+        self.count: int = footer["count"]
+        self.dim: Optional[int] = footer["dim"]
+        self.dtype = np.dtype(footer["dtype"])
+        self.meta_keys = [tuple(k) for k in footer["meta_keys"]]
+        self._buffer = memoryview(self._mm)
+        self._views: Dict[str, np.ndarray] = {}
+        dtypes = dict(_SECTIONS, ids=f"S{footer['id_width']}", embeddings=self.dtype)
+        for name, (offset, nbytes) in footer["sections"].items():
+            dtype = np.dtype(dtypes[name])
+            self._views[name] = np.frombuffer(
+                self._mm, dtype=dtype, count=nbytes // dtype.itemsize, offset=offset
+            )
+        self._content_start = footer["sections"]["content"][0]
+        self._metadata_start = footer["sections"]["metadata"][0]
+        self.paths = self._strings("paths", "path_offsets")
+        self.languages = self._strings("languages", "language_offsets")
+
+    def _strings(self, blob: str, offsets: str) -> List[str]:
+        data, bounds = self._views[blob], self._views[offsets]
+        return [
+            bytes(data[bounds[i]:bounds[i + 1]]).decode("utf-8")
+            for i in range(len(bounds) - 1)
+        ]
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def embeddings(self) -> Optional[np.ndarray]:
+        """All embeddings as a (count, dim) view in the stored dtype, or None"""
+        if self.dim is None:
+            return None
+        return self._views["embeddings"].reshape(self.count, self.dim)
+
+    def batch(self, start: int = 0, stop: Optional[int] = None) -> ChunkBatch:
+        stop = self.count if stop is None else min(stop, self.count)
+        v = self._views
+        text = v["content_offsets"][start:stop + 1]
+        meta = v["metadata_offsets"][start:stop + 1]
+        embeddings = self.embeddings
+        return ChunkBatch(
+            ids=v["ids"][start:stop],
+            text=self._buffer[
+                self._content_start + int(text[0]):self._content_start + int(text[-1])
+            ],
+            text_offsets=(text - text[0]).astype(np.int64),
+            meta=self._buffer[
+                self._metadata_start + int(meta[0]):self._metadata_start + int(meta[-1])
+            ],
+            meta_offsets=(meta - meta[0]).astype(np.int64),
+            meta_keys=self.meta_keys,
+            meta_key_index=v["metadata_keys"][start:stop],
+            paths=self.paths,
+            path_index=v["path_index"][start:stop],
+            languages=self.languages,
+            language_index=v["language_index"][start:stop],
+            start_lines=v["start_lines"][start:stop],
+            end_lines=v["end_lines"][start:stop],
+            embeddings=None if embeddings is None else embeddings[start:stop],
+        )
+
+    def iter_batches(self, batch_size: int = 65536) -> Iterator[ChunkBatch]:
+        for start in range(0, self.count, batch_size):
+            yield self.batch(start, start + batch_size)
+
+    def close(self) -> None:
+        self._views = {}
+        try:
+            self._buffer.release()
+            self._mm.close()
+        except BufferError:
+            # Batches handed out still reference the mapping; it closes with them
+            pass
+
+    def __enter__(self) -> "ChunkFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def load_chunk_file(
+    path: Path,
+    index: VectorIndex,
+    lexical: Optional[LexicalIndex] = None,
+    batch_size: int = 65536,
+) -> int:
+    """Upsert every chunk of a pre-embedded chunk file; returns the number loaded"""
+    with ChunkFile(path) as chunks:
+        if chunks.dim is None:
+            raise ValueError(f"{path} has no embeddings; embed it before loading")
+        for batch in chunks.iter_batches(batch_size):
+            index.upsert_batch(batch)
+            if lexical is not None:
+                lexical.add(batch)
+        index.flush()
+        logger.info(f"Loaded {len(chunks)} chunks from {path}")
+        return len(chunks)
@@ -1,17 +1,57 @@
 """Code chunking functionality with language awareness"""
 
-import re
 import hashlib
-import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
-from src.domain.entities import CodeChunk
+from typing import Dict, Iterable, List, Optional, Sequence
+from src.domain.entities import ChunkBatch, ChunkBatchBuilder, CodeChunk
+from src.domain.structure import LineTable, Unit, brace_units, pack_units, python_units
+from src.domain.tokens import TokenCounter
+from src.app.core import telemetry
 from src.app.core.config import settings
 from src.app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
 
+@dataclass
+class ChunkingStats:
+    """Chunk counts and token-budget utilization for a run"""
+
+    budget: int
+    files: int = 0
+    chunks: int = 0
+    tokens: int = 0
+    small_chunks: int = 0
+    by_type: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, token_counts: Sequence[int], chunk_type: Optional[str] = None) -> None:
+        """Account for the chunks of one file"""
+        self.files += 1
+        self.chunks += len(token_counts)
+        self.tokens += sum(token_counts)
+        self.small_chunks += sum(1 for n in token_counts if n < self.budget // 4)
+        if chunk_type and token_counts:
+            self.by_type[chunk_type] = self.by_type.get(chunk_type, 0) + len(token_counts)
+
+    @property
+    def utilization(self) -> float:
+        """Mean fraction of the token budget filled per chunk"""
+        return self.tokens / (self.chunks * self.budget) if self.chunks else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "files": self.files,
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "budget": self.budget,
+            "mean_tokens": self.tokens / self.chunks if self.chunks else 0.0,
+            "utilization": self.utilization,
+            "small_chunks": self.small_chunks,
+            "by_type": dict(self.by_type),
+        }
+
+
 class CodeChunker:
     """Intelligent code chunking with language awareness"""
 
@@ -30,10 +70,18 @@ class CodeChunker:
         ".json": "json",
     }
 
-    def __init__(self, max_tokens: int = None, overlap: int = None):
+    def __init__(
+        self,
+        max_tokens: int = None,
+        overlap: int = None,
+        token_counter: Optional[TokenCounter] = None,
+    ):
         self.max_tokens = max_tokens or settings.max_tokens
         self.overlap = overlap or settings.chunk_overlap
+        self.tokens = token_counter or TokenCounter()
+        self.stats = ChunkingStats(self.max_tokens)
 
+    @telemetry.timed("chunker_file_seconds", "Time to read and chunk one file")
     def chunk_file(self, file_path: Path) -> List[CodeChunk]:
         """Chunk a single file into semantic units"""
         if not file_path.exists():
@@ -46,17 +94,38 @@ class CodeChunker:
             logger.error(f"Error reading {file_path}: {e}")
             return []
 
+        chunks = self.chunk_text(content, file_path)
+        telemetry.observe("chunker_chunks_per_file", len(chunks), telemetry.SIZE_BUCKETS)
+        return chunks
+
+    def chunk_batch(self, files: Iterable[Path]) -> ChunkBatch:
+        """Chunk files straight into one columnar batch"""
+        builder = ChunkBatchBuilder()
+        for file_path in files:
+            for chunk in self.chunk_file(Path(file_path)):
+                builder.append_chunk(chunk)
+        return builder.build()
+
+    def chunk_text(self, content: str, file_path: Path) -> List[CodeChunk]:
+        """Chunk already-loaded file content into semantic units"""
         language = self._detect_language(file_path)
         chunks = []
 
+        # Per-line token counts, so any line range can be measured in O(1)
+        table = LineTable(content, self.tokens.count_many)
+
         # For code files, try to chunk by functions/classes
         if language in ["python", "javascript", "typescript", "go", "java"]:
-            chunks = self._chunk_by_structure(content, file_path, language)
+            chunks = self._chunk_by_structure(content, table, file_path, language)
 
         # Fallback to sliding window if structural chunking fails or for other files
         if not chunks:
-            chunks = self._chunk_by_window(content, file_path, language)
+            chunks = self._chunk_by_window(table, file_path, language)
 
+        self.stats.record(
+            [c.metadata["tokens"] for c in chunks],
+            chunks[0].metadata["chunk_type"] if chunks else None,
+        )
         return chunks
 
     def _detect_language(self, file_path: Path) -> str:
@@ -65,66 +134,88 @@ class CodeChunker:
         return self.LANGUAGE_EXTENSIONS.get(ext, "text")
 
     def _chunk_by_structure(
-        self, content: str, file_path: Path, language: str
+        self, content: str, table: LineTable, file_path: Path, language: str
     ) -> List[CodeChunk]:
         """Chunk code by structural elements (functions, classes)"""
-        chunks = []
+        units = None
 
         if language == "python":
-            pattern = r"^(class |def |async def ).*?(?=^(?:class |def |async def |\Z))"
-            matches = re.finditer(pattern, content, re.MULTILINE | re.DOTALL)
-
-            for match in matches:
-                chunk_content = match.group(0).strip()
-                if len(chunk_content.split()) <= self.max_tokens * 1.5:
-                    start_line = content[: match.start()].count("\n") + 1
-                    end_line = start_line + chunk_content.count("\n")
-
-                    chunk = CodeChunk(
-                        id=self._generate_chunk_id(file_path, start_line),
-                        content=chunk_content,
-                        file_path=str(file_path),
-                        language=language,
-                        start_line=start_line,
-                        end_line=end_line,
-                        metadata={"chunk_type": "structural"},
-                    )
-                    chunks.append(chunk)
+            units = python_units(content, table, self.max_tokens)
+        elif language in ("javascript", "typescript", "go", "java"):
+            units = brace_units(content, table, language, self.max_tokens)
 
-        return chunks
+        if not units:
+            return []
+        # Pack small adjacent units (imports, getters, constants) into fuller chunks
+        units = pack_units(units, table, self.max_tokens)
+        return [self._unit_to_chunk(u, table, file_path, language) for u in units]
+
+    def _unit_to_chunk(
+        self, unit: Unit, table: LineTable, file_path: Path, language: str
+    ) -> CodeChunk:
+        """Build a chunk from a structural unit"""
+        chunk_content = table.text(unit.start_line, unit.end_line)
+        metadata = {
+            "chunk_type": "structural",
+            "kind": unit.kind,
+            "tokens": table.cost(unit.start_line, unit.end_line),
+        }
+        if unit.symbol:
+            metadata["symbol"] = unit.symbol
+        if unit.part:
+            metadata["part"] = unit.part
+        return CodeChunk(
+            id=self._generate_chunk_id(file_path, unit.start_line, chunk_content),
+            content=chunk_content,
+            file_path=str(file_path),
+            language=language,
+            start_line=unit.start_line,
+            end_line=unit.end_line,
+            metadata=metadata,
+        )
 
     def _chunk_by_window(
-        self, content: str, file_path: Path, language: str
+        self, table: LineTable, file_path: Path, language: str
     ) -> List[CodeChunk]:
-        """Fallback sliding window chunking"""
+        """Fallback sliding window chunking, sized in tokens"""
         chunks = []
-        lines = content.split("\n")
+        n = len(table)
 
-        window_lines = max(1, self.max_tokens // 10)
-        overlap_lines = max(1, self.overlap // 10)
-
-        i = 0
-        while i < len(lines):
-            chunk_lines = lines[i : i + window_lines]
-            chunk_content = "\n".join(chunk_lines)
+        i = 1
+        while i <= n:
+            # Grow the window while it fits the token budget (always >= 1 line)
+            j = i
+            while j < n and table.cost(i, j + 1) <= self.max_tokens:
+                j += 1
 
+            chunk_content = table.text(i, j)
             if chunk_content.strip():
                 chunk = CodeChunk(
-                    id=self._generate_chunk_id(file_path, i + 1),
+                    id=self._generate_chunk_id(file_path, i, chunk_content),
                     content=chunk_content,
                     file_path=str(file_path),
                     language=language,
-                    start_line=i + 1,
-                    end_line=min(i + window_lines, len(lines)),
-                    metadata={"chunk_type": "window"},
+                    start_line=i,
+                    end_line=j,
+                    metadata={"chunk_type": "window", "tokens": table.cost(i, j)},
                 )
                 chunks.append(chunk)
 
-            i += window_lines - overlap_lines
+            if j >= n:
+                break
+            # Start the next window so that about `overlap` tokens repeat
+            k = j + 1
+            while k - 1 > i and table.cost(k - 1, j) <= self.overlap:
+                k -= 1
+            i = k
 
         return chunks
 
-    def _generate_chunk_id(self, file_path: Path, start_line: int) -> str:
-        """Generate unique chunk ID"""
-        unique_str = f"{file_path}:{start_line}:{time.time()}"
-        return hashlib.md5(unique_str.encode()).hexdigest()[:12]
+    def _generate_chunk_id(self, file_path: Path, start_line: int, content: str) -> str:
+        """Generate a deterministic, content-derived chunk ID
+
+        The same file, position and content always hash to the same ID, so
+        unchanged chunks keep their ID across runs and re-indexing can skip them.
+        """
+        unique_str = f"{file_path}:{start_line}:{content}"
+        return hashlib.md5(unique_str.encode("utf-8", errors="ignore")).hexdigest()[:16]
@@ -0,0 +1,266 @@
+"""Turns search hits into a compact, deduplicated LLM context
+
+Top-k hits overlap: sliding windows repeat `overlap` tokens by design and
+structural chunks can nest (a class and its methods). Sent as they are,
+the same lines reach the prompt two or three times. Assembly runs in
+three steps:
+
+1. merge: hits from the same file whose line ranges overlap or touch become
+   one block, scored by its best hit
+2. dedupe: blocks are ordered by maximal marginal relevance (MMR) over
+   identifier-set similarity, and blocks nearly identical to an
+   already chosen one (copied code, vendored files) are dropped
+3. pack: blocks are taken in that order while they fit the token budget,
+   then emitted best score first
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence
+
+from src.domain.entities import SearchHit
+from src.domain.tokens import heuristic_count
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+
+
+@dataclass
+class ContextBlock:
+    """A contiguous line range of one file, built from one or more hits"""
+
+    file_path: str
+    language: str
+    start_line: int
+    end_line: int
+    content: str
+    score: float
+    chunk_ids: List[str] = field(default_factory=list)
+    tokens: int = 0
+
+    @property
+    def has_lines(self) -> bool:
+        """False for hits without a line range, such as commit summaries"""
+        return self.start_line > 0
+
+    def header(self) -> str:
+        if not self.has_lines:
+            return self.file_path or "(repository)"
+        return f"{self.file_path}:{self.start_line}-{self.end_line}"
+
+    def render(self) -> str:
+        return f"### {self.header()}\n```{self.language}\n{self.content}\n```"
+
+    def to_dict(self) -> Dict:
+        return {
+            "file_path": self.file_path,
+            "language": self.language,
+            "start_line": self.start_line,
+            "end_line": self.end_line,
+            "score": self.score,
+            "chunk_ids": self.chunk_ids,
+            "tokens": self.tokens,
+        }
+
+
+@dataclass
+class ContextStats:
+    """What assembly removed, in hits and tokens"""
+
+    hits: int = 0
+    hit_tokens: int = 0
+    merged: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+    blocks: int = 0
+    tokens: int = 0
+
+    @property
+    def saved_ratio(self) -> float:
+        """Fraction of the hits' tokens that did not reach the context"""
+        return 1.0 - self.tokens / self.hit_tokens if self.hit_tokens else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "hit_tokens": self.hit_tokens,
+            "merged": self.merged,
+            "duplicates": self.duplicates,
+            "over_budget": self.over_budget,
+            "blocks": self.blocks,
+            "tokens": self.tokens,
+            "saved_ratio": self.saved_ratio,
+        }
+
+
+@dataclass
+class AssembledContext:
+    blocks: List[ContextBlock]
+    stats: ContextStats
+
+    def render(self) -> str:
+        return "\n\n".join(block.render() for block in self.blocks)
+
+
+def _block(hit: SearchHit) -> ContextBlock:
+    payload = hit.payload
+    return ContextBlock(
+        file_path=payload.get("file_path", ""),
+        language=payload.get("language", ""),
+        start_line=int(payload.get("start_line") or 0),
+        end_line=int(payload.get("end_line") or 0),
+        content=payload.get("content", ""),
+        score=hit.score,
+        chunk_ids=[hit.id],
+    )
+
+
+def _extend(block: ContextBlock, other: ContextBlock) -> None:
+    """Append the lines of `other` past the end of `block`; ranges must overlap or touch"""
+    if other.end_line > block.end_line:
+        lines = other.content.split("\n")
+        block.content += "\n" + "\n".join(lines[block.end_line - other.start_line + 1:])
+        block.end_line = other.end_line
+    block.score = max(block.score, other.score)
+    block.chunk_ids.extend(other.chunk_ids)
+
+
+def merge_hits(hits: Sequence[SearchHit]) -> List[ContextBlock]:
+    """Merge hits of the same file whose line ranges overlap or are adjacent
+
+    Hits without a line range are kept as they are. Blocks come back best
+    score first.
+    """
+    by_file: Dict[str, List[ContextBlock]] = {}
+    blocks: List[ContextBlock] = []
+    seen = set()
+    for hit in hits:
+        if hit.id in seen:
+            continue
+        seen.add(hit.id)
+        block = _block(hit)
+        if block.has_lines:
+            by_file.setdefault(block.file_path, []).append(block)
+        else:
+            blocks.append(block)
+
+    for file_blocks in by_file.values():
+        file_blocks.sort(key=lambda b: (b.start_line, -b.end_line))
+        current = file_blocks[0]
+        for block in file_blocks[1:]:
+            if block.start_line <= current.end_line + 1:
+                _extend(current, block)
+            else:
+                blocks.append(current)
+                current = block
+        blocks.append(current)
+    blocks.sort(key=lambda b: b.score, reverse=True)
+    return blocks
+
+
+def _identifiers(text: str) -> FrozenSet[str]:
+    return frozenset(_WORD.findall(text))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ContextAssembler:
+    """Merges, deduplicates and packs search hits into a token budget
+
+    `diversity` is MMR's trade-off: 0 orders by score alone, higher values
+    prefer blocks unlike those already chosen. Blocks at least
+    `duplicate_threshold` similar to a chosen block are dropped.
+    `count_tokens` should match the LLM's tokenizer where one is available.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        diversity: float = 0.3,
+        duplicate_threshold: float = 0.85,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.diversity = diversity
+        self.duplicate_threshold = duplicate_threshold
+        self.count_tokens = count_tokens or heuristic_count
+
+    def assemble(
+        self, hits: Sequence[SearchHit], max_tokens: Optional[int] = None
+    ) -> AssembledContext:
+        stats = ContextStats(hits=len(hits))
+        # What the hits would cost sent one by one, as blocks of their own
+        stats.hit_tokens = sum(self.count_tokens(_block(h).render()) for h in hits)
+        blocks = merge_hits(hits)
+        stats.merged = len(hits) - len(blocks)
+
+        ranked = self._mmr(blocks, stats)
+        packed = self._pack(ranked, max_tokens or self.max_tokens, stats)
+        packed.sort(key=lambda b: b.score, reverse=True)
+        stats.blocks = len(packed)
+        stats.tokens = sum(b.tokens for b in packed)
+        return AssembledContext(packed, stats)
+
+    def _mmr(self, blocks: List[ContextBlock], stats: ContextStats) -> List[ContextBlock]:
+        """Blocks in MMR order, without near-duplicates"""
+        if not blocks:
+            return []
+        top = max(b.score for b in blocks) or 1.0
+        words = [_identifiers(b.content) for b in blocks]
+        # Highest similarity of each remaining block to any chosen one
+        closest = [0.0] * len(blocks)
+        remaining = list(range(len(blocks)))
+        chosen: List[int] = []
+        while remaining:
+            best = max(
+                remaining,
+                key=lambda i: (1 - self.diversity) * blocks[i].score / top
+                - self.diversity * closest[i],
+            )
+            remaining.remove(best)
+            chosen.append(best)
+            kept = []
+            for i in remaining:
+                closest[i] = max(closest[i], jaccard(words[i], words[best]))
+                if closest[i] >= self.duplicate_threshold:
+                    stats.duplicates += 1
+                else:
+                    kept.append(i)
+            remaining = kept
+        return [blocks[i] for i in chosen]
+
+    def _pack(
+        self, blocks: List[ContextBlock], budget: int, stats: ContextStats
+    ) -> List[ContextBlock]:
+        """Greedily keep blocks that fit; the first block is cut to fit if needed"""
+        packed: List[ContextBlock] = []
+        used = 0
+        for block in blocks:
+            block.tokens = self.count_tokens(block.render())
+            if used + block.tokens > budget and not packed:
+                self._truncate(block, budget)
+            if used + block.tokens > budget:
+                stats.over_budget += 1
+                continue
+            packed.append(block)
+            used += block.tokens
+        return packed
+
+    def _truncate(self, block: ContextBlock, budget: int) -> None:
+        """Drop trailing lines until the rendered block fits `budget` tokens"""
+        lines = block.content.split("\n")
+        lo, hi = 0, len(lines)
+        while lo < hi:  # longest prefix that fits
+            mid = (lo + hi + 1) // 2
+            block.content = "\n".join(lines[:mid])
+            if self.count_tokens(block.render()) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        block.content = "\n".join(lines[:lo])
+        if block.has_lines:
+            block.end_line = block.start_line + max(lo - 1, 0)
+        block.tokens = self.count_tokens(block.render()) if lo else budget + 1
@@ -0,0 +1,242 @@
+"""Tiered embedding cache: bounded in-memory LRU over a memory-mapped disk store"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+KEY_SIZE = 16
+
+
+def content_key(text: str, normalized: bool = True) -> bytes:
+    """16-byte content hash used as the cache key for a text
+
+    Raw and normalized embeddings of the same text get different keys; the
+    normalized key is the plain hash, so stores written before stay valid.
+    """
+    person = b"" if normalized else b"raw"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_SIZE, person=person).digest()
+
+
+@dataclass
+class CacheStats:
+    """Cache counters; `hits` counts both memory and disk hits"""
+
+    hits: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    disk_writes: int = 0
+    memory_bytes: int = 0
+    memory_items: int = 0
+
+    def as_dict(self) -> Dict:
+        data = asdict(self)
+        lookups = self.hits + self.misses
+        data["hit_ratio"] = self.hits / lookups if lookups else 0.0
+        return data
+
+
+class LRUEmbeddingCache:
+    """In-memory LRU bounded by the total bytes of the stored vectors"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.evictions = 0
+        self._items: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        vec = self._items.get(key)
+        if vec is not None:
+            self._items.move_to_end(key)
+        return vec
+
+    def put(self, key: bytes, vec: np.ndarray) -> None:
+        if vec.nbytes > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self._items[key] = vec
+        self.nbytes += vec.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class DiskEmbeddingStore:
+    """Append-only, memory-mapped embedding store for one model
+
+    Layout under `<root>/<model-slug>/`:
+      keys.bin     16-byte content keys, one per row
+      vectors.bin  float32 rows of `dim` values, same order as keys.bin
+      meta.json    model name and dimension
+
+    Vectors are written before their keys, so a key on disk always has a
+    complete row. Writers append under an exclusive `flock`; readers only
+    mmap the files, so any number of worker processes share the same pages
+    through the OS page cache and pick up rows appended by others on a miss.
+    """
+
+    def __init__(self, root: Path, model_name: str, read_only: bool = False):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+        self.dir = Path(root) / slug
+        self.model_name = model_name
+        self.read_only = read_only
+        self.dim: Optional[int] = None
+        self._keys_path = self.dir / "keys.bin"
+        self._vectors_path = self.dir / "vectors.bin"
+        self._meta_path = self.dir / "meta.json"
+        self._lock_path = self.dir / ".lock"
+        self._index: Dict[bytes, int] = {}
+        self._keys_bytes = 0
+        self._vectors: Optional[np.memmap] = None
+        if not read_only:
+            self.dir.mkdir(parents=True, exist_ok=True)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Pick up rows appended since the last refresh"""
+        if self.dim is None and self._meta_path.exists():
+            self.dim = int(json.loads(self._meta_path.read_text())["dim"])
+        if self.dim is None:
+            return
+        try:
+            keys_size = os.path.getsize(self._keys_path)
+        except OSError:
+            return
+        keys_size -= keys_size % KEY_SIZE
+        if keys_size <= self._keys_bytes:
+            return
+
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_bytes)
+            new_keys = f.read(keys_size - self._keys_bytes)
+        row = self._keys_bytes // KEY_SIZE
+        for off in range(0, len(new_keys), KEY_SIZE):
+            self._index.setdefault(new_keys[off : off + KEY_SIZE], row)
+            row += 1
+        self._keys_bytes = keys_size
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r", shape=(row, self.dim)
+        )
+
+    def get(self, key: bytes, refresh: bool = True) -> Optional[np.ndarray]:
+        """Vector for `key`; on a miss, rows appended since are picked up first
+
+        Callers looking up many keys refresh once and pass `refresh=False`.
+        """
+        row = self._index.get(key)
+        if row is None and refresh:
+            self.refresh()
+            row = self._index.get(key)
+        return None if row is None else np.array(self._vectors[row])
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence[np.ndarray]) -> int:
+        """Append vectors for keys not yet on disk; returns rows written"""
+        if self.read_only or not keys:
+            return 0
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                dim = int(np.asarray(vectors[0]).shape[-1])
+                if self.dim is None:
+                    self.dim = dim
+                    self._meta_path.write_text(
+                        json.dumps({"model": self.model_name, "dim": dim})
+                    )
+                elif dim != self.dim:
+                    raise ValueError(
+                        f"Embedding dim {dim} does not match store dim {self.dim}"
+                    )
+
+                fresh, rows, queued = [], [], set()
+                for key, vec in zip(keys, vectors):
+                    if key not in self._index and key not in queued:
+                        queued.add(key)
+                        fresh.append(key)
+                        rows.append(np.asarray(vec, dtype=np.float32))
+                if not fresh:
+                    return 0
+                with open(self._vectors_path, "ab") as vf:
+                    vf.write(np.stack(rows).tobytes())
+                with open(self._keys_path, "ab") as kf:
+                    kf.write(b"".join(fresh))
+                self.refresh()
+                return len(fresh)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class TieredEmbeddingCache:
+    """Memory LRU in front of an optional disk store, with hit/miss counters"""
+
+    def __init__(self, max_bytes: int, store: Optional[DiskEmbeddingStore] = None):
+        self.memory = LRUEmbeddingCache(max_bytes)
+        self.store = store
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        """Look up keys, promoting disk hits into memory"""
+        found: List[Optional[np.ndarray]] = []
+        refreshed = self.store is None
+        with self._lock:
+            for key in keys:
+                vec = self.memory.get(key)
+                if vec is None and not refreshed:
+                    # One stat of the keys file per call, not one per miss
+                    self.store.refresh()
+                    refreshed = True
+                if vec is not None:
+                    self._stats.memory_hits += 1
+                elif self.store is not None and (
+                    vec := self.store.get(key, refresh=False)
+                ) is not None:
+                    self._stats.disk_hits += 1
+                    self.memory.put(key, vec)
+                else:
+                    self._stats.misses += 1
+                found.append(vec)
+        return found
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence[np.ndarray]) -> None:
+        with self._lock:
+            for key, vec in zip(keys, vectors):
+                self.memory.put(key, vec)
+            if self.store is not None:
+                try:
+                    self._stats.disk_writes += self.store.put_many(keys, vectors)
+                except Exception as e:
+                    logger.warning(f"Embedding store write failed: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._stats.hits = self._stats.memory_hits + self._stats.disk_hits
+            self._stats.evictions = self.memory.evictions
+            self._stats.memory_bytes = self.memory.nbytes
+            self._stats.memory_items = len(self.memory)
+            return self._stats.as_dict()
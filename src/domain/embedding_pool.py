@@ -0,0 +1,286 @@
+"""Multi-process CPU embedding with results written to shared memory"""
+
+import atexit
+import functools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def load_sentence_transformer(name: str, cache_dir: Optional[str] = None):
+    """Model factory for pool workers; picklable through functools.partial"""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(name, cache_folder=cache_dir, device="cpu")
+
+
+def core_sets(processes: int, cores_per_process: Optional[int] = None) -> List[List[int]]:
+    """Split the cores this process may use into one set per worker
+
+    Sets wrap around when there are fewer cores than asked for, so workers
+    share cores rather than fail.
+    """
+    try:
+        cores = sorted(os.sched_getaffinity(0))
+    except AttributeError:  # not Linux
+        cores = list(range(os.cpu_count() or 1))
+    per = cores_per_process or max(1, len(cores) // processes)
+    return [
+        [cores[(i * per + j) % len(cores)] for j in range(per)] for i in range(processes)
+    ]
+
+
+@contextmanager
+def _thread_env(threads: int):
+    """Environment for a child, so its BLAS/OpenMP pools start at `threads`"""
+    saved = {name: os.environ.get(name) for name in _THREAD_ENV}
+    os.environ.update({name: str(threads) for name in _THREAD_ENV})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _worker_main(factory: Callable, cores: List[int], tasks, results) -> None:
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+        try:
+            import torch
+
+            torch.set_num_threads(len(cores))
+        except ImportError:
+            pass
+        model = factory()
+        dim = int(np.asarray(model.encode(["warm up"], batch_size=1)).shape[1])
+    except Exception as e:
+        results.put(("failed", os.getpid(), f"{type(e).__name__}: {e}"))
+        return
+    results.put(("ready", os.getpid(), dim))
+
+    attached: Dict[str, shared_memory.SharedMemory] = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, name, capacity, row, texts, normalize = task
+        started = time.perf_counter()
+        try:
+            shm = attached.get(name)
+            if shm is None:
+                for old in attached.values():
+                    old.close()
+                attached = {name: shared_memory.SharedMemory(name=name)}
+                shm = attached[name]
+            vectors = model.encode(
+                texts, batch_size=len(texts), show_progress_bar=False,
+                normalize_embeddings=normalize,
+            )
+            # A temporary view, so no export of shm.buf outlives this line
+            np.ndarray((capacity, dim), dtype=np.float32, buffer=shm.buf)[
+                row:row + len(texts)
+            ] = vectors
+        except Exception as e:
+            results.put(("error", task_id, f"{type(e).__name__}: {e}"))
+            continue
+        results.put(("done", task_id, time.perf_counter() - started))
+    for shm in attached.values():
+        shm.close()
+
+
+class ProcessEmbeddingPool:
+    """SentenceTransformer-compatible model that runs on a pool of processes
+
+    Each worker process is pinned to its own set of cores (`core_sets`),
+    with BLAS/OpenMP and torch threads limited to that set, and loads its
+    own model copy from `factory`, a picklable zero-argument callable.
+    Batches go to whichever worker is free; the worker writes its rows
+    straight into a shared-memory matrix owned by this process and sends
+    back only a completion message, so no arrays are pickled.
+
+    `encode` splits its texts evenly across the workers; `encode_batches`
+    runs already planned batches (EmbeddingManager uses it with its
+    token-budget plan). Workers start on first use, in the process that
+    uses the pool, so a pool created before a fork is never shared.
+    """
+
+    def __init__(
+        self,
+        factory: Callable,
+        processes: int = 2,
+        cores_per_process: Optional[int] = None,
+        start_method: str = "spawn",
+        start_timeout: float = 600.0,
+    ):
+        self.factory = factory
+        self.processes = processes
+        self.cores_per_process = cores_per_process
+        self.start_method = start_method
+        self.start_timeout = start_timeout
+        self.dim: Optional[int] = None
+        # Set by the owner to get exact token counts for batch planning
+        self.tokenizer = None
+        self.max_seq_length: Optional[int] = None
+        self._workers: List = []
+        self._owner: Optional[int] = None
+        self._lock = threading.Lock()
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._capacity = 0
+        self._next_task = 0
+
+    def _ensure_started(self) -> None:
+        if self._workers and self._owner == os.getpid():
+            return
+        self._workers, self._shm, self._capacity = [], None, 0  # inherited: not ours
+        ctx = multiprocessing.get_context(self.start_method)
+        self._tasks, self._results = ctx.Queue(), ctx.Queue()
+        started = time.perf_counter()
+        for cores in core_sets(self.processes, self.cores_per_process):
+            process = ctx.Process(
+                target=_worker_main,
+                args=(self.factory, cores, self._tasks, self._results),
+                name="embed-worker",
+                daemon=True,
+            )
+            with _thread_env(len(cores)):
+                process.start()
+            self._workers.append(process)
+        self._owner = os.getpid()
+        atexit.register(self.close)
+        for _ in self._workers:
+            kind, pid, value = self._next_result(self.start_timeout)
+            if kind == "failed":
+                self.close()
+                raise RuntimeError(f"Embedding worker {pid} failed to start: {value}")
+            self.dim = value
+        logger.info(
+            f"Started {len(self._workers)} embedding workers in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+
+    def _next_result(self, timeout: Optional[float] = None) -> Tuple:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [p for p in self._workers if not p.is_alive()]
+                if dead:
+                    self.close()
+                    raise RuntimeError(
+                        f"Embedding worker {dead[0].pid} exited with code {dead[0].exitcode}"
+                    )
+                if deadline is not None and time.monotonic() > deadline:
+                    self.close()
+                    raise TimeoutError("Embedding workers did not start in time")
+
+    def _output(self, rows: int) -> np.ndarray:
+        """Shared (rows, dim) float32 matrix, grown by doubling and reused"""
+        if rows > self._capacity:
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+            self._capacity = max(rows, 2 * self._capacity)
+            self._shm = shared_memory.SharedMemory(
+                create=True, size=self._capacity * self.dim * 4
+            )
+        return np.ndarray((self._capacity, self.dim), dtype=np.float32, buffer=self._shm.buf)
+
+    def encode_batches(
+        self, batches: Sequence[Sequence[str]], normalize_embeddings: bool = True
+    ) -> Tuple[List[np.ndarray], List[float]]:
+        """Embed each batch on some worker; returns per-batch matrices and worker seconds"""
+        with self._lock:
+            self._ensure_started()
+            total = sum(len(b) for b in batches)
+            out = self._output(total)
+            first = self._next_task
+            row = 0
+            offsets = []
+            for i, batch in enumerate(batches):
+                self._tasks.put((
+                    first + i, self._shm.name, self._capacity, row, list(batch),
+                    normalize_embeddings,
+                ))
+                offsets.append(row)
+                row += len(batch)
+            self._next_task += len(batches)
+
+            seconds: List[float] = [0.0] * len(batches)
+            errors = []
+            for _ in batches:
+                kind, task_id, value = self._next_result()
+                if kind == "error":
+                    errors.append(value)
+                else:
+                    seconds[task_id - first] = value
+            if errors:
+                raise RuntimeError(f"Embedding failed in a worker: {errors[0]}")
+            result = out[:total].copy()
+            del out
+        return [result[o:o + len(b)] for o, b in zip(offsets, batches)], seconds
+
+    def encode(
+        self,
+        texts,
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        normalize_embeddings: bool = True,
+    ) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        size = max(1, min(batch_size, -(-len(texts) // self.processes)))
+        batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+        matrices, _ = self.encode_batches(batches, normalize_embeddings)
+        return np.concatenate(matrices)
+
+    def close(self) -> None:
+        if self._owner != os.getpid():
+            return
+        for _ in self._workers:
+            self._tasks.put(None)
+        for process in self._workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._workers = []
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm, self._capacity = None, 0
+        self._owner = None
+
+    def __enter__(self) -> "ProcessEmbeddingPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def sentence_transformer_pool(
+    name: str, cache_dir: Optional[str], processes: int, cores_per_process: Optional[int] = None
+) -> ProcessEmbeddingPool:
+    return ProcessEmbeddingPool(
+        functools.partial(load_sentence_transformer, name, cache_dir),
+        processes=processes,
+        cores_per_process=cores_per_process,
+    )
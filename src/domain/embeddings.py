@@ -1,38 +1,144 @@
-from sentence_transformers import SentenceTransformer
-import hashlib
+from typing import Dict, List, Optional
 import threading
+import time
 
+from src.app.core import telemetry
+from src.app.core.config import settings
+from src.app.core.logging import get_logger
+from src.domain.batching import EncodeStats, estimate_tokens, plan_batches
+from src.domain.embedding_cache import (
+    DiskEmbeddingStore,
+    TieredEmbeddingCache,
+    content_key,
+)
+from src.domain.ports import Embedder
 
-class EmbeddingManager:
+logger = get_logger(__name__)
+
+
+class EmbeddingManager(Embedder):
     """Manages embeddings generation with caching to avoid redundant computations."""
 
-    def __init__(self, model_name: str = None, cache_dir: str = None):
+    def __init__(
+        self,
+        model_name: str = None,
+        cache_dir: str = None,
+        cache_max_bytes: Optional[int] = None,
+        store_dir: Optional[str] = None,
+        model=None,
+    ):
         self.model_name = model_name or "BAAI/bge-m3"
         self.cache_dir = cache_dir or "./model_cache"
-        self.model = SentenceTransformer(self.model_name, cache_folder=self.cache_dir)
-        self.cache = {}
-        self.lock = threading.Lock()
+        if model is None:
+            # Imported here so a caller-supplied model needs no torch install
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(self.model_name, cache_folder=self.cache_dir)
+        # Anything with SentenceTransformer's encode() signature
+        self.model = model
+
+        # Memory LRU bounded by bytes, backed by a shared on-disk store if configured
+        store_dir = store_dir or settings.embedding_store_dir
+        store = DiskEmbeddingStore(store_dir, self.model_name) if store_dir else None
+        self.cache = TieredEmbeddingCache(
+            cache_max_bytes or settings.embedding_cache_max_bytes, store
+        )
+
+        self.token_budget = settings.embedding_batch_tokens
+        self.stats = EncodeStats()
+        self._stats_lock = threading.Lock()
+
+    def warm_up(self, texts: List[str]) -> float:
+        """Run the model on `texts` once as a single text and once as a batch
+
+        Bypasses the cache and the stats, so the first real request does not
+        pay for lazy initialization and allocator growth. Returns seconds.
+        """
+        started = time.perf_counter()
+        for batch in (texts[:1], texts):
+            self.model.encode(
+                batch, batch_size=len(batch), show_progress_bar=False, normalize_embeddings=True
+            )
+        return time.perf_counter() - started
+
+    def _get_cache_key(self, text: str, normalized: bool = True) -> bytes:
+        """Generate a cache key for a given text from its content hash."""
+        return content_key(text, normalized)
 
-    def _get_cache_key(self, text: str) -> str:
-        """Generate a cache key for a given text using MD5."""
-        return hashlib.md5(text.encode("utf-8")).hexdigest()
+    def cache_stats(self) -> Dict:
+        """Hit/miss/eviction counters of the embedding cache."""
+        return self.cache.stats()
 
+    def throughput_stats(self) -> Dict:
+        """Cumulative texts/sec and padding counters of model forward passes."""
+        with self._stats_lock:
+            return self.stats.as_dict()
+
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        """Tokenized length of each text, as the model will see it."""
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return [estimate_tokens(t) for t in texts]
+        max_length = getattr(self.model, "max_seq_length", None)
+        encoded = tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=max_length is not None,
+            max_length=max_length,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _run_batches(self, plan, texts, show_progress_bar, normalize_embeddings):
+        """Yield (batch, embeddings, seconds) for each planned batch of indexes into `texts`.
+
+        A model with `encode_batches` (ProcessEmbeddingPool) gets the whole
+        plan at once and runs batches concurrently; each batch is then
+        charged its share of the wall time, so throughput stats stay real.
+        """
+        if hasattr(self.model, "encode_batches"):
+            started = time.perf_counter()
+            results, busy = self.model.encode_batches(
+                [[texts[j] for j in batch] for batch in plan], normalize_embeddings
+            )
+            elapsed = time.perf_counter() - started
+            total = sum(busy) or 1.0
+            for batch, batch_embeddings, seconds in zip(plan, results, busy):
+                telemetry.observe("embedding_forward_seconds", seconds)
+                yield batch, batch_embeddings, elapsed * seconds / total
+            return
+        for batch in plan:
+            started = time.perf_counter()
+            batch_embeddings = self.model.encode(
+                [texts[j] for j in batch],
+                batch_size=len(batch),
+                show_progress_bar=show_progress_bar,
+                normalize_embeddings=normalize_embeddings,
+            )
+            elapsed = time.perf_counter() - started
+            telemetry.observe("embedding_forward_seconds", elapsed)
+            yield batch, batch_embeddings, elapsed
+
+    @telemetry.timed("embedding_encode_seconds", "Time of one encode() call, cache included")
     def encode(
         self,
         texts,
         batch_size: int = 32,
         show_progress_bar: bool = False,
         normalize_embeddings: bool = True,
+        token_budget: Optional[int] = None,
     ):
         """Encode one or more texts into embeddings with caching.
 
         If a text has been encoded before, return the cached embedding.
+        Uncached texts are sorted by token length and grouped into batches
+        whose padded size fits `token_budget`, then returned in input order.
 
         Args:
             texts (str or List[str]): The input text(s) to encode.
-            batch_size (int): Batch size for encoding (if needed).
+            batch_size (int): Maximum number of texts per forward pass.
             show_progress_bar (bool): Whether to show a progress bar.
             normalize_embeddings (bool): Whether to normalize embeddings.
+            token_budget (int): Padded tokens per forward pass (default from settings).
 
         Returns:
             np.ndarray or List[np.ndarray]: The embedding(s) for the input text(s).
@@ -42,34 +148,40 @@ class EmbeddingManager:
             texts = [texts]
             single_input = True
 
-        # Prepare list for embeddings and track indexes to encode
-        embeddings = [None] * len(texts)
+        # Look up every text in the cache and track indexes to encode
+        keys = [self._get_cache_key(text, normalize_embeddings) for text in texts]
+        embeddings = self.cache.get_many(keys)
         texts_to_encode = []
         index_map = {}
 
-        with self.lock:
-            for i, text in enumerate(texts):
-                key = self._get_cache_key(text)
-                if key in self.cache:
-                    embeddings[i] = self.cache[key]
-                else:
-                    index_map[i] = key
-                    texts_to_encode.append(text)
+        for i, text in enumerate(texts):
+            if embeddings[i] is None:
+                index_map[i] = keys[i]
+                texts_to_encode.append(text)
+        telemetry.count("embedding_cache_lookups_total", len(texts) - len(texts_to_encode),
+                        result="hit")
+        telemetry.count("embedding_cache_lookups_total", len(texts_to_encode), result="miss")
 
         # Only encode texts that were not cached
         if texts_to_encode:
-            new_embeddings = self.model.encode(
-                texts_to_encode,
-                batch_size=batch_size,
-                show_progress_bar=show_progress_bar,
-                normalize_embeddings=normalize_embeddings,
+            new_embeddings = [None] * len(texts_to_encode)
+            lengths = self._token_lengths(texts_to_encode)
+            plan = plan_batches(lengths, token_budget or self.token_budget, batch_size)
+            for batch, batch_embeddings, elapsed in self._run_batches(
+                plan, texts_to_encode, show_progress_bar, normalize_embeddings
+            ):
+                telemetry.observe("embedding_batch_size", len(batch), telemetry.SIZE_BUCKETS)
+                with self._stats_lock:
+                    self.stats.record([lengths[j] for j in batch], elapsed)
+                for j, embedding in zip(batch, batch_embeddings):
+                    new_embeddings[j] = embedding
+
+            logger.debug(
+                f"Encoded {len(texts_to_encode)} texts in {len(plan)} batches "
+                f"({self.stats.texts_per_sec:.1f} texts/sec overall)"
             )
-            with self.lock:
-                j = 0
-                for i in index_map:
-                    key = index_map[i]
-                    self.cache[key] = new_embeddings[j]
-                    embeddings[i] = new_embeddings[j]
-                    j += 1
+            for j, i in enumerate(index_map):
+                embeddings[i] = new_embeddings[j]
+            self.cache.put_many(list(index_map.values()), new_embeddings)
 
         return embeddings[0] if single_input else embeddings
@@ -1,13 +1,23 @@
 """Data models for code chunks"""
 
+import json
+import sys
+from array import array
 from dataclasses import dataclass, field
-from typing import Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 import numpy as np
 
+_decode_json = json.JSONDecoder().decode
 
-@dataclass
+
+@dataclass(slots=True)
 class CodeChunk:
-    """Represents a chunk of code or documentation"""
+    """Represents a chunk of code or documentation
+
+    Slotted, with `file_path` and `language` interned: the many chunks of one
+    file share a single path string. For large numbers of chunks use
+    ChunkBatch instead.
+    """
 
     id: str
     content: str
@@ -18,6 +28,10 @@ class CodeChunk:
     metadata: Dict = field(default_factory=dict)
     embedding: Optional[np.ndarray] = None
 
+    def __post_init__(self):
+        self.file_path = sys.intern(str(self.file_path))
+        self.language = sys.intern(self.language)
+
     def to_dict(self) -> Dict:
         """Convert to dictionary for storage"""
         return {
@@ -42,3 +56,300 @@ class CodeChunk:
             end_line=data["end_line"],
             metadata=data.get("metadata", {}),
         )
+
+
+class ChunkBatch(Sequence[CodeChunk]):
+    """Columnar, compact storage for many chunks
+
+    Contents and metadata values (as compact JSON arrays) are concatenated
+    into two UTF-8 buffers addressed by offset arrays; IDs are a fixed-width
+    byte array; file paths, languages and metadata key sets are
+    dictionary-encoded; line numbers are int32 columns and embeddings, once
+    set, one contiguous float32 matrix. A chunk costs a few dozen bytes
+    beyond its text, against several hundred as a CodeChunk object.
+
+    The buffers may be memoryviews of a mapped file (see ChunkFile), in
+    which case the embeddings keep the file's dtype and nothing is copied
+    until a row is read. Indexing or iterating a batch builds CodeChunk
+    objects on the fly, so it can be passed wherever a sequence of chunks
+    is expected.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        text: bytes,
+        text_offsets: np.ndarray,
+        meta: bytes,
+        meta_offsets: np.ndarray,
+        meta_keys: List[Tuple[str, ...]],
+        meta_key_index: np.ndarray,
+        paths: List[str],
+        path_index: np.ndarray,
+        languages: List[str],
+        language_index: np.ndarray,
+        start_lines: np.ndarray,
+        end_lines: np.ndarray,
+        embeddings: Optional[np.ndarray] = None,
+    ):
+        self._ids = ids
+        self._text = text
+        self._text_offsets = text_offsets
+        self._meta = meta
+        self._meta_offsets = meta_offsets
+        self.meta_keys = meta_keys
+        self.meta_key_index = meta_key_index
+        self.paths = paths
+        self.path_index = path_index
+        self.languages = languages
+        self.language_index = language_index
+        self.start_lines = start_lines
+        self.end_lines = end_lines
+        if embeddings is not None and len(embeddings) != len(ids):
+            raise ValueError(f"{len(embeddings)} embeddings for {len(ids)} chunks")
+        self.embeddings = embeddings
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[CodeChunk]) -> "ChunkBatch":
+        """Pack chunks; embeddings are kept if every chunk has one"""
+        builder = ChunkBatchBuilder()
+        for chunk in chunks:
+            builder.append_chunk(chunk)
+        return builder.build()
+
+    @classmethod
+    def concat(cls, batches: Sequence["ChunkBatch"]) -> "ChunkBatch":
+        builder = ChunkBatchBuilder()
+        for batch in batches:
+            builder.extend(batch)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.select(range(len(self))[i])
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return CodeChunk(
+            id=self.id(i),
+            content=self.content(i),
+            file_path=self.paths[self.path_index[i]],
+            language=self.languages[self.language_index[i]],
+            start_line=int(self.start_lines[i]),
+            end_line=int(self.end_lines[i]),
+            metadata=self.metadata(i),
+            embedding=None if self.embeddings is None else self.embeddings[i],
+        )
+
+    def __iter__(self) -> Iterator[CodeChunk]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def id_array(self) -> np.ndarray:
+        return self._ids
+
+    @property
+    def text_buffer(self):
+        """Concatenated UTF-8 contents; row i is text_offsets[i]:text_offsets[i + 1]"""
+        return self._text
+
+    @property
+    def text_offsets(self) -> np.ndarray:
+        return self._text_offsets
+
+    @property
+    def meta_buffer(self):
+        """Concatenated metadata values as JSON arrays, keyed by meta_keys[meta_key_index]"""
+        return self._meta
+
+    @property
+    def meta_offsets(self) -> np.ndarray:
+        return self._meta_offsets
+
+    def id(self, i: int) -> str:
+        return self._ids[i].decode("ascii")
+
+    @property
+    def ids(self) -> List[str]:
+        return [i.decode("ascii") for i in self._ids.tolist()]
+
+    def content(self, i: int) -> str:
+        return str(self._text[self._text_offsets[i]:self._text_offsets[i + 1]], "utf-8")
+
+    def contents(self) -> List[str]:
+        return [self.content(i) for i in range(len(self))]
+
+    def metadata(self, i: int) -> Dict:
+        raw = self._meta[self._meta_offsets[i]:self._meta_offsets[i + 1]]
+        values = _decode_json(str(raw, "utf-8"))
+        return dict(zip(self.meta_keys[self.meta_key_index[i]], values))
+
+    def file_path(self, i: int) -> str:
+        return self.paths[self.path_index[i]]
+
+    def language(self, i: int) -> str:
+        return self.languages[self.language_index[i]]
+
+    def to_dict(self, i: int) -> Dict:
+        return {
+            "id": self.id(i),
+            "content": self.content(i),
+            "file_path": self.file_path(i),
+            "language": self.language(i),
+            "start_line": int(self.start_lines[i]),
+            "end_line": int(self.end_lines[i]),
+            "metadata": self.metadata(i),
+        }
+
+    def select(self, rows: Iterable[int]) -> "ChunkBatch":
+        """A new batch with the given rows, in the given order"""
+        builder = ChunkBatchBuilder()
+        for i in rows:
+            builder.append_row(self, i)
+        return builder.build()
+
+    def with_embeddings(self, embeddings) -> "ChunkBatch":
+        """The same rows with `embeddings` (one vector per chunk) as a float32 matrix"""
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if len(self) and matrix.ndim != 2:
+            raise ValueError(f"Expected a 2-D embedding matrix, got shape {matrix.shape}")
+        return ChunkBatch(
+            self._ids, self._text, self._text_offsets, self._meta, self._meta_offsets,
+            self.meta_keys, self.meta_key_index, self.paths, self.path_index,
+            self.languages, self.language_index, self.start_lines, self.end_lines, matrix,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns, including text and embeddings"""
+        arrays = [
+            self._ids,
+            self._text_offsets,
+            self._meta_offsets,
+            self.meta_key_index,
+            self.path_index,
+            self.language_index,
+            self.start_lines,
+            self.end_lines,
+        ]
+        total = sum(a.nbytes for a in arrays) + len(self._text) + len(self._meta)
+        total += sum(len(p) for p in self.paths) + sum(len(x) for x in self.languages)
+        if self.embeddings is not None:
+            total += self.embeddings.nbytes
+        return total
+
+
+class ChunkBatchBuilder:
+    """Accumulates rows for a ChunkBatch without keeping chunk objects around"""
+
+    def __init__(self):
+        self._ids: List[bytes] = []
+        self._text = bytearray()
+        self._text_offsets = array("q", [0])
+        self._meta = bytearray()
+        self._meta_offsets = array("q", [0])
+        self._meta_keys: Dict[Tuple[str, ...], int] = {}
+        self._meta_key_index = array("H")
+        self._paths: Dict[str, int] = {}
+        self._path_index = array("I")
+        self._languages: Dict[str, int] = {}
+        self._language_index = array("H")
+        self._start_lines = array("i")
+        self._end_lines = array("i")
+        self._embeddings: Optional[List[np.ndarray]] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _append(self, chunk_id: str, text: bytes, meta: bytes, keys: Tuple[str, ...],
+                file_path: str, language: str, start_line: int, end_line: int,
+                embedding: Optional[np.ndarray]) -> None:
+        self._ids.append(chunk_id.encode("ascii"))
+        self._text += text
+        self._text_offsets.append(len(self._text))
+        self._meta += meta
+        self._meta_offsets.append(len(self._meta))
+        self._meta_key_index.append(self._meta_keys.setdefault(keys, len(self._meta_keys)))
+        self._path_index.append(self._paths.setdefault(file_path, len(self._paths)))
+        self._language_index.append(self._languages.setdefault(language, len(self._languages)))
+        self._start_lines.append(start_line)
+        self._end_lines.append(end_line)
+        if embedding is None:
+            self._embeddings = None
+        elif self._embeddings is not None:
+            self._embeddings.append(embedding)
+
+    def append(
+        self,
+        chunk_id: str,
+        content: str,
+        file_path: str,
+        language: str,
+        start_line: int,
+        end_line: int,
+        metadata: Optional[Dict] = None,
+        embedding: Optional[np.ndarray] = None,
+    ) -> None:
+        metadata = metadata or {}
+        values = json.dumps(list(metadata.values()), ensure_ascii=False, separators=(",", ":"))
+        self._append(chunk_id, content.encode("utf-8"), values.encode("utf-8"),
+                     tuple(metadata), str(file_path), language, start_line, end_line,
+                     embedding)
+
+    def append_chunk(self, chunk: CodeChunk) -> None:
+        self.append(chunk.id, chunk.content, chunk.file_path, chunk.language,
+                    chunk.start_line, chunk.end_line, chunk.metadata, chunk.embedding)
+
+    def append_row(self, batch: ChunkBatch, i: int) -> None:
+        """Copy row `i` of another batch without decoding it"""
+        t, m = batch._text_offsets, batch._meta_offsets
+        self._append(
+            batch.id(i), batch._text[t[i]:t[i + 1]], batch._meta[m[i]:m[i + 1]],
+            batch.meta_keys[batch.meta_key_index[i]], batch.file_path(i), batch.language(i),
+            int(batch.start_lines[i]), int(batch.end_lines[i]),
+            None if batch.embeddings is None else batch.embeddings[i],
+        )
+
+    def extend(self, batch: ChunkBatch) -> None:
+        for i in range(len(batch)):
+            self.append_row(batch, i)
+
+    def build(self) -> ChunkBatch:
+        width = max((len(i) for i in self._ids), default=1)
+        embeddings = None
+        if self._embeddings and len(self._embeddings) == len(self._ids):
+            embeddings = np.ascontiguousarray(np.stack(self._embeddings), dtype=np.float32)
+        return ChunkBatch(
+            np.array(self._ids, dtype=f"S{width}"),
+            bytes(self._text),
+            np.frombuffer(self._text_offsets, dtype=np.int64).copy(),
+            bytes(self._meta),
+            np.frombuffer(self._meta_offsets, dtype=np.int64).copy(),
+            list(self._meta_keys),
+            np.frombuffer(self._meta_key_index, dtype=np.uint16).copy(),
+            list(self._paths),
+            np.frombuffer(self._path_index, dtype=np.uint32).copy(),
+            list(self._languages),
+            np.frombuffer(self._language_index, dtype=np.uint16).copy(),
+            np.frombuffer(self._start_lines, dtype=np.int32).copy(),
+            np.frombuffer(self._end_lines, dtype=np.int32).copy(),
+            embeddings,
+        )
+
+
+@dataclass
+class SearchHit:
+    """A chunk returned by a vector index search"""
+
+    id: str
+    score: float
+    payload: Dict = field(default_factory=dict)
+
+    def to_chunk(self) -> CodeChunk:
+        """Rebuild the chunk from its stored payload"""
+        return CodeChunk.from_dict({"id": self.id, **self.payload})
@@ -0,0 +1,400 @@
+"""Streaming, incremental indexing of git commit history"""
+
+import contextlib
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from src.domain.entities import ChunkBatch, CodeChunk
+from src.domain.pipeline import Emit, Pipeline, PipelineStats
+from src.domain.ports import Embedder, LexicalIndex, VectorIndex
+from src.domain.services import IndexingCancelled
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Commit headers are framed with ASCII separators so subjects and bodies can
+# contain anything else: RS starts a commit, US separates fields, GS ends them
+_RS, _US, _GS = "\x1e", "\x1f", "\x1d"
+_FORMAT = _RS + _US.join(["%H", "%P", "%an", "%ae", "%at", "%s", "%b"]) + _GS
+_NUMSTAT = re.compile(r"(\d+|-)\t(\d+|-)\t(.+)")
+# Definitions on added/removed lines, and in hunk headers, which git fills
+# with the enclosing function or class line
+_DEFINITION = re.compile(
+    r"\b(?:def|class|func|fn|function|interface|struct|enum|trait|type)\s+"
+    r"(?:\([^)]*\)\s*)?([A-Za-z_]\w*)"
+)
+_CALL_SHAPED = re.compile(r"([A-Za-z_]\w*)\s*\(")
+
+
+class GitError(RuntimeError):
+    """A git command failed"""
+
+
+@dataclass
+class FileChange:
+    """Lines changed in one file by a commit; counts are None for binary files"""
+
+    path: str
+    added: Optional[int]
+    deleted: Optional[int]
+
+
+@dataclass
+class Commit:
+    """One commit as streamed from `git log`"""
+
+    sha: str
+    parents: List[str]
+    author: str
+    email: str
+    timestamp: int
+    subject: str
+    body: str
+    files: List[FileChange] = field(default_factory=list)
+    # Path -> definitions the commit changed or whose body it changed
+    symbols: Dict[str, List[str]] = field(default_factory=dict)
+
+    def touch(self, path: Optional[str], name: Optional[str]) -> None:
+        if path and name:
+            names = self.symbols.setdefault(path, [])
+            if name not in names:
+                names.append(name)
+
+
+def git(repo: Path, *args: str) -> str:
+    """Run a git command in `repo` and return its stripped stdout"""
+    try:
+        out = subprocess.run(
+            ["git", "-C", str(repo), *args], capture_output=True, text=True, check=True,
+        )
+    except subprocess.CalledProcessError as e:
+        raise GitError(f"git {' '.join(args)} failed: {e.stderr.strip()}") from e
+    return out.stdout.strip()
+
+
+def list_branches(repo: Path) -> List[str]:
+    out = git(repo, "for-each-ref", "--format=%(refname:short)", "refs/heads")
+    return out.splitlines()
+
+
+def _commit_exists(repo: Path, sha: str) -> bool:
+    try:
+        git(repo, "cat-file", "-e", f"{sha}^{{commit}}")
+    except GitError:
+        return False
+    return True
+
+
+def _hunk_symbol(context: str) -> Optional[str]:
+    match = _DEFINITION.search(context) or _CALL_SHAPED.search(context)
+    return match.group(1) if match else None
+
+
+def _parse_header(text: str) -> Commit:
+    fields = text[: text.index(_GS)].split(_US)
+    if len(fields) != 7:
+        raise GitError(f"Unexpected git log record: {text[:80]!r}")
+    sha, parents, author, email, timestamp, subject, body = fields
+    return Commit(
+        sha=sha,
+        parents=parents.split(),
+        author=author,
+        email=email,
+        timestamp=int(timestamp),
+        subject=subject,
+        body=body.strip(),
+    )
+
+
+def iter_commits(
+    repo: Path, revisions: Sequence[str], symbols: bool = False
+) -> Iterator[Commit]:
+    """Stream commits of `git log <revisions>`, newest first, one at a time
+
+    Output is parsed line by line as git writes it, so memory does not grow
+    with the length of the history. With `symbols=True` a zero-context patch
+    is requested as well, and only its hunk headers and definition lines are
+    kept; git then diffs every commit, so this is opt-in. Merge commits carry
+    no file changes.
+    """
+    args = ["git", "-C", str(repo), "log", f"--format={_FORMAT}", "--numstat", "--no-renames"]
+    if symbols:
+        args += ["-p", "-U0", "--no-color", "--no-ext-diff"]
+    # stderr goes to a file: a pipe nobody drains while stdout is read can
+    # fill up and block git
+    stderr = tempfile.TemporaryFile("w+", encoding="utf-8", errors="replace")
+    proc = subprocess.Popen(
+        [*args, *revisions, "--"],
+        stdout=subprocess.PIPE, stderr=stderr,
+        text=True, encoding="utf-8", errors="replace",
+    )
+    commit: Optional[Commit] = None
+    header: Optional[List[str]] = None
+    # Numstat lines come first, then per file a diff header and its hunks
+    in_patch = in_file_header = False
+    old_path = new_path = None
+    try:
+        for line in proc.stdout:
+            line = line.rstrip("\n")
+            if line.startswith(_RS):
+                if commit is not None:
+                    yield commit
+                commit, header = None, [line[1:]]
+                in_patch = in_file_header = False
+            elif header is not None:
+                header.append(line)
+            if header is not None:
+                if _GS in line:
+                    commit, header = _parse_header("\n".join(header)), None
+                continue
+            if commit is None or not line:
+                continue
+            if line.startswith("diff --git"):
+                in_patch = in_file_header = True
+                old_path = new_path = None
+            elif not in_patch:
+                numstat = _NUMSTAT.fullmatch(line)
+                if numstat:
+                    added, deleted, path = numstat.groups()
+                    commit.files.append(FileChange(
+                        path,
+                        None if added == "-" else int(added),
+                        None if deleted == "-" else int(deleted),
+                    ))
+            elif in_file_header:
+                if line.startswith("--- "):
+                    old_path = line[6:] if line.startswith("--- a/") else None
+                elif line.startswith("+++ "):
+                    new_path = line[6:] if line.startswith("+++ b/") else old_path
+                elif line.startswith("@@"):
+                    in_file_header = False
+            if in_patch and not in_file_header:
+                if line.startswith("@@"):
+                    parts = line.split("@@", 2)
+                    commit.touch(new_path, _hunk_symbol(parts[2]) if len(parts) > 2 else None)
+                elif line[0] in "+-":
+                    match = _DEFINITION.search(line)
+                    commit.touch(new_path, match.group(1) if match else None)
+        if commit is not None:
+            yield commit
+        proc.wait()
+        if proc.returncode:
+            stderr.seek(0)
+            raise GitError(f"git log failed: {stderr.read().strip()}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        stderr.close()
+
+
+def commit_chunk(commit: Commit, max_files: int = 20, max_body_chars: int = 2000) -> CodeChunk:
+    """Compact, embeddable summary of a commit, linked to its files and symbols"""
+    date = datetime.fromtimestamp(commit.timestamp, tz=timezone.utc)
+    lines = [
+        f"commit {commit.sha[:12]}",
+        f"Author: {commit.author} <{commit.email}>",
+        f"Date: {date.strftime('%Y-%m-%d %H:%M:%S')} UTC",
+        "",
+        commit.subject,
+    ]
+    if commit.body:
+        body = commit.body
+        if len(body) > max_body_chars:
+            body = body[:max_body_chars].rstrip() + " ..."
+        lines += ["", body]
+    if commit.files:
+        lines += ["", "Files:"]
+        for change in commit.files[:max_files]:
+            counts = (
+                "binary" if change.added is None else f"+{change.added} -{change.deleted}"
+            )
+            names = commit.symbols.get(change.path)
+            lines.append(
+                f"  {change.path} ({counts})" + (f": {', '.join(names)}" if names else "")
+            )
+        if len(commit.files) > max_files:
+            lines.append(f"  ... {len(commit.files) - max_files} more files")
+
+    paths = [c.path for c in commit.files]
+    return CodeChunk(
+        id=hashlib.md5(f"commit:{commit.sha}".encode("utf-8")).hexdigest()[:16],
+        content="\n".join(lines),
+        file_path=os.path.commonpath(paths) if paths else "",
+        language="git",
+        start_line=0,
+        end_line=0,
+        metadata={
+            "chunk_type": "commit",
+            "sha": commit.sha,
+            "parents": commit.parents,
+            "author": commit.author,
+            "timestamp": commit.timestamp,
+            "files": paths[:max_files],
+            "symbols": sorted({n for names in commit.symbols.values() for n in names}),
+        },
+    )
+
+
+class HistoryCheckpoints:
+    """Last indexed commit per branch, persisted as JSON"""
+
+    VERSION = 1
+
+    def __init__(self, branches: Optional[Dict[str, str]] = None):
+        self.branches: Dict[str, str] = branches or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "HistoryCheckpoints":
+        """Load checkpoints from disk; a missing or unreadable file yields none"""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable history checkpoints {path}: {e}")
+            return cls()
+        if data.get("version") != cls.VERSION:
+            return cls()
+        return cls(dict(data.get("branches", {})))
+
+    def save(self, path: Path) -> None:
+        """Atomically write the checkpoints to disk"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(
+            json.dumps({"version": self.VERSION, "branches": self.branches}), encoding="utf-8"
+        )
+        os.replace(tmp, path)
+
+
+@dataclass
+class HistoryStats:
+    """Counters for a single history indexing run"""
+
+    commits: int = 0
+    chunks_embedded: int = 0
+    branches_indexed: int = 0
+    branches_unchanged: int = 0
+    elapsed: float = 0.0
+
+
+class GitHistoryIndexer:
+    """Embeds commits of a repository's branches, only those not indexed before
+
+    For each branch the log of its current tip is streamed, excluding every
+    commit reachable from any branch's last indexed tip, so a commit shared
+    by several branches is embedded once. Commits are turned into chunks
+    (see `commit_chunk`) and flow through a Pipeline that embeds them in
+    batches of `batch_size` while git is still producing the log. A branch's
+    checkpoint only moves once all of its new commits are upserted; commit
+    chunk IDs are deterministic, so an interrupted run is simply repeated.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        index: VectorIndex,
+        checkpoint_path: Optional[Path] = None,
+        batch_size: int = 64,
+        lexical: Optional[LexicalIndex] = None,
+        symbols: bool = False,
+        queue_size: int = 256,
+        max_batch_wait: float = 0.05,
+    ):
+        self.embedder = embedder
+        self.index = index
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.batch_size = batch_size
+        self.lexical = lexical
+        self.symbols = symbols
+        self.queue_size = queue_size
+        self.max_batch_wait = max_batch_wait
+        self.checkpoints = (
+            HistoryCheckpoints.load(self.checkpoint_path)
+            if self.checkpoint_path else HistoryCheckpoints()
+        )
+        self.pipeline_stats: Optional[PipelineStats] = None
+
+    def index_history(
+        self,
+        repo: Path,
+        branches: Optional[Sequence[str]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> HistoryStats:
+        """Index new commits on `branches` (default: all local branches)"""
+        started = time.perf_counter()
+        repo = Path(repo)
+        stats = HistoryStats()
+        for branch in branches if branches is not None else list_branches(repo):
+            tip = git(repo, "rev-parse", "--verify", f"{branch}^{{commit}}")
+            if self.checkpoints.branches.get(branch) == tip:
+                stats.branches_unchanged += 1
+                continue
+            known = {
+                sha for sha in self.checkpoints.branches.values() if _commit_exists(repo, sha)
+            }
+            self._index_revisions(repo, [tip, *(f"^{sha}" for sha in known)], stats, cancel)
+            self.checkpoints.branches[branch] = tip
+            if self.checkpoint_path:
+                self.checkpoints.save(self.checkpoint_path)
+            stats.branches_indexed += 1
+
+        stats.elapsed = time.perf_counter() - started
+        logger.info(
+            f"Indexed {stats.commits} commits on {stats.branches_indexed} branches "
+            f"({stats.branches_unchanged} unchanged) in {stats.elapsed:.2f}s"
+        )
+        return stats
+
+    def _index_revisions(
+        self,
+        repo: Path,
+        revisions: List[str],
+        stats: HistoryStats,
+        cancel: Optional[threading.Event],
+    ) -> None:
+        cancelled = threading.Event()
+
+        def log(emit: Emit) -> None:
+            with contextlib.closing(iter_commits(repo, revisions, self.symbols)) as commits:
+                for commit in commits:
+                    if cancel is not None and cancel.is_set():
+                        cancelled.set()
+                        pipeline.stop()
+                        return
+                    stats.commits += 1
+                    emit(commit_chunk(commit))
+
+        def embed(chunks: List[CodeChunk], emit: Emit) -> None:
+            emit(self.embedder.encode_batch(ChunkBatch.from_chunks(chunks)))
+
+        def upsert(batch: ChunkBatch, emit: Emit) -> None:
+            self.index.upsert_batch(batch)
+            if self.lexical is not None:
+                self.lexical.add(batch)
+            stats.chunks_embedded += len(batch)
+
+        pipeline = (
+            Pipeline(self.queue_size)
+            .source("log", log)
+            .stage("embed", embed, batch_size=self.batch_size, max_wait=self.max_batch_wait)
+            .stage("upsert", upsert)
+        )
+        self.pipeline_stats = pipeline.run()
+        self.index.flush()
+        if cancelled.is_set():
+            raise IndexingCancelled(f"Cancelled after {stats.commits} commits")
@@ -0,0 +1,449 @@
+"""Scheduler for index jobs, optionally shared by several API worker processes"""
+
+import fcntl
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import IO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = (
+    "queued", "running", "succeeded", "failed", "cancelled"
+)
+TERMINAL_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+@dataclass
+class JobProgress:
+    """Work done so far by a running job"""
+
+    files_total: Optional[int] = None
+    files_done: int = 0
+    chunks: int = 0
+    embeddings: int = 0
+    elapsed: float = 0.0  # wall time since the job started, set by the scheduler
+
+    def as_dict(self) -> Dict:
+        data = dict(self.__dict__)
+        for name in ("files", "chunks", "embeddings"):
+            done = self.files_done if name == "files" else getattr(self, name)
+            data[f"{name}_per_sec"] = done / self.elapsed if self.elapsed else 0.0
+        return data
+
+
+@dataclass
+class IndexJob:
+    """One request to (re)index a repository at a commit"""
+
+    tenant: str
+    repo: str
+    commit: Optional[str] = None
+    full: bool = False
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    state: str = QUEUED
+    progress: JobProgress = field(default_factory=JobProgress)
+    error: Optional[str] = None
+    result: Optional[Dict] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Bumped on every change, so pollers and SSE streams can skip unchanged states
+    version: int = 0
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    seq: int = 0
+
+    @property
+    def key(self) -> Tuple[str, Optional[str]]:
+        return self.repo, self.commit
+
+    @property
+    def done(self) -> bool:
+        return self.state in TERMINAL_STATES
+
+    def as_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "tenant": self.tenant,
+            "repo": self.repo,
+            "commit": self.commit,
+            "full": self.full,
+            "state": self.state,
+            "progress": self.progress.as_dict(),
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "version": self.version,
+        }
+
+
+class JobStore:
+    """Job snapshots and run slots in a directory shared by the API workers
+
+    Schedulers save their jobs here as JSON on every change, so any worker
+    can serve them, and hold one of `slots` flock'ed slot files while a job
+    runs, so the concurrency limit covers all workers together. Each store
+    holds an owner lock for its lifetime: an unfinished job whose owner lock
+    is free was left behind by a worker that exited.
+    """
+
+    def __init__(self, root: Path, slots: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.slots = slots
+        self.owner = uuid.uuid4().hex
+        self._owner_lock = _try_lock(self._owner_path(self.owner))
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Serialise submissions across workers, so duplicates are seen"""
+        with open(self.root / "submit.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def save(self, job: "IndexJob") -> None:
+        path = self.root / f"{job.id}.json"
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps({**job.as_dict(), "seq": job.seq, "owner": self.owner}))
+        os.replace(tmp, path)
+
+    def load(self, job_id: str) -> Optional["IndexJob"]:
+        if not job_id.isalnum():
+            return None
+        try:
+            data = json.loads((self.root / f"{job_id}.json").read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        owner = data.pop("owner")
+        progress = data.pop("progress")
+        job = IndexJob(**data, progress=JobProgress(
+            **{f.name: progress[f.name] for f in fields(JobProgress)}
+        ))
+        if not job.done and owner != self.owner and not self._alive(owner):
+            job.state, job.error = FAILED, "Index worker exited"
+        return job
+
+    def jobs(self) -> List["IndexJob"]:
+        jobs = (self.load(path.stem) for path in self.root.glob("*.json"))
+        return [job for job in jobs if job is not None]
+
+    def remove(self, job_id: str) -> None:
+        for suffix in (".json", ".cancel"):
+            (self.root / f"{job_id}{suffix}").unlink(missing_ok=True)
+
+    def request_cancel(self, job_id: str) -> None:
+        (self.root / f"{job_id}.cancel").touch()
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return (self.root / f"{job_id}.cancel").exists()
+
+    def acquire_slot(self) -> Optional[IO]:
+        """A free run slot, held until the returned file is closed; None if all are taken"""
+        for i in range(self.slots):
+            slot = _try_lock(self.root / f"slot-{i}.lock")
+            if slot is not None:
+                return slot
+        return None
+
+    def close(self) -> None:
+        self._owner_path(self.owner).unlink(missing_ok=True)
+        self._owner_lock.close()
+
+    def _owner_path(self, owner: str) -> Path:
+        return self.root / f"owner-{owner}.lock"
+
+    def _alive(self, owner: str) -> bool:
+        path = self._owner_path(owner)
+        if not path.exists():
+            return False
+        lock = _try_lock(path)
+        if lock is None:
+            return True
+        lock.close()
+        return False
+
+
+def _try_lock(path: Path) -> Optional[IO]:
+    """Open `path` holding an exclusive flock, or None if another holder has it"""
+    f = open(path, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
+
+
+# Runs a job to completion; reports progress through the callback and should
+# stop (raising any exception) once job.cancel_event is set
+JobRunner = Callable[[IndexJob, Callable[..., None]], Optional[Dict]]
+
+
+class IndexJobScheduler:
+    """Runs index jobs on a few worker threads, fairly across tenants
+
+    - At most `max_concurrent` jobs run at once, so indexing cannot take
+      every core (and the model) away from query traffic. Workers also
+      lower their own OS scheduling priority by `niceness` where supported.
+    - Submitting a job for a repo and commit that is already queued or
+      running returns the existing job; a full rebuild request upgrades a
+      queued incremental job instead of adding a second one.
+    - Incremental jobs are picked before full rebuilds. Within a class the
+      tenant with the fewest running jobs goes first, then the tenant that
+      started a job least recently, then submission order.
+    - Queued jobs are cancelled immediately; running jobs are asked to stop
+      through their cancel event.
+    - With a `state_dir`, jobs go through a `JobStore` there, so every
+      process using it sees every job and `max_concurrent` bounds them all
+      together. A process runs the jobs submitted to it; cancelling another
+      process's job leaves a request that it picks up within `poll_seconds`.
+    """
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        max_concurrent: int = 1,
+        niceness: int = 10,
+        keep_finished: int = 100,
+        state_dir: Optional[Path] = None,
+        poll_seconds: float = 0.5,
+    ):
+        self.runner = runner
+        self.max_concurrent = max_concurrent
+        self.niceness = niceness
+        self.keep_finished = keep_finished
+        self.poll_seconds = poll_seconds
+        self.store = JobStore(state_dir, max_concurrent) if state_dir is not None else None
+        self._jobs: Dict[str, IndexJob] = {}
+        self._active: Dict[Tuple[str, Optional[str]], IndexJob] = {}
+        self._running_by_tenant: Dict[str, int] = {}
+        self._last_start: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"index-job-{i}", daemon=True)
+            for i in range(max_concurrent)
+        ]
+        if self.store is not None:
+            self._workers.append(threading.Thread(
+                target=self._watch_cancels, name="index-job-cancels", daemon=True
+            ))
+        for worker in self._workers:
+            worker.start()
+
+    # -- API ---------------------------------------------------------------
+
+    def submit(
+        self, tenant: str, repo: str, commit: Optional[str] = None, full: bool = False
+    ) -> IndexJob:
+        with self._cond, self.store.locked() if self.store else nullcontext():
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            existing = self._active.get((repo, commit))
+            if existing is not None:
+                if full and not existing.full and existing.state == QUEUED:
+                    existing.full = True
+                    self._touch(existing)
+                return existing
+            for other in self.store.jobs() if self.store else ():
+                if other.key == (repo, commit) and not other.done:
+                    return other
+            job = IndexJob(tenant=tenant, repo=repo, commit=commit, full=full,
+                           seq=next(self._seq))
+            self._jobs[job.id] = job
+            self._active[job.key] = job
+            if self.store is not None:
+                self.store.save(job)
+            self._cond.notify_all()
+            logger.info(f"Queued index job {job.id} for {repo}@{commit or 'HEAD'} "
+                        f"(tenant {tenant}, {'full' if full else 'incremental'})")
+            return job
+
+    def get(self, job_id: str) -> Optional[IndexJob]:
+        """The job, or a snapshot of it when another process owns it"""
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.load(job_id)
+        return job
+
+    def list(self, tenant: Optional[str] = None) -> List[IndexJob]:
+        with self._cond:
+            jobs = list(self._jobs.values())
+        if self.store is not None:
+            jobs += [j for j in self.store.jobs() if j.id not in self._jobs]
+        jobs = [j for j in jobs if tenant is None or j.tenant == tenant]
+        return sorted(jobs, key=lambda j: (j.created_at, j.seq))
+
+    def cancel(self, job_id: str) -> Optional[IndexJob]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None and self.store is not None:
+                job = self.store.load(job_id)
+                if job is not None and not job.done:
+                    self.store.request_cancel(job_id)
+                return job
+            if job is not None and not job.done:
+                self._cancel(job)
+            return job
+
+    def wait(self, job_id: str, version: int = -1, timeout: Optional[float] = None):
+        """Block until the job changes past `version` or finishes; returns the job"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            job = self._jobs.get(job_id)
+            while job is not None and job.version <= version and not job.done:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return job
+
+    def close(self, cancel_running: bool = True, timeout: Optional[float] = None) -> None:
+        with self._cond:
+            self._closed = True
+            for job in list(self._active.values()):
+                if job.state == QUEUED:
+                    job.cancel_event.set()
+                    self._finish(job, CANCELLED)
+                elif cancel_running:
+                    job.cancel_event.set()
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        if self.store is not None:
+            self.store.close()
+
+    # -- internals ---------------------------------------------------------
+
+    def _touch(self, job: IndexJob) -> None:
+        job.version += 1
+        if self.store is not None:
+            self.store.save(job)
+        self._cond.notify_all()
+
+    def _cancel(self, job: IndexJob) -> None:
+        job.cancel_event.set()
+        if job.state == QUEUED:
+            self._finish(job, CANCELLED)
+        else:
+            self._touch(job)
+
+    def _finish(self, job: IndexJob, state: str, error: Optional[str] = None) -> None:
+        job.state = state
+        job.error = error
+        job.finished_at = time.time()
+        self._active.pop(job.key, None)
+        self._touch(job)
+        finished = [j for j in self._jobs.values() if j.done]
+        for old in sorted(finished, key=lambda j: j.seq)[: -self.keep_finished or None]:
+            del self._jobs[old.id]
+            if self.store is not None:
+                self.store.remove(old.id)
+
+    def _next_job(self) -> Optional[IndexJob]:
+        queued = [j for j in self._active.values() if j.state == QUEUED]
+        if not queued:
+            return None
+        return min(queued, key=lambda j: (
+            j.full,
+            self._running_by_tenant.get(j.tenant, 0),
+            self._last_start.get(j.tenant, 0.0),
+            j.seq,
+        ))
+
+    def _lower_priority(self) -> None:
+        if not self.niceness or not hasattr(os, "setpriority"):
+            return
+        try:
+            # On Linux a thread's native ID is a valid target for PRIO_PROCESS
+            tid = threading.get_native_id()
+            current = os.getpriority(os.PRIO_PROCESS, tid)
+            os.setpriority(os.PRIO_PROCESS, tid, current + self.niceness)
+        except OSError as e:
+            logger.debug(f"Could not lower index worker priority: {e}")
+
+    def _acquire_slot(self) -> Optional[IO]:
+        """Wait for a run slot free across processes; None without a store or once closed"""
+        while self.store is not None:
+            slot = self.store.acquire_slot()
+            if slot is not None or self._closed:
+                return slot
+            with self._cond:
+                self._cond.wait(self.poll_seconds)
+        return None
+
+    def _watch_cancels(self) -> None:
+        """Apply cancels that other processes requested for this one's jobs"""
+        with self._cond:
+            while not self._closed:
+                for job in list(self._active.values()):
+                    if not job.cancel_event.is_set() and self.store.cancel_requested(job.id):
+                        self._cancel(job)
+                self._cond.wait(self.poll_seconds)
+
+    def _work(self) -> None:
+        self._lower_priority()
+        while True:
+            with self._cond:
+                while self._next_job() is None and not self._closed:
+                    self._cond.wait()
+            slot = self._acquire_slot()
+            try:
+                with self._cond:
+                    job = self._next_job()
+                    if job is None:
+                        if self._closed:
+                            return
+                        continue  # another worker took it
+                    job.state = RUNNING
+                    job.started_at = time.time()
+                    self._running_by_tenant[job.tenant] = (
+                        self._running_by_tenant.get(job.tenant, 0) + 1
+                    )
+                    self._last_start[job.tenant] = time.monotonic()
+                    self._touch(job)
+                self._run(job)
+            finally:
+                if slot is not None:
+                    slot.close()
+
+    def _run(self, job: IndexJob) -> None:
+        state, error, result = SUCCEEDED, None, None
+        try:
+            result = self.runner(job, lambda **kw: self._report(job, **kw))
+        except Exception as e:
+            if job.cancel_event.is_set():
+                state = CANCELLED
+            else:
+                state, error = FAILED, f"{type(e).__name__}: {e}"
+                logger.error(f"Index job {job.id} failed: {error}")
+        if state == SUCCEEDED and job.cancel_event.is_set():
+            state = CANCELLED
+
+        with self._cond:
+            self._running_by_tenant[job.tenant] -= 1
+            job.result = result
+            job.progress.elapsed = time.time() - job.started_at
+            self._finish(job, state, error)
+        logger.info(f"Index job {job.id} {state} in {job.progress.elapsed:.1f}s")
+
+    def _report(self, job: IndexJob, **fields) -> None:
+        with self._cond:
+            for name, value in fields.items():
+                setattr(job.progress, name, value)
+            job.progress.elapsed = time.time() - job.started_at
+            self._touch(job)
@@ -0,0 +1,89 @@
+"""Persisted file manifest for incremental indexing"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    """Hash raw file bytes for change detection"""
+    return hashlib.sha1(data).hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    """What was indexed for a single file on the last run"""
+
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+class FileManifest:
+    """Maps file paths to their size, mtime, content hash and chunk IDs
+
+    A file whose size and mtime match its entry is assumed unchanged without
+    being read. When they differ the content hash decides, so a `touch` or a
+    checkout that rewrites identical bytes does not trigger a re-index.
+    """
+
+    VERSION = 1
+
+    def __init__(self, entries: Optional[Dict[str, ManifestEntry]] = None):
+        self.entries: Dict[str, ManifestEntry] = entries or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "FileManifest":
+        """Load a manifest from disk; a missing or unreadable file yields an empty one"""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+            return cls()
+        if data.get("version") != cls.VERSION:
+            logger.warning(f"Ignoring manifest {path} with version {data.get('version')}")
+            return cls()
+        entries = {e["path"]: ManifestEntry(**e) for e in data.get("files", [])}
+        return cls(entries)
+
+    def save(self, path: Path) -> None:
+        """Atomically write the manifest to disk"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": self.VERSION,
+            "files": [asdict(e) for e in self.entries.values()],
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        return self.entries.get(path)
+
+    def update(self, entry: ManifestEntry) -> None:
+        self.entries[entry.path] = entry
+
+    def remove(self, path: str) -> Optional[ManifestEntry]:
+        return self.entries.pop(path, None)
+
+    def paths(self) -> Iterator[str]:
+        return iter(list(self.entries))
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
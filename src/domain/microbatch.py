@@ -0,0 +1,145 @@
+"""Request-coalescing micro-batcher for async callers"""
+
+import asyncio
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from src.app.core.config import settings
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class BatcherStats:
+    """Counters for coalesced batches"""
+
+    items: int = 0
+    batches: int = 0
+    max_batch: int = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "max_batch": self.max_batch,
+            "mean_batch": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesces concurrent `submit` calls into batched calls of `batch_fn`
+
+    The first queued item opens a batch; it closes after `max_wait_ms` or once
+    `max_batch_size` items are collected. `batch_fn` runs in an executor (one
+    batch at a time, since it usually wraps a single model) and must return
+    one result per input, in order. Requests arriving while a batch runs are
+    collected into the next one, so batch size grows with load instead of
+    latency growing with queue length.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[T]], Sequence[R]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.stats = BatcherStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, item: T) -> R:
+        """Queue one item and wait for its result"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, fut))
+        return await fut
+
+    async def close(self) -> None:
+        """Stop the background worker; queued callers get CancelledError"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _, fut = self._queue.get_nowait()
+            fut.cancel()
+
+    async def _collect(self) -> List[Tuple[T, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [(item, fut) for item, fut in await self._collect() if not fut.done()]
+            if not batch:
+                continue
+            self.stats.items += len(batch)
+            self.stats.batches += 1
+            self.stats.max_batch = max(self.stats.max_batch, len(batch))
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.batch_fn, [item for item, _ in batch]
+                )
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"batch_fn returned {len(results)} results for {len(batch)} items"
+                    )
+            except Exception as e:
+                logger.error(f"Micro-batch of {len(batch)} failed: {e}")
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+
+def create_query_batcher(embedder: Any, executor: Optional[Executor] = None) -> MicroBatcher:
+    """Micro-batcher for query embeddings, configured from settings"""
+    return MicroBatcher(
+        embedder.encode,
+        max_batch_size=settings.query_batch_max_size,
+        max_wait_ms=settings.query_batch_max_wait_ms,
+        executor=executor,
+    )
+
+
+def blocking_submit(
+    batcher: MicroBatcher[T, R], loop: asyncio.AbstractEventLoop
+) -> Callable[[T], R]:
+    """`batcher.submit` for worker threads: queues the item on `loop` and waits"""
+
+    def submit(item: T) -> R:
+        return asyncio.run_coroutine_threadsafe(batcher.submit(item), loop).result()
+
+    return submit
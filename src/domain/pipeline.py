@@ -0,0 +1,532 @@
+"""Pipelined indexing: walk -> read -> chunk -> embed -> upsert over bounded queues"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.domain.chunker import CodeChunker
+from src.domain.entities import ChunkBatch
+from src.domain.manifest import ManifestEntry, content_hash
+from src.domain.ports import Embedder, LexicalIndex, VectorIndex
+from src.domain.services import IndexingCancelled, IndexingService, IndexStats
+from src.domain.symbols import SymbolTableBuilder, extract_symbols
+from src.domain.tokens import TokenCounter
+from src.app.core import telemetry
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_DONE = object()
+# How often blocked workers re-check the stop flag
+_POLL_SECONDS = 0.1
+
+Emit = Callable[[Any], None]
+
+
+class _Stopped(Exception):
+    """Raised by `emit` once the pipeline has stopped, to unwind the stage function"""
+
+
+@dataclass
+class StageStats:
+    """Where one stage's workers spent their time"""
+
+    name: str
+    workers: int
+    items_in: int = 0
+    items_out: int = 0
+    busy_seconds: float = 0.0  # running the stage function
+    starved_seconds: float = 0.0  # waiting for input
+    blocked_seconds: float = 0.0  # waiting for room downstream (backpressure)
+    queue_max: int = 0  # deepest the input queue got
+    queue_samples: int = 0
+    queue_total: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def utilization(self) -> float:
+        capacity = self.workers * self.elapsed
+        return self.busy_seconds / capacity if capacity else 0.0
+
+    @property
+    def mean_queue_depth(self) -> float:
+        return self.queue_total / self.queue_samples if self.queue_samples else 0.0
+
+    def as_dict(self) -> Dict:
+        data = dict(self.__dict__)
+        data.pop("queue_samples")
+        data.pop("queue_total")
+        data["utilization"] = self.utilization
+        data["mean_queue_depth"] = self.mean_queue_depth
+        return data
+
+
+@dataclass
+class PipelineStats:
+    """Per-stage stats for one pipeline run"""
+
+    stages: List[StageStats] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def bottleneck(self) -> Optional[str]:
+        """The stage whose workers were busiest; adding workers there helps most"""
+        if not self.stages:
+            return None
+        return max(self.stages, key=lambda s: s.utilization).name
+
+    def as_dict(self) -> Dict:
+        return {
+            "elapsed": self.elapsed,
+            "bottleneck": self.bottleneck,
+            "stages": [s.as_dict() for s in self.stages],
+        }
+
+
+class _Stage:
+    """Worker threads moving items from one bounded queue to the next"""
+
+    def __init__(
+        self,
+        pipeline: "Pipeline",
+        name: str,
+        fn: Callable,
+        workers: int,
+        inbox: Optional[queue.Queue],
+        batch_size: int,
+        max_wait: Optional[float],
+        size: Optional[Callable[[Any], int]] = None,
+    ):
+        self.pipeline = pipeline
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox: Optional[queue.Queue] = None
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.size = size
+        self.stats = StageStats(name, workers)
+        self._lock = threading.Lock()
+        self._running = workers
+        self.threads = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def _put(self, target: queue.Queue, item: Any) -> bool:
+        """Blocking put that gives up once the pipeline stops"""
+        while not self.pipeline.stopped:
+            try:
+                target.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, timeout: Optional[float] = None) -> Any:
+        """Next input item; None on timeout, _DONE at the end of input or on stop"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not self.pipeline.stopped:
+            wait = _POLL_SECONDS
+            if deadline is not None:
+                wait = min(wait, deadline - time.perf_counter())
+                if wait <= 0:
+                    return None
+            try:
+                item = self.inbox.get(timeout=wait)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                # Leave the marker for this stage's other workers
+                self.inbox.put(_DONE)
+            return item
+        return _DONE
+
+    def _next(self) -> Tuple[Any, bool]:
+        """Next unit of work (an item, or a list of items when batching) and whether input ended"""
+        depth = self.inbox.qsize()
+        with self._lock:
+            self.stats.queue_max = max(self.stats.queue_max, depth)
+            self.stats.queue_samples += 1
+            self.stats.queue_total += depth
+        first = self._get()
+        if self.batch_size <= 1:
+            return (None, True) if first is _DONE else (first, False)
+        if first is _DONE:
+            return [], True
+        batch = [first]
+        filled = self._size(first)
+        deadline = None if self.max_wait is None else time.perf_counter() + self.max_wait
+        while filled < self.batch_size:
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                break
+            item = self._get(remaining)
+            if item is None:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+            filled += self._size(item)
+        return batch, False
+
+    def _size(self, item: Any) -> int:
+        return 1 if self.size is None else self.size(item)
+
+    def _work(self) -> None:
+        blocked = 0.0
+
+        def emit(item: Any) -> None:
+            nonlocal blocked
+            started = time.perf_counter()
+            if not self._put(self.outbox, item):
+                raise _Stopped()
+            blocked += time.perf_counter() - started
+            with self._lock:
+                self.stats.items_out += 1
+
+        try:
+            if self.inbox is None:
+                started = time.perf_counter()
+                self.fn(emit)
+                with self._lock:
+                    self.stats.busy_seconds += time.perf_counter() - started - blocked
+                    self.stats.blocked_seconds += blocked
+                return
+            while not self.pipeline.stopped:
+                waited = time.perf_counter()
+                work, finished = self._next()
+                started = time.perf_counter()
+                if self.batch_size > 1:
+                    count = sum(self._size(item) for item in work)
+                else:
+                    count = int(not finished)
+                if self.pipeline.stopped:
+                    count = 0
+                if count:
+                    blocked = 0.0
+                    self.fn(work, emit)
+                with self._lock:
+                    self.stats.starved_seconds += started - waited
+                    if count:
+                        self.stats.items_in += count
+                        self.stats.busy_seconds += time.perf_counter() - started - blocked
+                        self.stats.blocked_seconds += blocked
+                if finished:
+                    break
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self.pipeline.fail(self.name, e)
+        finally:
+            with self._lock:
+                self._running -= 1
+                last = self._running == 0
+            if last and self.outbox is not None:
+                self._put(self.outbox, _DONE)
+
+
+class Pipeline:
+    """Stages of worker threads connected by bounded queues
+
+    The first stage is a source: one thread calling `fn(emit)`. Each later
+    stage runs `workers` threads calling `fn(item, emit)`, or `fn(items,
+    emit)` with up to `batch_size` items when batching; a batch is handed
+    over once full or `max_wait` seconds after its first item arrived. With
+    `size`, items count as `size(item)` towards `batch_size`. Every
+    queue holds at most `queue_size` items, so a slow stage blocks the ones
+    before it instead of letting work pile up in memory, and the whole run
+    proceeds at the pace of the slowest stage rather than the sum of all of
+    them. The first exception in any stage stops every stage and is
+    re-raised by `run`.
+    """
+
+    def __init__(self, queue_size: int = 64):
+        self.queue_size = queue_size
+        self.stages: List[_Stage] = []
+        self.errors: List[Tuple[str, BaseException]] = []
+        self._stop = threading.Event()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def fail(self, stage: str, error: BaseException) -> None:
+        self.errors.append((stage, error))
+        self._stop.set()
+
+    def source(self, name: str, fn: Callable[[Emit], None]) -> "Pipeline":
+        if self.stages:
+            raise ValueError("The source must be the first stage")
+        self.stages.append(_Stage(self, name, fn, 1, None, 1, None))
+        return self
+
+    def stage(
+        self,
+        name: str,
+        fn: Callable[[Any, Emit], None],
+        workers: int = 1,
+        batch_size: int = 1,
+        max_wait: Optional[float] = None,
+        size: Optional[Callable[[Any], int]] = None,
+    ) -> "Pipeline":
+        if not self.stages:
+            raise ValueError("Add a source before other stages")
+        link = queue.Queue(maxsize=self.queue_size)
+        self.stages[-1].outbox = link
+        self.stages.append(
+            _Stage(self, name, fn, max(1, workers), link, batch_size, max_wait, size)
+        )
+        return self
+
+    def run(self) -> PipelineStats:
+        started = time.perf_counter()
+        threads = [t for s in self.stages for t in s.threads]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        for s in self.stages:
+            s.stats.elapsed = elapsed
+        stats = PipelineStats([s.stats for s in self.stages], elapsed)
+        if self.errors:
+            stage, error = self.errors[0]
+            logger.error(f"Pipeline stage {stage} failed: {type(error).__name__}: {error}")
+            raise error
+        return stats
+
+
+# Per-process chunker for the chunk stage's process pool
+_chunker: Optional[CodeChunker] = None
+
+
+def _init_chunker(max_tokens: int, overlap: int, tokens: Tuple[str, str, bool]) -> None:
+    global _chunker
+    model_name, cache_dir, use_tokenizer = tokens
+    counter = TokenCounter(model_name, cache_dir, use_tokenizer=use_tokenizer)
+    _chunker = CodeChunker(max_tokens=max_tokens, overlap=overlap, token_counter=counter)
+
+
+def _chunk_in_worker(text: str, key: str, with_symbols: bool):
+    """Chunk one file, and extract its symbols, inside a pool process"""
+    chunks = _chunker.chunk_text(text, Path(key))
+    symbols = None
+    if with_symbols and chunks:
+        symbols = extract_symbols(text, chunks[0].language, key, chunks)
+    # A batch pickles as a handful of buffers instead of one object per chunk
+    return ChunkBatch.from_chunks(chunks), symbols
+
+
+class PipelinedIndexingService(IndexingService):
+    """IndexingService whose stages run concurrently
+
+    Files flow through walk -> read -> chunk -> embed -> upsert. Reading
+    overlaps disk waits; chunking runs in `chunk_processes` processes (in a
+    single thread when 0); chunks are embedded in batches of `batch_size`,
+    or whatever arrived within `max_batch_wait` seconds; upserts run while
+    the next batch is embedded. Bounded queues keep memory flat regardless
+    of repository size. Incremental semantics, cancellation and the manifest
+    and symbol table are the same as for IndexingService. Stats for the
+    last run, including which stage was the bottleneck, are kept in
+    `pipeline_stats`.
+
+    `embed_workers` and `upsert_workers` above 1 require an embedder and an
+    index that are safe to call from several threads.
+    """
+
+    def __init__(
+        self,
+        chunker: CodeChunker,
+        embedder: Embedder,
+        index: VectorIndex,
+        manifest_path: Optional[Path] = None,
+        batch_size: int = 256,
+        lexical: Optional[LexicalIndex] = None,
+        symbols_path: Optional[Path] = None,
+        read_workers: int = 4,
+        chunk_processes: int = 0,
+        embed_workers: int = 1,
+        upsert_workers: int = 1,
+        queue_size: int = 64,
+        max_batch_wait: float = 0.05,
+    ):
+        super().__init__(
+            chunker, embedder, index, manifest_path=manifest_path, batch_size=batch_size,
+            lexical=lexical, symbols_path=symbols_path,
+        )
+        self.read_workers = read_workers
+        self.chunk_processes = chunk_processes
+        self.embed_workers = embed_workers
+        self.upsert_workers = upsert_workers
+        self.queue_size = queue_size
+        self.max_batch_wait = max_batch_wait
+        self.pipeline_stats: Optional[PipelineStats] = None
+
+    def index_files(
+        self,
+        files: Iterable[Path],
+        full: bool = False,
+        progress: Optional[Callable[[IndexStats], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> IndexStats:
+        started = time.perf_counter()
+        stats = IndexStats()
+        seen = set()
+        stale_ids: List[str] = []
+        symbols = SymbolTableBuilder.load(self.symbols_path) if self.symbols_path else None
+        lock = threading.Lock()
+        cancelled = threading.Event()
+
+        def report() -> None:
+            if progress is not None:
+                stats.elapsed = time.perf_counter() - started
+                progress(stats)
+
+        def walk(emit: Emit) -> None:
+            for file_path in files:
+                if cancel is not None and cancel.is_set():
+                    cancelled.set()
+                    pipeline.stop()
+                    return
+                key = str(file_path)
+                if key not in seen:
+                    seen.add(key)
+                    emit(key)
+
+        def read(key: str, emit: Emit) -> None:
+            with lock:
+                stats.files_scanned += 1
+                # `full` only skips the shortcuts; the previous IDs are still replaced
+                prev = self.manifest.get(key)
+                entry = None if full else prev
+            try:
+                st = os.stat(key)
+            except OSError as e:
+                logger.warning(f"Cannot stat {key}: {e}")
+                return
+            if entry and entry.size == st.st_size and entry.mtime_ns == st.st_mtime_ns:
+                with lock:
+                    stats.files_unchanged += 1
+                report()
+                return
+            try:
+                data = Path(key).read_bytes()
+            except OSError as e:
+                logger.error(f"Error reading {key}: {e}")
+                return
+            digest = content_hash(data)
+            if entry and entry.content_hash == digest:
+                with lock:
+                    entry.size, entry.mtime_ns = st.st_size, st.st_mtime_ns
+                    stats.files_unchanged += 1
+                report()
+                return
+            emit((key, st, data.decode("utf-8", errors="ignore"), digest, entry, prev))
+
+        def chunk(item, emit: Emit) -> None:
+            key, st, text, digest, entry, prev = item
+            if pool is not None:
+                chunks, found = pool.submit(
+                    _chunk_in_worker, text, key, symbols is not None
+                ).result()
+            else:
+                found = None
+                listed = self.chunker.chunk_text(text, Path(key))
+                if symbols is not None and listed:
+                    found = extract_symbols(text, listed[0].language, key, listed)
+                chunks = ChunkBatch.from_chunks(listed)
+            old_ids = set(entry.chunk_ids) if entry else set()
+            new_ids = chunks.ids
+            fresh = [i for i, chunk_id in enumerate(new_ids) if chunk_id not in old_ids]
+            with lock:
+                if found is not None:
+                    symbols.update(key, *found)
+                elif symbols is not None:
+                    symbols.remove(key)
+                stats.chunks_reused += len(chunks) - len(fresh)
+                if prev:
+                    stale_ids.extend(set(prev.chunk_ids).difference(new_ids))
+                self.manifest.update(
+                    ManifestEntry(
+                        path=key,
+                        size=st.st_size,
+                        mtime_ns=st.st_mtime_ns,
+                        content_hash=digest,
+                        chunk_ids=new_ids,
+                    )
+                )
+                stats.files_changed += 1
+            if fresh:
+                emit(chunks if len(fresh) == len(chunks) else chunks.select(fresh))
+
+        def embed(batches: List[ChunkBatch], emit: Emit) -> None:
+            batch = batches[0] if len(batches) == 1 else ChunkBatch.concat(batches)
+            emit(self.embedder.encode_batch(batch))
+
+        def upsert(batch: ChunkBatch, emit: Emit) -> None:
+            self.index.upsert_batch(batch)
+            if self.lexical is not None:
+                self.lexical.add(batch)
+            with lock:
+                stats.chunks_embedded += len(batch)
+            report()
+
+        pipeline = (
+            Pipeline(self.queue_size)
+            .source("walk", walk)
+            .stage("read", read, workers=self.read_workers)
+            .stage("chunk", chunk, workers=max(1, self.chunk_processes))
+            .stage("embed", embed, workers=self.embed_workers,
+                   batch_size=self.batch_size, max_wait=self.max_batch_wait, size=len)
+            .stage("upsert", upsert, workers=self.upsert_workers)
+        )
+        pool = None
+        if self.chunk_processes > 0:
+            tokens = self.chunker.tokens
+            # Spawned, not forked: jobs run on a thread of a multi-threaded server
+            pool = ProcessPoolExecutor(
+                max_workers=self.chunk_processes,
+                mp_context=get_context("spawn"),
+                initializer=_init_chunker,
+                initargs=(
+                    self.chunker.max_tokens,
+                    self.chunker.overlap,
+                    (tokens.model_name, tokens.cache_dir, tokens.use_tokenizer),
+                ),
+            )
+            # Start the processes up front so start-up is not charged to the chunk stage
+            pool.submit(int).result()
+        try:
+            self.pipeline_stats = pipeline.run()
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        if cancelled.is_set():
+            raise IndexingCancelled(f"Cancelled after {stats.files_scanned} files")
+        self._report_stages(self.pipeline_stats)
+        return self._finish(stats, seen, stale_ids, symbols, started, progress)
+
+    @staticmethod
+    def _report_stages(pipeline_stats: PipelineStats) -> None:
+        for s in pipeline_stats.stages:
+            telemetry.count("index_stage_items_total", s.items_in, stage=s.name)
+            telemetry.count("index_stage_busy_seconds_total", s.busy_seconds, stage=s.name)
+            telemetry.count("index_stage_starved_seconds_total", s.starved_seconds, stage=s.name)
+            telemetry.count("index_stage_blocked_seconds_total", s.blocked_seconds, stage=s.name)
+            logger.debug(
+                f"Stage {s.name}: {s.items_in} in / {s.items_out} out, "
+                f"{s.utilization:.0%} busy x{s.workers}, {s.starved_seconds:.2f}s starved, "
+                f"{s.blocked_seconds:.2f}s blocked, queue max {s.queue_max}"
+            )
+        logger.info(f"Indexing pipeline bottleneck: {pipeline_stats.bottleneck}")
@@ -1 +1,103 @@
-# abstract interfaces that the infra implements
\ No newline at end of file
+# abstract interfaces that the infra implements
+
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from src.domain.entities import ChunkBatch, CodeChunk, SearchHit
+
+
+class Embedder(ABC):
+    """Turns texts into embedding vectors"""
+
+    @abstractmethod
+    def encode(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """Encode a list of texts into one vector per text"""
+
+    def encode_batch(self, batch: ChunkBatch) -> ChunkBatch:
+        """Embed the contents of a batch into its embedding matrix"""
+        if not len(batch):
+            return batch
+        return batch.with_embeddings(np.stack(self.encode(batch.contents())))
+
+
+class VectorIndex(ABC):
+    """Stores embedded chunks and their payloads"""
+
+    # Bumped on every change to the contents; caches of search results key on it
+    generation: int = 0
+
+    @abstractmethod
+    def upsert(self, chunks: Sequence[CodeChunk]) -> None:
+        """Insert or replace chunks (their `embedding` must be set)"""
+
+    def upsert_batch(self, batch: ChunkBatch) -> None:
+        """Insert or replace the chunks of an embedded batch"""
+        self.upsert(batch)
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove chunks by ID; unknown IDs are ignored"""
+
+    @abstractmethod
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        language: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+    ) -> List[SearchHit]:
+        """Top-k chunks by cosine similarity, optionally filtered"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of live chunks"""
+
+    def refresh(self) -> None:
+        """Pick up writes made by other processes; a no-op for in-process indexes"""
+
+    def flush(self) -> None:
+        """Wait for writes still in flight; a no-op for synchronous indexes"""
+
+
+class LexicalIndex(ABC):
+    """Keyword index over chunk contents"""
+
+    generation: int = 0
+
+    @abstractmethod
+    def add(self, chunks: Sequence[CodeChunk]) -> None:
+        """Index chunks, replacing any with the same IDs"""
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove chunks by ID; unknown IDs are ignored"""
+
+    @abstractmethod
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        language: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+    ) -> List[SearchHit]:
+        """Top-k chunks by keyword relevance, optionally filtered"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of live chunks"""
+
+    def refresh(self) -> None:
+        """Pick up writes made by other processes; a no-op for in-process indexes"""
+
+
+class Generator(ABC):
+    """LLM that completes a prompt"""
+
+    @abstractmethod
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the completion in pieces as they are generated"""
+
+    def generate(self, prompt: str) -> str:
+        return "".join(self.stream(prompt))
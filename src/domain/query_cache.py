@@ -0,0 +1,190 @@
+"""Cache of query results keyed on the query text and the index generation"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, minus trailing punctuation"""
+    return _SPACE.sub(" ", query).strip().rstrip("?.!").strip().lower()
+
+
+@dataclass
+class QueryCacheStats:
+    """Counters for a query result cache"""
+
+    hits: int = 0
+    near_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.near_hits + self.misses
+        return (self.hits + self.near_hits) / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict:
+        data = dict(self.__dict__)
+        data["hit_rate"] = self.hit_rate
+        return data
+
+
+@dataclass
+class _Entry:
+    value: Any
+    embedding: Optional[np.ndarray]
+    expires: float
+    cost: float
+
+
+class QueryResultCache:
+    """LRU + TTL cache of query results, emptied when the index generation changes
+
+    Keys are the normalized query plus its filters. When a lookup also
+    passes the query embedding and `similarity_threshold` is set, a miss on
+    the exact key falls back to the cached query with the same filters whose
+    embedding is most similar, if the cosine similarity reaches the
+    threshold. Each entry remembers how long computing it took, so hits
+    add up to the latency saved.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 600.0,
+        similarity_threshold: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        self.stats = QueryCacheStats()
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._generation: Hashable = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, filters: Optional[Dict] = None) -> Tuple:
+        items = tuple(sorted((k, v) for k, v in (filters or {}).items() if v is not None))
+        return normalize_query(query), items
+
+    def _check_generation(self, generation: Hashable) -> None:
+        if generation != self._generation:
+            if self._entries:
+                self.stats.invalidations += 1
+                logger.info(f"Index generation changed; dropping {len(self._entries)} "
+                            "cached query results")
+            self._entries.clear()
+            self._generation = generation
+
+    def _live(self, key: Tuple, now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= now:
+            del self._entries[key]
+            self.stats.expirations += 1
+            return None
+        return entry
+
+    def _nearest(self, key: Tuple, embedding: np.ndarray, now: float) -> Optional[_Entry]:
+        candidates: List[Tuple[Tuple, _Entry]] = [
+            (k, e) for k, e in self._entries.items()
+            if k[1] == key[1] and e.embedding is not None and e.expires > now
+        ]
+        if not candidates:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        similarities = np.stack([e.embedding for _, e in candidates]) @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        self._entries.move_to_end(candidates[best][0])
+        return candidates[best][1]
+
+    def get(
+        self,
+        query: str,
+        filters: Optional[Dict] = None,
+        generation: Hashable = None,
+        embedding: Optional[np.ndarray] = None,
+    ) -> Optional[Any]:
+        """Cached result for `query`, or None
+
+        Call once without `embedding` before paying for one; on a miss, if
+        `wants_embedding`, call again with it to allow a near-duplicate
+        match. A miss is counted only by the last of those calls.
+        """
+        key = self.key(query, filters)
+        now = self.clock()
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._live(key, now)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                self.stats.saved_seconds += entry.cost
+                return entry.value
+            near = self.similarity_threshold is not None
+            if embedding is not None and near:
+                entry = self._nearest(key, embedding, now)
+                if entry is not None:
+                    self.stats.near_hits += 1
+                    self.stats.saved_seconds += entry.cost
+                    return entry.value
+            if embedding is not None or not near:
+                self.stats.misses += 1
+            return None
+
+    @property
+    def wants_embedding(self) -> bool:
+        """True if a lookup with the query embedding can still hit after an exact miss"""
+        return self.similarity_threshold is not None
+
+    def put(
+        self,
+        query: str,
+        value: Any,
+        filters: Optional[Dict] = None,
+        generation: Hashable = None,
+        embedding: Optional[np.ndarray] = None,
+        cost_seconds: float = 0.0,
+    ) -> None:
+        """Cache `value`, the result of `query` computed in `cost_seconds`"""
+        if self.max_entries <= 0:
+            return
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            embedding = embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+        key = self.key(query, filters)
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[key] = _Entry(
+                value, embedding, self.clock() + self.ttl_seconds, cost_seconds
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,62 @@
+"""Request and response models for the HTTP API"""
+
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class IndexJobRequest(BaseModel):
+    """Request to index a repository checked out on the server"""
+
+    repo_path: str
+    tenant: str = "default"
+    # Defaults to the repository's current HEAD; jobs for the same commit are merged
+    commit: Optional[str] = None
+    full: bool = False
+
+
+class IndexJobResponse(BaseModel):
+    """State and progress of an index job"""
+
+    id: str
+    tenant: str
+    repo: str
+    commit: Optional[str] = None
+    full: bool
+    state: str
+    progress: Dict = Field(default_factory=dict)
+    error: Optional[str] = None
+    result: Optional[Dict] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    version: int
+
+
+class ChatRequest(BaseModel):
+    """A question about the indexed code"""
+
+    query: str = Field(min_length=1)
+    k: Optional[int] = Field(default=None, ge=1, le=200)
+    language: Optional[str] = None
+    path_prefix: Optional[str] = None
+    # Overrides the configured context budget for this request
+    max_context_tokens: Optional[int] = Field(default=None, ge=1)
+
+
+class ChatSource(BaseModel):
+    """A file range that was given to the model as context"""
+
+    file_path: str
+    language: str
+    start_line: int
+    end_line: int
+    score: float
+    chunk_ids: List[str]
+    tokens: int
+
+
+class ChatResponse(BaseModel):
+    answer: str
+    sources: List[ChatSource]
+    context: Dict
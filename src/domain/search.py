@@ -0,0 +1,166 @@
+"""Hybrid code search over a vector index and a lexical index"""
+
+import re
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.domain.entities import SearchHit
+from src.domain.ports import Embedder, LexicalIndex, VectorIndex
+from src.domain.query_cache import QueryResultCache
+from src.app.core import telemetry
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_IDENTIFIER = r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*"
+# `name` or "name" anywhere in the query
+_QUOTED = re.compile(r"[`'\"](" + _IDENTIFIER + r")(?:\(\))?[`'\"]")
+# The whole query is one bare identifier, optionally called: foo_bar, fooBar(), FOO
+_BARE = re.compile(r"\s*(" + _IDENTIFIER + r")(?:\(\))?\s*")
+
+
+def _looks_like_code(word: str) -> bool:
+    """True for snake_case, camelCase, CONSTANT or dotted names, not plain words"""
+    return (
+        "_" in word
+        or "." in word
+        or any(c.isdigit() for c in word)
+        or any(c.isupper() for c in word[1:])
+    )
+
+
+def exact_identifiers(query: str) -> List[str]:
+    """Identifiers the query asks for verbatim; empty for natural-language queries"""
+    quoted = _QUOTED.findall(query)
+    if quoted:
+        return quoted
+    bare = _BARE.fullmatch(query)
+    if bare and _looks_like_code(bare.group(1)):
+        return [bare.group(1)]
+    return []
+
+
+def reciprocal_rank_fusion(
+    results: Sequence[List[SearchHit]], k: int = 10, rrf_k: int = 60
+) -> List[SearchHit]:
+    """Merge ranked lists by summing 1 / (rrf_k + rank) per chunk"""
+    scores: Dict[str, float] = {}
+    hits: Dict[str, SearchHit] = {}
+    for ranked in results:
+        for rank, hit in enumerate(ranked, start=1):
+            scores[hit.id] = scores.get(hit.id, 0.0) + 1.0 / (rrf_k + rank)
+            hits.setdefault(hit.id, hit)
+    order = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [SearchHit(id=i, score=scores[i], payload=hits[i].payload) for i in order]
+
+
+class SearchService:
+    """Answers code queries from the lexical index, the vector index, or both
+
+    Queries naming exact identifiers (`_generate_chunk_id`, QDRANT_PATH) are
+    answered from the lexical index alone, with no embedding call. Other
+    queries, or identifier queries with no lexical match, run both searches
+    over `candidates` hits each and fuse the rankings with RRF. An optional
+    QueryResultCache sits in front of all of this. `search` takes an `embed`
+    function to compute the query embedding some other way than with
+    `embedder`, e.g. through a MicroBatcher shared by concurrent requests.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        index: VectorIndex,
+        lexical: Optional[LexicalIndex] = None,
+        candidates: int = 50,
+        rrf_k: int = 60,
+        cache: Optional[QueryResultCache] = None,
+    ):
+        self.embedder = embedder
+        self.index = index
+        self.lexical = lexical
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.cache = cache
+
+    @property
+    def generation(self) -> Tuple[int, int]:
+        """Changes whenever either index changes; cached results key on it
+
+        Refreshes both indexes first, so a cache hit still notices a re-index
+        written by another process.
+        """
+        self.index.refresh()
+        if self.lexical is not None:
+            self.lexical.refresh()
+        lexical = self.lexical.generation if self.lexical is not None else 0
+        return self.index.generation, lexical
+
+    def cache_stats(self) -> Dict:
+        return self.cache.stats.as_dict() if self.cache is not None else {}
+
+    @telemetry.timed("search_seconds", "End-to-end time of one code search")
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        language: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+        embed: Optional[Callable[[str], np.ndarray]] = None,
+    ) -> List[SearchHit]:
+        started = time.perf_counter()
+        embed = embed or self._embed
+        filters = {"language": language, "path_prefix": path_prefix}
+        cache_key = dict(filters, k=k)
+        generation = self.generation
+        embedding = None
+        if self.cache is not None:
+            cached = self.cache.get(query, cache_key, generation)
+            lexical_only = self.lexical is not None and exact_identifiers(query)
+            if cached is None and self.cache.wants_embedding and not lexical_only:
+                embedding = embed(query)
+                cached = self.cache.get(query, cache_key, generation, embedding=embedding)
+            if cached is not None:
+                telemetry.count("search_queries_total", route="cached")
+                return list(cached)
+
+        hits, embedding = self._search(query, k, filters, embedding, embed)
+        if self.cache is not None:
+            self.cache.put(
+                query, hits, cache_key, generation, embedding=embedding,
+                cost_seconds=time.perf_counter() - started,
+            )
+        return hits
+
+    def _search(
+        self,
+        query: str,
+        k: int,
+        filters: Dict,
+        embedding: Optional[np.ndarray],
+        embed: Callable[[str], np.ndarray],
+    ) -> Tuple[List[SearchHit], Optional[np.ndarray]]:
+        if self.lexical is None:
+            embedding = embed(query) if embedding is None else embedding
+            telemetry.count("search_queries_total", route="vector")
+            return self.index.search(embedding, k=k, **filters), embedding
+
+        identifiers = exact_identifiers(query)
+        if identifiers:
+            hits = self.lexical.search(" ".join(identifiers), k=k, **filters)
+            if hits:
+                logger.debug(f"Identifier query {identifiers} answered lexically")
+                telemetry.count("search_queries_total", route="lexical")
+                return hits, embedding
+
+        n = max(k, self.candidates)
+        lexical_hits = self.lexical.search(query, k=n, **filters)
+        embedding = embed(query) if embedding is None else embedding
+        vector_hits = self.index.search(embedding, k=n, **filters)
+        telemetry.count("search_queries_total", route="hybrid")
+        fused = reciprocal_rank_fusion([vector_hits, lexical_hits], k=k, rrf_k=self.rrf_k)
+        return fused, embedding
+
+    def _embed(self, query: str) -> np.ndarray:
+        return self.embedder.encode([query])[0]
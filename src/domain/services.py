@@ -1 +1,217 @@
-# pure biz orchestration here todo
\ No newline at end of file
+# pure biz orchestration here
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Set
+
+from src.domain.chunker import CodeChunker
+from src.domain.entities import ChunkBatch, CodeChunk
+from src.domain.manifest import FileManifest, ManifestEntry, content_hash
+from src.domain.ports import Embedder, LexicalIndex, VectorIndex
+from src.domain.symbols import SymbolTableBuilder, extract_symbols
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class IndexStats:
+    """Counters for a single indexing run"""
+
+    files_scanned: int = 0
+    files_changed: int = 0
+    files_unchanged: int = 0
+    files_removed: int = 0
+    chunks_embedded: int = 0
+    chunks_reused: int = 0
+    chunks_deleted: int = 0
+    elapsed: float = 0.0
+
+
+class IndexingCancelled(Exception):
+    """Raised inside `index_files` when its cancel event is set"""
+
+
+class IndexingService:
+    """Incrementally chunks, embeds and upserts a repository
+
+    The manifest records, per file, what was indexed last time. Only new or
+    modified files are chunked; within those, only chunks whose content-derived
+    ID is new are embedded and upserted. Chunks of removed files, and chunks
+    that disappeared from modified files, are deleted from the index. An
+    optional lexical index receives the same adds and deletes. With
+    `symbols_path` set, definitions and references of re-chunked files are
+    extracted into a symbol table that is rewritten at the end of each run.
+    """
+
+    def __init__(
+        self,
+        chunker: CodeChunker,
+        embedder: Embedder,
+        index: VectorIndex,
+        manifest_path: Optional[Path] = None,
+        batch_size: int = 256,
+        lexical: Optional[LexicalIndex] = None,
+        symbols_path: Optional[Path] = None,
+    ):
+        self.chunker = chunker
+        self.embedder = embedder
+        self.index = index
+        self.manifest_path = Path(manifest_path) if manifest_path else None
+        self.batch_size = batch_size
+        self.lexical = lexical
+        self.symbols_path = Path(symbols_path) if symbols_path else None
+        self.manifest = (
+            FileManifest.load(self.manifest_path) if self.manifest_path else FileManifest()
+        )
+
+    def index_files(
+        self,
+        files: Iterable[Path],
+        full: bool = False,
+        progress: Optional[Callable[[IndexStats], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> IndexStats:
+        """Bring the index in line with `files`, the complete set of files to index
+
+        Files that are in the manifest but not in `files` are treated as removed.
+        With `full=True` every file is re-chunked and re-embedded; chunks from
+        the previous run that are no longer produced are still deleted.
+        `progress` is called with the running stats after every file. Setting
+        `cancel` stops the run at the next file with IndexingCancelled; chunks
+        already upserted stay, but the manifest is not saved, so the next run
+        picks up the same files again.
+        """
+        started = time.perf_counter()
+        stats = IndexStats()
+        seen = set()
+        pending: List[CodeChunk] = []
+        stale_ids: List[str] = []
+        symbols = SymbolTableBuilder.load(self.symbols_path) if self.symbols_path else None
+
+        for file_path in files:
+            if cancel is not None and cancel.is_set():
+                raise IndexingCancelled(f"Cancelled after {stats.files_scanned} files")
+            if progress is not None and stats.files_scanned:
+                stats.elapsed = time.perf_counter() - started
+                progress(stats)
+            file_path = Path(file_path)
+            key = str(file_path)
+            if key in seen:
+                continue
+            seen.add(key)
+            stats.files_scanned += 1
+
+            try:
+                st = os.stat(file_path)
+            except OSError as e:
+                logger.warning(f"Cannot stat {file_path}: {e}")
+                continue
+
+            # `full` only skips the shortcuts; the previous IDs are still replaced
+            prev = self.manifest.get(key)
+            entry = None if full else prev
+            if entry and entry.size == st.st_size and entry.mtime_ns == st.st_mtime_ns:
+                stats.files_unchanged += 1
+                continue
+
+            try:
+                data = file_path.read_bytes()
+            except OSError as e:
+                logger.error(f"Error reading {file_path}: {e}")
+                continue
+
+            digest = content_hash(data)
+            if entry and entry.content_hash == digest:
+                entry.size, entry.mtime_ns = st.st_size, st.st_mtime_ns
+                stats.files_unchanged += 1
+                continue
+
+            text = data.decode("utf-8", errors="ignore")
+            chunks = self.chunker.chunk_text(text, file_path)
+            if symbols is not None and chunks:
+                symbols.update(key, *extract_symbols(text, chunks[0].language, key, chunks))
+            elif symbols is not None:
+                symbols.remove(key)
+            old_ids = set(entry.chunk_ids) if entry else set()
+            new_ids = [c.id for c in chunks]
+
+            for chunk in chunks:
+                if chunk.id in old_ids:
+                    stats.chunks_reused += 1
+                else:
+                    pending.append(chunk)
+            if prev:
+                stale_ids.extend(set(prev.chunk_ids).difference(new_ids))
+
+            self.manifest.update(
+                ManifestEntry(
+                    path=key,
+                    size=st.st_size,
+                    mtime_ns=st.st_mtime_ns,
+                    content_hash=digest,
+                    chunk_ids=new_ids,
+                )
+            )
+            stats.files_changed += 1
+
+            if len(pending) >= self.batch_size:
+                stats.chunks_embedded += self._flush(pending)
+                pending = []
+
+        if pending:
+            stats.chunks_embedded += self._flush(pending)
+
+        return self._finish(stats, seen, stale_ids, symbols, started, progress)
+
+    def _finish(
+        self,
+        stats: IndexStats,
+        seen: Set[str],
+        stale_ids: List[str],
+        symbols: Optional[SymbolTableBuilder],
+        started: float,
+        progress: Optional[Callable[[IndexStats], None]],
+    ) -> IndexStats:
+        """Drop files not in `seen`, delete stale chunks and persist the manifest"""
+        # Upload failures surface here, before the manifest records the files as done
+        self.index.flush()
+        for key in self.manifest.paths():
+            if key not in seen:
+                removed = self.manifest.remove(key)
+                if symbols is not None:
+                    symbols.remove(key)
+                stale_ids.extend(removed.chunk_ids)
+                stats.files_removed += 1
+
+        if stale_ids:
+            self.index.delete(stale_ids)
+            if self.lexical is not None:
+                self.lexical.delete(stale_ids)
+            stats.chunks_deleted = len(stale_ids)
+
+        if self.manifest_path:
+            self.manifest.save(self.manifest_path)
+        if symbols is not None:
+            symbols.write(self.symbols_path)
+
+        stats.elapsed = time.perf_counter() - started
+        if progress is not None:
+            progress(stats)
+        logger.info(
+            f"Indexed {stats.files_changed} changed / {stats.files_scanned} files: "
+            f"{stats.chunks_embedded} embedded, {stats.chunks_reused} reused, "
+            f"{stats.chunks_deleted} deleted in {stats.elapsed:.2f}s"
+        )
+        return stats
+
+    def _flush(self, chunks: List[CodeChunk]) -> int:
+        """Embed and upsert a batch of new chunks"""
+        batch = self.embedder.encode_batch(ChunkBatch.from_chunks(chunks))
+        self.index.upsert_batch(batch)
+        if self.lexical is not None:
+            self.lexical.add(batch)
+        return len(batch)
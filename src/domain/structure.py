@@ -0,0 +1,529 @@
+"""Structural units of source files, found in a single pass"""
+
+import ast
+import re
+from itertools import accumulate
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+
+class Unit(NamedTuple):
+    """A contiguous, 1-based inclusive line range with what it contains"""
+
+    start_line: int
+    end_line: int
+    kind: str
+    symbol: str = ""
+    part: int = 0
+
+
+def word_costs(lines: List[str]) -> List[int]:
+    return [len(line.split()) for line in lines]
+
+
+class LineTable:
+    """Lines of a file plus a prefix sum of per-line cost
+
+    The cost of any line range is then O(1), which keeps splitting and
+    packing linear in file size no matter how often ranges are measured.
+    `line_costs` maps all lines to their costs in one call, so a tokenizer
+    can process a whole file as a batch.
+    """
+
+    def __init__(
+        self, content: str, line_costs: Callable[[List[str]], List[int]] = word_costs
+    ):
+        self.lines = content.split("\n")
+        self.prefix = list(accumulate(line_costs(self.lines), initial=0))
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def cost(self, start: int, end: int) -> int:
+        return self.prefix[end] - self.prefix[start - 1]
+
+    def text(self, start: int, end: int) -> str:
+        return "\n".join(self.lines[start - 1 : end])
+
+    def trim(self, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """Shrink a range to exclude blank lines at both edges"""
+        while start <= end and not self.lines[start - 1].strip():
+            start += 1
+        while end >= start and not self.lines[end - 1].strip():
+            end -= 1
+        return (start, end) if start <= end else None
+
+
+def split_lines(
+    table: LineTable, start: int, end: int, limit: int, kind: str, symbol: str, part: int
+) -> List[Unit]:
+    """Greedily cut a line range into pieces of at most `limit` cost"""
+    units = []
+    piece_start = start
+    for line in range(start, end + 1):
+        if line > piece_start and table.cost(piece_start, line) > limit:
+            units.append(Unit(piece_start, line - 1, kind, symbol, part))
+            part += 1
+            piece_start = line
+    units.append(Unit(piece_start, end, kind, symbol, part))
+    return units
+
+
+_DEFS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def _node_start(node: ast.AST) -> int:
+    """First line of a statement, including any decorators"""
+    decorators = getattr(node, "decorator_list", None) or []
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+class _PythonUnits:
+    def __init__(self, table: LineTable, limit: int):
+        self.table = table
+        self.limit = limit
+        self.units: List[Unit] = []
+
+    def add(self, start: int, end: int, kind: str, symbol: str, part: int = 0) -> None:
+        trimmed = self.table.trim(start, end)
+        if trimmed:
+            self.units.append(Unit(trimmed[0], trimmed[1], kind, symbol, part))
+
+    def body(self, body, start: int, end: int, scope: str, gap_kind: str) -> None:
+        """Emit definitions in `body` and the code between them, in order"""
+        cursor = start
+        for node in body:
+            if not isinstance(node, _DEFS):
+                continue
+            node_start = _node_start(node)
+            if cursor < node_start:
+                self.add(cursor, node_start - 1, gap_kind, scope)
+            self.definition(node, node_start, scope, in_class=gap_kind == "class")
+            cursor = node.end_lineno + 1
+        if cursor <= end:
+            self.add(cursor, end, gap_kind, scope)
+
+    def definition(self, node, start: int, scope: str, in_class: bool) -> None:
+        end = node.end_lineno
+        symbol = f"{scope}.{node.name}" if scope else node.name
+        if isinstance(node, ast.ClassDef):
+            kind = "class"
+        else:
+            kind = "method" if in_class else "function"
+
+        if self.table.cost(start, end) <= self.limit:
+            self.add(start, end, kind, symbol)
+        elif kind == "class":
+            # Header, class attributes and each method become their own units
+            self.body(node.body, start, end, symbol, "class")
+        else:
+            self.function(node, start, end, kind, symbol)
+
+    def function(self, node, start: int, end: int, kind: str, symbol: str) -> None:
+        """Split an oversized function at top-level statement boundaries"""
+        part = 0
+        piece_start = start
+        has_statements = False
+        for stmt in node.body:
+            stmt_start, stmt_end = _node_start(stmt), stmt.end_lineno
+            if self.table.cost(piece_start, stmt_end) <= self.limit:
+                has_statements = True
+                continue
+            if has_statements:
+                self.add(piece_start, stmt_start - 1, kind, symbol, part)
+                part += 1
+                piece_start = stmt_start
+                if self.table.cost(piece_start, stmt_end) <= self.limit:
+                    continue
+            # A single statement (with the signature, if still pending) is too big
+            pieces = split_lines(self.table, piece_start, stmt_end, self.limit, kind, symbol, part)
+            self.units.extend(pieces)
+            part += len(pieces)
+            piece_start = stmt_end + 1
+            has_statements = False
+        if piece_start <= end:
+            self.add(piece_start, end, kind, symbol, part)
+
+
+def python_units(content: str, table: LineTable, limit: int) -> Optional[List[Unit]]:
+    """Units of a Python module, or None if it does not parse
+
+    Every top-level class and function becomes a unit, as does the module
+    code between them. Definitions larger than `limit` are split: classes
+    into their methods, functions at statement boundaries.
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    builder = _PythonUnits(table, limit)
+    builder.body(tree.body, 1, len(table), "", "module")
+    return builder.units
+
+
+def pack_units(units: List[Unit], table: LineTable, limit: int) -> List[Unit]:
+    """Merge runs of adjacent small units whose combined range fits `limit`"""
+    packed: List[Unit] = []
+    run: List[Unit] = []
+
+    def flush():
+        if not run:
+            return
+        if len(run) == 1:
+            packed.append(run[0])
+        else:
+            kinds = {u.kind for u in run}
+            symbols = list(dict.fromkeys(u.symbol for u in run if u.symbol))
+            packed.append(
+                Unit(
+                    run[0].start_line,
+                    run[-1].end_line,
+                    kinds.pop() if len(kinds) == 1 else "group",
+                    ",".join(symbols),
+                )
+            )
+        run.clear()
+
+    for unit in units:
+        if run and table.cost(run[0].start_line, unit.end_line) > limit:
+            flush()
+        run.append(unit)
+    flush()
+    return packed
+
+
+class _BraceScanner:
+    """Single pass over C-family source recording brace depth at each line start
+
+    Braces inside strings, character literals and comments are ignored. JS/TS
+    template literals are followed into and out of `${...}` expressions, Go
+    raw strings and Java text blocks may span lines. Parenthesis depth is
+    recorded too, so signatures wrapped over several lines can be found.
+    """
+
+    _INTERESTING = re.compile(r"[{}()\n\"'`/]")
+    _TEMPLATE = re.compile(r"[`\\\n]|\$\{")
+
+    def __init__(self, content: str, language: str):
+        self.content = content
+        self.language = language
+        self.depth = 0
+        self.paren = 0
+        self.depths = [0]
+        self.parens = [0]
+        self.templates: List[int] = []
+
+    def _newline(self) -> None:
+        self.depths.append(self.depth)
+        self.parens.append(self.paren)
+
+    def _newlines(self, start: int, end: int) -> None:
+        for _ in range(self.content.count("\n", start, end)):
+            self._newline()
+
+    def _skip_to(self, pos: int, needle: str) -> int:
+        """Skip past the next `needle`, recording any newlines on the way"""
+        end = self.content.find(needle, pos)
+        end = len(self.content) if end < 0 else end + len(needle)
+        self._newlines(pos, end)
+        return end
+
+    def _string(self, pos: int, quote: str) -> int:
+        """Skip a single-line string literal opened just before `pos`"""
+        content = self.content
+        n = len(content)
+        while pos < n:
+            c = content[pos]
+            if c == "\\":
+                if content[pos + 1 : pos + 2] == "\n":
+                    self._newline()
+                pos += 2
+            elif c == quote:
+                return pos + 1
+            elif c == "\n":
+                return pos  # unterminated; let the main loop record the newline
+            else:
+                pos += 1
+        return n
+
+    def _template(self, pos: int) -> int:
+        """Skip template literal text until its end or the next `${`"""
+        while True:
+            m = self._TEMPLATE.search(self.content, pos)
+            if not m:
+                return len(self.content)
+            token = m.group(0)
+            if token == "`":
+                return m.end()
+            if token == "\n":
+                self._newline()
+                pos = m.end()
+            elif token == "\\":
+                self._newlines(m.end(), m.end() + 1)
+                pos = m.end() + 1
+            else:  # "${": scan the expression as code until its closing brace
+                self.templates.append(self.depth)
+                return m.end()
+
+    def scan(self) -> Tuple[List[int], List[int]]:
+        """Brace and paren depth at the start of each line and at end of file"""
+        content = self.content
+        search = self._INTERESTING.search
+        pos = 0
+        while True:
+            m = search(content, pos)
+            if not m:
+                break
+            i = m.start()
+            c = content[i]
+            if c == "\n":
+                self._newline()
+                pos = i + 1
+            elif c == "(":
+                self.paren += 1
+                pos = i + 1
+            elif c == ")":
+                self.paren = max(0, self.paren - 1)
+                pos = i + 1
+            elif c == "{":
+                self.depth += 1
+                pos = i + 1
+            elif c == "}":
+                if self.templates and self.templates[-1] == self.depth:
+                    self.templates.pop()
+                    pos = self._template(i + 1)
+                else:
+                    self.depth = max(0, self.depth - 1)
+                    pos = i + 1
+            elif c == "/":
+                nxt = content[i + 1 : i + 2]
+                if nxt == "/":
+                    end = content.find("\n", i)
+                    pos = len(content) if end < 0 else end
+                elif nxt == "*":
+                    pos = self._skip_to(i + 2, "*/")
+                else:
+                    pos = i + 1
+            elif c == "`":
+                if self.language == "go":
+                    pos = self._skip_to(i + 1, "`")
+                else:
+                    pos = self._template(i + 1)
+            elif c == '"' and content.startswith('"""', i):
+                pos = self._skip_to(i + 3, '"""')
+            else:
+                pos = self._string(i + 1, c)
+        self._newline()
+        return self.depths, self.parens
+
+
+def brace_depths(content: str, language: str) -> Tuple[List[int], List[int]]:
+    """Brace and paren depth at the start of each line
+
+    `depths[i]` is the depth at the start of line i + 1, so `depths[i]` is
+    also the depth at the end of line i; the last entry is the end of file.
+    """
+    return _BraceScanner(content, language).scan()
+
+
+_CLASS_KINDS = {"class"}
+
+_DECLARATIONS = {
+    "javascript": [
+        (re.compile(
+            r"^(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:abstract\s+)?"
+            r"(?:class|interface|enum|namespace|module)\s+([A-Za-z_$][\w$.]*)"
+        ), "class"),
+        (re.compile(
+            r"^(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"
+        ), "function"),
+        (re.compile(r"^(?:export\s+)?type\s+([A-Za-z_$][\w$]*)"), "type"),
+        (re.compile(r"^(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)"), "function"),
+        (re.compile(
+            r"^(?:(?:public|private|protected|static|readonly|async|get|set|override|abstract)"
+            r"\s+)*\*?\s*(#?[A-Za-z_$][\w$]*)\s*(?:<[^>]*>)?\s*\("
+        ), "method"),
+    ],
+    "go": [
+        (re.compile(r"^type\s+([A-Za-z_]\w*)"), "type"),
+        (re.compile(r"^func\s+\(\s*\w*\s*\*?\s*([A-Za-z_]\w*)[^)]*\)\s*([A-Za-z_]\w*)"), "method"),
+        (re.compile(r"^func\s+([A-Za-z_]\w*)"), "function"),
+    ],
+    "java": [
+        (re.compile(r"\b(?:class|interface|enum|record)\s+([A-Za-z_]\w*)"), "class"),
+        (re.compile(r"([A-Za-z_]\w*)\s*\([^;]*$"), "method"),
+    ],
+}
+_DECLARATIONS["typescript"] = _DECLARATIONS["javascript"]
+
+_KEYWORDS = {"if", "for", "while", "switch", "catch", "return", "function", "new", "else"}
+
+
+def _classify(header: str, language: str, scope: str) -> Tuple[str, str]:
+    """Kind and qualified name of a block from its header text"""
+    for pattern, kind in _DECLARATIONS.get(language, []):
+        m = pattern.search(header)
+        if not m or m.group(1) in _KEYWORDS:
+            continue
+        if language == "go" and kind == "method":
+            return "method", f"{m.group(1)}.{m.group(2)}"
+        if kind == "method" and not scope and language != "java":
+            kind = "function"
+        return kind, f"{scope}.{m.group(1)}" if scope else m.group(1)
+    return "block", scope
+
+
+def _is_comment(line: str) -> bool:
+    """Comment or annotation line that documents the block below it"""
+    return line.lstrip().startswith(("//", "/*", "*", "@"))
+
+
+class _BraceUnits:
+    def __init__(
+        self,
+        table: LineTable,
+        depths: List[int],
+        parens: List[int],
+        language: str,
+        limit: int,
+    ):
+        self.table = table
+        self.depths = depths
+        self.parens = parens
+        self.language = language
+        self.limit = limit
+        self.units: List[Unit] = []
+
+    def add(self, start: int, end: int, kind: str, symbol: str, part: int = 0) -> None:
+        trimmed = self.table.trim(start, end)
+        if trimmed:
+            self.units.append(Unit(trimmed[0], trimmed[1], kind, symbol, part))
+
+    def blocks(self, start: int, end: int, base: int) -> List[Tuple[int, int]]:
+        """Line ranges of blocks opened at depth `base` within [start, end]"""
+        depths, parens, lines = self.depths, self.parens, self.table.lines
+        found = []
+        line = start
+        while line <= end:
+            if depths[line - 1] == base and depths[line] > base:
+                block_end = line
+                while block_end < end and depths[block_end] > base:
+                    block_end += 1
+                # Pull in leading comments, annotations and wrapped signatures
+                block_start = line
+                floor = found[-1][1] + 1 if found else start
+                while block_start > floor and (
+                    parens[block_start - 1] > 0 or _is_comment(lines[block_start - 2])
+                ):
+                    block_start -= 1
+                found.append((block_start, block_end))
+                line = block_end + 1
+            else:
+                line += 1
+        return found
+
+    def body(self, start: int, end: int, base: int, scope: str, gap_kind: str) -> None:
+        cursor = start
+        for block_start, block_end in self.blocks(start, end, base):
+            if cursor < block_start:
+                self.add(cursor, block_start - 1, gap_kind, scope)
+            self.block(block_start, block_end, base, scope)
+            cursor = block_end + 1
+        if cursor <= end:
+            self.add(cursor, end, gap_kind, scope)
+
+    def classify(self, start: int, end: int, scope: str) -> Tuple[str, str]:
+        header_lines = []
+        for line in self.table.lines[start - 1 : end]:
+            stripped = line.strip()
+            if stripped.startswith(("//", "/*", "*", "@")) and "{" not in stripped:
+                continue
+            header_lines.append(stripped)
+            if "{" in stripped:
+                break
+        return _classify(" ".join(header_lines), self.language, scope)
+
+    def block(self, start: int, end: int, base: int, scope: str) -> None:
+        kind, symbol = self.classify(start, end, scope)
+
+        if self.table.cost(start, end) <= self.limit:
+            self.add(start, end, kind, symbol)
+        elif kind in _CLASS_KINDS:
+            self.body(start, end, base + 1, symbol, "class")
+        else:
+            self.split(start, end, base, kind, symbol)
+
+    def split(self, start: int, end: int, base: int, kind: str, symbol: str) -> None:
+        """Cut an oversized block at statement boundaries of its body"""
+        depths, table, limit = self.depths, self.table, self.limit
+        part = 0
+        piece_start = start
+        boundary = 0
+        for line in range(start + 1, end + 1):
+            if depths[line - 1] == base + 1:
+                boundary = line
+            if table.cost(piece_start, line) <= limit:
+                continue
+            cut = boundary if boundary > piece_start else line
+            if cut > piece_start:
+                self.add(piece_start, cut - 1, kind, symbol, part)
+                part += 1
+                piece_start = cut
+        self.add(piece_start, end, kind, symbol, part)
+
+
+def brace_units(
+    content: str, table: LineTable, language: str, limit: int
+) -> List[Unit]:
+    """Units of a brace-delimited source file (JavaScript, TypeScript, Go, Java)
+
+    Top-level functions, classes, methods and types become units; large
+    class-like blocks are split into members and other large blocks at
+    statement boundaries. Code between blocks is kept as its own units.
+    """
+    depths, parens = brace_depths(content, language)
+    builder = _BraceUnits(table, depths, parens, language, limit)
+    builder.body(1, len(table), 0, "", "module")
+    return builder.units
+
+
+_SINGLE_LINE_FUNCTION = re.compile(r"\bfunction\b|\bfunc\b|=>|\)\s*(?::[^{]*)?\{.*\}")
+
+
+def brace_definitions(content: str, language: str) -> List[Unit]:
+    """Every class-like block, function and method, with qualified names
+
+    Unlike `brace_units` nothing is split or packed: members of class-like
+    blocks are listed recursively and function bodies are not searched.
+    """
+    depths, parens = brace_depths(content, language)
+    table = LineTable(content, word_costs)
+    builder = _BraceUnits(table, depths, parens, language, 0)
+    found: List[Unit] = []
+
+    def single_lines(start: int, end: int, base: int, scope: str) -> None:
+        """One-line declarations such as `type ID int` or `class A {}`"""
+        for line in range(start, end + 1):
+            text = table.lines[line - 1].strip()
+            if depths[line - 1] != base or depths[line] != base or _is_comment(text):
+                continue
+            kind, symbol = _classify(text.split("{", 1)[0], language, scope)
+            if kind in ("class", "type") or (
+                kind != "block" and _SINGLE_LINE_FUNCTION.search(text)
+            ):
+                found.append(Unit(line, line, kind, symbol))
+
+    def walk(start: int, end: int, base: int, scope: str) -> None:
+        cursor = start
+        for block_start, block_end in builder.blocks(start, end, base):
+            single_lines(cursor, block_start - 1, base, scope)
+            cursor = block_end + 1
+            kind, symbol = builder.classify(block_start, block_end, scope)
+            if kind == "block":
+                continue
+            found.append(Unit(block_start, block_end, kind, symbol))
+            if kind in _CLASS_KINDS:
+                walk(block_start, block_end, base + 1, symbol)
+        single_lines(cursor, end, base, scope)
+
+    walk(1, len(table), 0, "")
+    return found
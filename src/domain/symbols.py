@@ -0,0 +1,493 @@
+"""Symbol table of definitions and references, stored for mmap lookup"""
+
+import ast
+import builtins
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.domain.entities import CodeChunk
+from src.domain.structure import brace_definitions
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class Definition(NamedTuple):
+    name: str  # qualified within the file: Class.method
+    kind: str
+    file_path: str
+    start_line: int
+    end_line: int
+    chunk_id: str = ""
+
+
+class Reference(NamedTuple):
+    name: str  # the referenced name as written at the use site, without qualifiers
+    file_path: str
+    line: int
+    caller: str = ""  # qualified name of the enclosing definition, if any
+    chunk_id: str = ""
+    call: bool = False
+
+
+# -- extraction -------------------------------------------------------------
+
+_IGNORED_NAMES = set(dir(builtins)) | {"self", "cls", "super"}
+
+_BRACE_CALL = re.compile(r"(?<![\w$.])(?:new\s+)?(?:[\w$]+\.)*([A-Za-z_$][\w$]*)\s*\(")
+_BRACE_KEYWORDS = {
+    "if", "for", "while", "switch", "catch", "return", "function", "typeof", "new",
+    "super", "this", "func", "defer", "go", "select", "synchronized", "await", "import",
+}
+
+
+class _PythonSymbols(ast.NodeVisitor):
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.scope: List[str] = []
+        self.kinds: List[str] = []
+        self.defs: List[Definition] = []
+        self.refs: List[Reference] = []
+
+    def _define(self, node, kind: str) -> None:
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        name = ".".join(self.scope + [node.name])
+        self.defs.append(Definition(name, kind, self.file_path, start, node.end_lineno))
+        for expr in node.decorator_list:
+            self.visit(expr)
+        self.scope.append(node.name)
+        self.kinds.append(kind)
+        for child in ast.iter_child_nodes(node):
+            if child not in node.decorator_list:
+                self.visit(child)
+        self.scope.pop()
+        self.kinds.pop()
+
+    def visit_ClassDef(self, node):
+        self._define(node, "class")
+
+    def visit_FunctionDef(self, node):
+        in_class = bool(self.kinds) and self.kinds[-1] == "class"
+        self._define(node, "method" if in_class else "function")
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def _refer(self, name: str, line: int, call: bool) -> None:
+        if name not in _IGNORED_NAMES:
+            self.refs.append(
+                Reference(name, self.file_path, line, ".".join(self.scope), call=call)
+            )
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Name):
+            self._refer(func.id, node.lineno, True)
+        elif isinstance(func, ast.Attribute):
+            self._refer(func.attr, node.lineno, True)
+            self.visit(func.value)
+        else:
+            self.visit(func)
+        for child in node.args + node.keywords:
+            self.visit(child)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self._refer(node.id, node.lineno, False)
+
+    def visit_Attribute(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self._refer(node.attr, node.lineno, False)
+        self.visit(node.value)
+
+
+def _python_symbols(content: str, file_path: str):
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError, RecursionError):
+        return [], []
+    visitor = _PythonSymbols(file_path)
+    visitor.visit(tree)
+    return visitor.defs, visitor.refs
+
+
+def _brace_symbols(content: str, file_path: str, language: str):
+    defs = [
+        Definition(u.symbol, u.kind, file_path, u.start_line, u.end_line)
+        for u in brace_definitions(content, language)
+    ]
+    # Innermost definition per line, so each call is attributed to its caller
+    owner: List[Optional[str]] = [None] * (content.count("\n") + 2)
+    for d in sorted(defs, key=lambda d: d.start_line - d.end_line):
+        for line in range(d.start_line, d.end_line + 1):
+            owner[line] = d.name
+    lines = content.split("\n")
+    # The line declaring each definition; its parameter list is not a call
+    headers = set()
+    for d in defs:
+        short = _short_name(d.name)
+        for line_no in range(d.start_line, d.end_line + 1):
+            if short in lines[line_no - 1]:
+                headers.add((line_no, short))
+                break
+
+    refs = []
+    for line_no, line in enumerate(lines, start=1):
+        stripped = line.lstrip()
+        if stripped.startswith(("//", "/*", "*", "@")):
+            continue
+        for m in _BRACE_CALL.finditer(line):
+            name = m.group(1)
+            if name in _BRACE_KEYWORDS or (line_no, name) in headers:
+                continue
+            refs.append(Reference(name, file_path, line_no, owner[line_no] or "", call=True))
+    return defs, refs
+
+
+def extract_symbols(
+    content: str, language: str, file_path: str, chunks: Sequence[CodeChunk] = ()
+) -> Tuple[List[Definition], List[Reference]]:
+    """Definitions and references in one file, tagged with the chunk holding each"""
+    if language == "python":
+        defs, refs = _python_symbols(content, file_path)
+    elif language in ("javascript", "typescript", "go", "java"):
+        defs, refs = _brace_symbols(content, file_path, language)
+    else:
+        return [], []
+    if chunks:
+        ordered = sorted(chunks, key=lambda c: c.start_line)
+        starts = [c.start_line for c in ordered]
+
+        def chunk_at(line: int) -> str:
+            i = bisect.bisect_right(starts, line) - 1
+            return ordered[i].id if i >= 0 and ordered[i].end_line >= line else ""
+
+        defs = [d._replace(chunk_id=chunk_at(d.start_line)) for d in defs]
+        refs = [r._replace(chunk_id=chunk_at(r.line)) for r in refs]
+    return defs, refs
+
+
+_NAME = r"`?([A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)(?:\(\))?`?"
+_NAVIGATION = [
+    (re.compile(rf"(?:where\s+is|where's|find)\s+{_NAME}\s+(?:defined|declared)", re.I),
+     "definitions"),
+    (re.compile(rf"(?:definition|declaration)\s+of\s+{_NAME}", re.I), "definitions"),
+    (re.compile(rf"(?:who|what)\s+calls\s+{_NAME}", re.I), "callers"),
+    (re.compile(rf"callers\s+of\s+{_NAME}", re.I), "callers"),
+    (re.compile(rf"(?:where\s+is|where's)\s+{_NAME}\s+(?:used|called|referenced)", re.I),
+     "references"),
+    (re.compile(rf"(?:usages|uses|references)\s+of\s+{_NAME}", re.I), "references"),
+]
+
+
+def parse_navigation(query: str) -> Optional[Tuple[str, str]]:
+    """(intent, name) for navigational questions, None for anything else
+
+    Intents are "definitions", "callers" and "references".
+    """
+    for pattern, intent in _NAVIGATION:
+        m = pattern.search(query)
+        if m:
+            return intent, m.group(1)
+    return None
+
+
+# -- storage ----------------------------------------------------------------
+
+_MAGIC = b"CSYMTAB1"
+_NONE = 0xFFFFFFFF
+_DEF_DTYPE = np.dtype([
+    ("key", "<u4"), ("name", "<u4"), ("kind", "<u4"), ("path", "<u4"),
+    ("start", "<u4"), ("end", "<u4"), ("chunk", "<u4"),
+])
+_REF_DTYPE = np.dtype([
+    ("key", "<u4"), ("path", "<u4"), ("line", "<u4"), ("caller", "<u4"),
+    ("chunk", "<u4"), ("call", "u1"),
+])
+_GROUP_DTYPE = np.dtype([("key", "<u4"), ("start", "<u4"), ("count", "<u4")])
+
+
+def _short_name(name: str) -> str:
+    return name.rsplit(".", 1)[-1]
+
+
+def _hash(key: bytes) -> int:
+    return zlib.crc32(key)
+
+
+class _Strings:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def id(self, value: str) -> int:
+        if not value:
+            return _NONE
+        sid = self.index.get(value)
+        if sid is None:
+            sid = self.index[value] = len(self.index)
+        return sid
+
+
+def _grouped(records: np.ndarray, strings: List[bytes]):
+    """Sort records by key and build (groups, open-addressing slots) over the keys"""
+    records = records[np.argsort(records["key"], kind="stable")]
+    keys, starts, counts = np.unique(records["key"], return_index=True, return_counts=True)
+    groups = np.zeros(len(keys), dtype=_GROUP_DTYPE)
+    groups["key"], groups["start"], groups["count"] = keys, starts, counts
+    size = 1
+    while size < 2 * len(keys):
+        size *= 2
+    slots = np.zeros(size if len(keys) else 0, dtype="<u4")
+    mask = size - 1
+    for g, key in enumerate(keys.tolist()):
+        i = _hash(strings[key]) & mask
+        while slots[i]:
+            i = (i + 1) & mask
+        slots[i] = g + 1
+    return records, groups, slots
+
+
+def write_symbol_table(
+    path: Path, defs: Iterable[Definition], refs: Iterable[Reference]
+) -> None:
+    """Write definitions and references to one file, atomically
+
+    Layout: magic, header length, JSON header with section offsets, then
+    8-byte-aligned sections: a UTF-8 string pool with its offsets, and for
+    definitions and references the fixed-size records sorted by lookup key,
+    one group (key, first record, count) per key and a hash table of groups.
+    Definitions are keyed by qualified and by short name; references by the
+    name they use.
+    """
+    strings = _Strings()
+    def_rows, ref_rows = [], []
+    for d in defs:
+        row = (strings.id(d.name), strings.id(d.kind), strings.id(d.file_path),
+               d.start_line, d.end_line, strings.id(d.chunk_id))
+        def_rows.append((row[0],) + row)
+        short = _short_name(d.name)
+        if short != d.name:
+            def_rows.append((strings.id(short),) + row)
+    for r in refs:
+        ref_rows.append((strings.id(r.name), strings.id(r.file_path), r.line,
+                         strings.id(r.caller), strings.id(r.chunk_id), int(r.call)))
+
+    pool = [s.encode("utf-8") for s in strings.index]
+    offsets = np.zeros(len(pool) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(b) for b in pool])
+    def_records, def_groups, def_slots = _grouped(np.array(def_rows, dtype=_DEF_DTYPE), pool)
+    ref_records, ref_groups, ref_slots = _grouped(np.array(ref_rows, dtype=_REF_DTYPE), pool)
+    sections = {
+        "strings": np.frombuffer(b"".join(pool), dtype=np.uint8),
+        "string_offsets": offsets,
+        "defs": def_records,
+        "def_groups": def_groups,
+        "def_slots": def_slots,
+        "refs": ref_records,
+        "ref_groups": ref_groups,
+        "ref_slots": ref_slots,
+    }
+
+    header, cursor = {}, 0
+    for name, array in sections.items():
+        header[name] = [cursor, len(array)]
+        cursor += -(-array.nbytes // 8) * 8
+    encoded = json.dumps(header).encode("utf-8")
+    base = -(-(len(_MAGIC) + 8 + len(encoded)) // 8) * 8
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC + struct.pack("<Q", len(encoded)) + encoded)
+        for name, array in sections.items():
+            f.seek(base + header[name][0])
+            f.write(array.tobytes())
+        f.truncate(base + cursor)
+    os.replace(tmp, path)
+
+
+class SymbolTable:
+    """Read-only symbol lookups over a memory-mapped table file
+
+    Opening maps the file and wraps each section in a NumPy view without
+    parsing it; a lookup hashes the name, probes a few slots and decodes
+    only the matching records.
+    """
+
+    _DTYPES = {
+        "strings": np.uint8, "string_offsets": "<u8", "defs": _DEF_DTYPE,
+        "def_groups": _GROUP_DTYPE, "def_slots": "<u4", "refs": _REF_DTYPE,
+        "ref_groups": _GROUP_DTYPE, "ref_slots": "<u4",
+    }
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{self.path} is not a symbol table")
+        (length,) = struct.unpack_from("<Q", self._mm, len(_MAGIC))
+        start = len(_MAGIC) + 8
+        header = json.loads(self._mm[start : start + length])
+        base = -(-(start + length) // 8) * 8
+        self._pool_start = base + header["strings"][0]
+        for name, (offset, count) in header.items():
+            view = np.frombuffer(
+                self._mm, dtype=self._DTYPES[name], count=count, offset=base + offset
+            )
+            setattr(self, f"_{name}", view)
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["SymbolTable"]:
+        """Open the table at `path`, or None if it has not been written yet"""
+        return cls(path) if Path(path).exists() else None
+
+    def _bytes(self, sid: int) -> bytes:
+        start = self._pool_start + int(self._string_offsets[sid])
+        end = self._pool_start + int(self._string_offsets[sid + 1])
+        return self._mm[start:end]
+
+    def _string(self, sid: int) -> str:
+        return "" if sid == _NONE else self._bytes(sid).decode("utf-8")
+
+    def _records(self, name: str, slots, groups, records) -> np.ndarray:
+        if not len(slots):
+            return records[:0]
+        key = name.encode("utf-8")
+        mask = len(slots) - 1
+        i = _hash(key) & mask
+        while True:
+            g = int(slots[i])
+            if not g:
+                return records[:0]
+            group = groups[g - 1]
+            if self._bytes(int(group["key"])) == key:
+                start = int(group["start"])
+                return records[start : start + int(group["count"])]
+            i = (i + 1) & mask
+
+    def _definition(self, rec) -> Definition:
+        s = self._string
+        return Definition(s(int(rec["name"])), s(int(rec["kind"])), s(int(rec["path"])),
+                          int(rec["start"]), int(rec["end"]), s(int(rec["chunk"])))
+
+    def _reference(self, rec, name: str) -> Reference:
+        s = self._string
+        return Reference(name, s(int(rec["path"])), int(rec["line"]), s(int(rec["caller"])),
+                         s(int(rec["chunk"])), bool(rec["call"]))
+
+    def definitions(self, name: str) -> List[Definition]:
+        """Where `name` is defined; accepts a qualified (A.b) or a short name"""
+        records = self._records(name, self._def_slots, self._def_groups, self._defs)
+        return [self._definition(rec) for rec in records]
+
+    def references(self, name: str, calls_only: bool = False) -> List[Reference]:
+        """Where `name` (or `A.name`) is used; `calls_only` keeps call sites"""
+        short = _short_name(name)
+        records = self._records(short, self._ref_slots, self._ref_groups, self._refs)
+        if calls_only:
+            records = records[records["call"] == 1]
+        return [self._reference(rec, short) for rec in records]
+
+    def callers(self, name: str) -> List[str]:
+        """Qualified names of definitions that call `name`"""
+        return sorted({r.caller for r in self.references(name, calls_only=True) if r.caller})
+
+    def navigate(self, query: str) -> Optional[Dict]:
+        """Answer "where is X defined" / "who calls Y" style questions by lookup"""
+        parsed = parse_navigation(query)
+        if parsed is None:
+            return None
+        intent, name = parsed
+        if intent == "definitions":
+            results = self.definitions(name)
+        else:
+            results = self.references(name, calls_only=intent == "callers")
+        return {"intent": intent, "symbol": name, "results": [r._asdict() for r in results]}
+
+    def files(self) -> Dict[str, Tuple[List[Definition], List[Reference]]]:
+        """Every definition and reference, grouped by file"""
+        files: Dict[str, Tuple[List[Definition], List[Reference]]] = {}
+        for rec in self._defs:
+            if rec["key"] == rec["name"]:
+                d = self._definition(rec)
+                files.setdefault(d.file_path, ([], []))[0].append(d)
+        for rec in self._refs:
+            r = self._reference(rec, self._string(int(rec["key"])))
+            files.setdefault(r.file_path, ([], []))[1].append(r)
+        return files
+
+    def close(self) -> None:
+        for name in self._DTYPES:
+            setattr(self, f"_{name}", None)
+        self._mm.close()
+
+
+class OpenSymbolTables:
+    """The symbol tables matching `pattern` under `root`, kept open between calls
+
+    Each call stats the files and reopens a table only when its inode or
+    mtime changed, i.e. when `write_symbol_table` swapped in a new file. A
+    replaced table is dropped, not closed, as a lookup may still be using
+    it; its mapping goes with the last reference.
+    """
+
+    def __init__(self, root: Path, pattern: str = "*/symbols.bin"):
+        self.root = Path(root)
+        self.pattern = pattern
+        self._open: Dict[Path, Tuple[Tuple[int, int], SymbolTable]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self) -> List[SymbolTable]:
+        opened: Dict[Path, Tuple[Tuple[int, int], SymbolTable]] = {}
+        with self._lock:
+            for path in sorted(self.root.glob(self.pattern)):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                stamp = (stat.st_ino, stat.st_mtime_ns)
+                cached = self._open.get(path)
+                if cached is None or cached[0] != stamp:
+                    cached = (stamp, SymbolTable(path))
+                opened[path] = cached
+            self._open = opened
+        return [table for _, table in opened.values()]
+
+
+class SymbolTableBuilder:
+    """Per-file symbols, updated incrementally and written as one table"""
+
+    def __init__(self):
+        self.files: Dict[str, Tuple[List[Definition], List[Reference]]] = {}
+
+    @classmethod
+    def load(cls, path: Path) -> "SymbolTableBuilder":
+        builder = cls()
+        table = SymbolTable.open(path)
+        if table is not None:
+            builder.files = table.files()
+            table.close()
+        return builder
+
+    def update(self, file_path: str, defs: List[Definition], refs: List[Reference]) -> None:
+        self.files[file_path] = (defs, refs)
+
+    def remove(self, file_path: str) -> None:
+        self.files.pop(file_path, None)
+
+    def write(self, path: Path) -> None:
+        defs = [d for file_defs, _ in self.files.values() for d in file_defs]
+        refs = [r for _, file_refs in self.files.values() for r in file_refs]
+        write_symbol_table(path, defs, refs)
+        logger.info(f"Wrote symbol table {path}: {len(defs)} definitions, {len(refs)} references")
@@ -0,0 +1,96 @@
+"""Token counting with the embedding model's tokenizer"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+from src.app.core.config import settings
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Words, numbers and individual punctuation marks; close to subword counts on code
+_HEURISTIC = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def heuristic_count(text: str) -> int:
+    """Approximate token count for when no tokenizer is available"""
+    return len(_HEURISTIC.findall(text))
+
+
+class TokenCounter:
+    """Counts tokens as the embedding model sees them, caching counts per text
+
+    Without `use_tokenizer` a regex heuristic is used, so chunk boundaries
+    (and chunk IDs) never depend on network access. With it, the tokenizer
+    is loaded lazily from `transformers`, falling back to the heuristic if
+    it is not installed or the model cannot be loaded. Counts exclude
+    special tokens.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        cache_size: int = 100_000,
+        use_tokenizer: bool = False,
+    ):
+        self.model_name = model_name or settings.embedding_model
+        self.cache_dir = cache_dir or settings.embedding_cache_dir
+        self.cache_size = cache_size
+        self.use_tokenizer = use_tokenizer
+        self._tokenizer = None
+        self._loaded = False
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def tokenizer(self):
+        if not self._loaded:
+            self._loaded = True
+            if self.use_tokenizer:
+                try:
+                    from transformers import AutoTokenizer
+
+                    self._tokenizer = AutoTokenizer.from_pretrained(
+                        self.model_name, cache_dir=self.cache_dir
+                    )
+                except Exception as e:
+                    logger.info(f"Tokenizer for {self.model_name} unavailable ({e}); "
+                                "using heuristic token counts")
+        return self._tokenizer
+
+    def _count_uncached(self, texts: List[str]) -> List[int]:
+        tokenizer = self.tokenizer
+        if tokenizer is None:
+            return [heuristic_count(t) for t in texts]
+        encoded = tokenizer(texts, add_special_tokens=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        """Token count of each text; repeated texts are served from the cache"""
+        counts: List[Optional[int]] = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                n = self._cache.get(text)
+                if n is None:
+                    missing.setdefault(text, []).append(i)
+                else:
+                    self._cache.move_to_end(text)
+                    counts[i] = n
+        if missing:
+            fresh = list(missing)
+            fresh_counts = self._count_uncached(fresh)
+            with self._lock:
+                for text, n in zip(fresh, fresh_counts):
+                    for i in missing[text]:
+                        counts[i] = n
+                    self._cache[text] = n
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return counts
+
+    def count(self, text: str) -> int:
+        return self.count_many([text])[0]
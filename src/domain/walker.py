@@ -0,0 +1,302 @@
+"""Ignore-aware repository walker built on os.scandir"""
+
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.app.core.config import settings
+from src.domain.chunker import CodeChunker
+from src.app.core import telemetry
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+IGNORE_FILES = (".gitignore", ".ignore")  # later files take precedence
+
+
+def _translate(pattern: str) -> str:
+    """Regex for one gitignore glob: * and ? stop at /, ** crosses directories"""
+    out, i, n = [], 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                if pattern.startswith("**/", i):
+                    out.append("(?:.*/)?")
+                    i += 3
+                else:
+                    out.append(".*")
+                    i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith("[!", i) else i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreFile:
+    """Compiled patterns of one ignore file, matched against paths relative to `base`
+
+    Follows gitignore rules: patterns without an inner slash match a name at
+    any depth, others are anchored to the file's directory; a trailing slash
+    matches directories only; `!` re-includes; the last matching line wins.
+    Without negations every pattern is folded into a single regex.
+    """
+
+    def __init__(self, base: str, lines: Iterable[str]):
+        self.base = base
+        # (regex, negated, dir_only) in file order
+        self.rules: List[Tuple["re.Pattern", bool, bool]] = []
+        for raw in lines:
+            line = raw.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            if not line.endswith("\\ "):
+                line = line.rstrip()
+            negated = line.startswith("!")
+            if negated or line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            body = _translate(line.lstrip("/"))
+            prefix = "" if anchored else "(?:.*/)?"
+            self.rules.append((re.compile(f"{prefix}{body}(?:/.*)?"), negated, dir_only))
+        self._any = self._files = None
+        if self.rules and not any(negated for _, negated, _ in self.rules):
+            self._any = re.compile("|".join(f"(?:{r.pattern})" for r, _, _ in self.rules))
+            plain = [r.pattern for r, _, dir_only in self.rules if not dir_only]
+            self._files = re.compile("|".join(f"(?:{p})" for p in plain)) if plain else None
+
+    @classmethod
+    def read(cls, path: Path, base: str) -> Optional["IgnoreFile"]:
+        try:
+            text = path.read_text(encoding="utf-8", errors="ignore")
+        except OSError as e:
+            logger.warning(f"Cannot read ignore file {path}: {e}")
+            return None
+        ignore = cls(base, text.splitlines())
+        return ignore if ignore.rules else None
+
+    def match(self, rel: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included, None if no pattern applies"""
+        if self.base:
+            if not rel.startswith(self.base + "/"):
+                return None
+            rel = rel[len(self.base) + 1:]
+        if self._any is not None:
+            regex = self._any if is_dir else self._files
+            return True if regex is not None and regex.fullmatch(rel) else None
+        for regex, negated, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(rel):
+                return not negated
+        return None
+
+
+def is_ignored(rel: str, is_dir: bool, ignores: Tuple[IgnoreFile, ...]) -> bool:
+    """Apply ignore files from the most specific (last) to the least"""
+    for ignore in reversed(ignores):
+        decision = ignore.match(rel, is_dir)
+        if decision is not None:
+            return decision
+    return False
+
+
+def looks_binary(path: str, sniff_bytes: int = 8192) -> bool:
+    """Heuristic used by git and grep: a NUL byte early in the file"""
+    try:
+        with open(path, "rb") as f:
+            return b"\0" in f.read(sniff_bytes)
+    except OSError:
+        return True
+
+
+@dataclass
+class WalkStats:
+    """What a walk looked at and why files were left out"""
+
+    dirs_scanned: int = 0
+    dirs_pruned: int = 0
+    files_scanned: int = 0
+    files_yielded: int = 0
+    skipped_ignored: int = 0
+    skipped_extension: int = 0
+    skipped_size: int = 0
+    skipped_binary: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def add(self, other: "WalkStats") -> None:
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def as_dict(self) -> Dict:
+        data = dict(self.__dict__)
+        data["files_skipped"] = self.files_scanned - self.files_yielded
+        return data
+
+
+class RepoWalker:
+    """Lists indexable files under a directory without descending into ignored ones
+
+    Ignored directories (`ignore_patterns`, then `.gitignore` and `.ignore`
+    files found on the way down) are pruned before they are listed. Each
+    remaining file is checked cheapest first: extension (`extensions=None`
+    accepts any), ignore rules, size against `max_file_bytes`, then a
+    read of the first bytes to skip binaries. Symlinks are not followed.
+
+    With `workers > 1` directories are listed on a thread pool and files
+    come out in completion order; otherwise the walk is depth-first with
+    entries in name order. `stats` describes the last walk.
+    """
+
+    def __init__(
+        self,
+        ignore_patterns: Optional[Iterable[str]] = None,
+        extensions: Optional[Iterable[str]] = tuple(CodeChunker.LANGUAGE_EXTENSIONS),
+        max_file_bytes: Optional[int] = None,
+        use_ignore_files: bool = True,
+        sniff_bytes: int = 8192,
+        workers: int = 1,
+    ):
+        patterns = settings.ignore_patterns if ignore_patterns is None else ignore_patterns
+        self.root_ignore = IgnoreFile("", sorted(patterns))
+        self.extensions: Optional[Set[str]] = (
+            {e.lower() for e in extensions} if extensions is not None else None
+        )
+        self.max_file_bytes = (
+            settings.max_file_bytes if max_file_bytes is None else max_file_bytes
+        )
+        self.use_ignore_files = use_ignore_files
+        self.sniff_bytes = sniff_bytes
+        self.workers = workers
+        self.stats = WalkStats()
+
+    def walk(self, root: Path, recursive: bool = True) -> Iterator[Path]:
+        started = time.perf_counter()
+        self.stats = WalkStats()
+        base = (self.root_ignore,) if self.root_ignore.rules else ()
+        try:
+            if self.workers > 1 and recursive:
+                yield from self._walk_parallel(str(root), base)
+            else:
+                yield from self._walk_serial(str(root), base, recursive)
+        finally:
+            self.stats.elapsed = time.perf_counter() - started
+            logger.debug(f"Walked {root}: {self.stats.as_dict()}")
+            if telemetry.enabled():
+                self._record(self.stats)
+
+    @staticmethod
+    def _record(stats: WalkStats) -> None:
+        telemetry.observe("walk_seconds", stats.elapsed)
+        telemetry.count("walk_files_total", stats.files_yielded, outcome="yielded")
+        for reason in ("ignored", "extension", "size", "binary"):
+            telemetry.count("walk_files_total", getattr(stats, f"skipped_{reason}"), outcome=reason)
+
+    def _walk_serial(
+        self, root: str, ignores: Tuple[IgnoreFile, ...], recursive: bool
+    ) -> Iterator[Path]:
+        stack = [(root, "", ignores)]
+        while stack:
+            files, subdirs, stats = self._scan(*stack.pop())
+            self.stats.add(stats)
+            yield from files
+            if recursive:
+                stack.extend(reversed(subdirs))
+
+    def _walk_parallel(self, root: str, ignores: Tuple[IgnoreFile, ...]) -> Iterator[Path]:
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="walk") as pool:
+            pending = {pool.submit(self._scan, root, "", ignores)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    files, subdirs, stats = fut.result()
+                    self.stats.add(stats)
+                    pending.update(pool.submit(self._scan, *d) for d in subdirs)
+                    yield from files
+
+    def _scan(self, path: str, rel: str, ignores: Tuple[IgnoreFile, ...]):
+        """List one directory: accepted files, subdirectories to visit, and counts"""
+        stats = WalkStats(dirs_scanned=1)
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            logger.warning(f"Cannot list {path}: {e}")
+            stats.errors += 1
+            return [], [], stats
+
+        if self.use_ignore_files:
+            names = {e.name for e in entries}
+            for name in IGNORE_FILES:
+                if name in names:
+                    ignore = IgnoreFile.read(Path(path) / name, rel)
+                    if ignore is not None:
+                        ignores = ignores + (ignore,)
+
+        files: List[Path] = []
+        subdirs = []
+        for entry in entries:
+            child = f"{rel}/{entry.name}" if rel else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.is_file(follow_symlinks=False):
+                    continue
+            except OSError:
+                stats.errors += 1
+                continue
+            if is_dir:
+                if is_ignored(child, True, ignores):
+                    stats.dirs_pruned += 1
+                else:
+                    subdirs.append((entry.path, child, ignores))
+                continue
+
+            stats.files_scanned += 1
+            if self.extensions is not None:
+                ext = os.path.splitext(entry.name)[1].lower()
+                if ext not in self.extensions:
+                    stats.skipped_extension += 1
+                    continue
+            if is_ignored(child, False, ignores):
+                stats.skipped_ignored += 1
+                continue
+            try:
+                size = entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                stats.errors += 1
+                continue
+            if self.max_file_bytes and size > self.max_file_bytes:
+                stats.skipped_size += 1
+                continue
+            if size and self.sniff_bytes and looks_binary(entry.path, self.sniff_bytes):
+                stats.skipped_binary += 1
+                continue
+            stats.files_yielded += 1
+            files.append(Path(entry.path))
+        return files, subdirs, stats
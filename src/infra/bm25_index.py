@@ -0,0 +1,343 @@
+# implements LexicalIndex from domain/ports.py
+
+"""In-process BM25 inverted index with identifier-aware tokenization"""
+
+import json
+import math
+import os
+import re
+import functools
+import shutil
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.domain.entities import CodeChunk, SearchHit
+from src.domain.ports import LexicalIndex
+from src.app.core import telemetry
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+# Boundaries inside an identifier: fooBar, HTTPServer, utf8Decode
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+
+_MAX_TF = 0xFFFF
+
+
+def split_identifier(word: str) -> List[str]:
+    """Lower-cased camelCase / snake_case parts of an identifier"""
+    parts = []
+    for piece in word.split("_"):
+        parts.extend(p.lower() for p in _CAMEL.split(piece) if p)
+    return parts
+
+
+def tokenize(text: str) -> List[str]:
+    """Index terms: each identifier whole, plus its parts when it has several
+
+    `_generate_chunk_id` yields `generate_chunk_id`, `generate`, `chunk` and
+    `id`, so both the exact identifier and its words are searchable, and an
+    exact match scores higher because the whole-identifier term is rarer.
+    """
+    terms = []
+    for word in _WORD.findall(text):
+        whole = word.strip("_").lower()
+        if not whole:
+            continue
+        terms.append(whole)
+        parts = split_identifier(word)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if len(p) > 1)
+    return terms
+
+
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class BM25Index(LexicalIndex):
+    """BM25 over chunk contents with postings in compact typed arrays
+
+    Each term's postings are two append-only arrays (row numbers and term
+    frequencies), so scoring a term is a vectorised pass over its rows.
+    Deletes tombstone rows; once `compact_ratio` of rows are dead the
+    postings are renumbered without them.
+
+    An index from `load` is bound to its directory. `save` writes each
+    version into a new `gen-<generation>` directory and then points
+    `CURRENT` at it, so readers never see a half-written one. `refresh`,
+    throttled to once per `refresh_interval` seconds, reloads when another
+    process has saved a newer generation and this one has no unsaved writes.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        compact_ratio: float = 0.3,
+        refresh_interval: float = 1.0,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.refresh_interval = refresh_interval
+        self.path: Optional[Path] = None
+        # Generation of the saved version this one was loaded from or saved as
+        self._saved_generation = 0
+        self._last_refresh = 0.0
+        # numpy views over the arrays block resizing, so reads and writes take turns
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._terms: Dict[str, int] = {}
+        self._post_rows: List[array] = []
+        self._post_tfs: List[array] = []
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._payloads: List[Optional[Dict]] = []
+        self._lengths = array("I")
+        self._alive = bytearray()
+        self._live_length = 0
+
+    # -- writes ------------------------------------------------------------
+
+    def _term(self, term: str) -> int:
+        tid = self._terms.get(term)
+        if tid is None:
+            tid = self._terms[term] = len(self._post_rows)
+            self._post_rows.append(array("I"))
+            self._post_tfs.append(array("H"))
+        return tid
+
+    @_locked
+    def add(self, chunks: Sequence[CodeChunk]) -> None:
+        """Index chunks, replacing any already indexed under the same ID"""
+        self.delete([c.id for c in chunks if c.id in self._row_of])
+        for chunk in chunks:
+            if chunk.id in self._row_of:  # repeated within this batch
+                self.delete([chunk.id])
+            terms = tokenize(chunk.content)
+            row = len(self._ids)
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                tid = self._term(term)
+                self._post_rows[tid].append(row)
+                self._post_tfs[tid].append(min(tf, _MAX_TF))
+            payload = chunk.to_dict()
+            del payload["id"]
+            self._ids.append(chunk.id)
+            self._row_of[chunk.id] = row
+            self._payloads.append(payload)
+            self._lengths.append(len(terms))
+            self._alive.append(1)
+            self._live_length += len(terms)
+        if chunks:
+            self.generation += 1
+
+    @_locked
+    def delete(self, ids: Sequence[str]) -> None:
+        for chunk_id in ids:
+            row = self._row_of.pop(chunk_id, None)
+            if row is None:
+                continue
+            self._alive[row] = 0
+            self._payloads[row] = None
+            self._live_length -= self._lengths[row]
+            self.generation += 1
+        rows = len(self._ids)
+        if rows and 1 - len(self._row_of) / rows > self.compact_ratio:
+            self.compact()
+
+    @_locked
+    def compact(self) -> None:
+        """Drop dead rows from the postings and renumber the live ones"""
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        renumber = np.cumsum(alive, dtype=np.int64) - 1
+        terms: Dict[str, int] = {}
+        post_rows: List[array] = []
+        post_tfs: List[array] = []
+        for term, tid in self._terms.items():
+            rows = np.frombuffer(self._post_rows[tid], dtype=np.uint32)
+            keep = alive[rows]
+            if not keep.any():
+                continue
+            terms[term] = len(post_rows)
+            post_rows.append(array("I", renumber[rows[keep]].astype(np.uint32).tobytes()))
+            post_tfs.append(
+                array("H", np.frombuffer(self._post_tfs[tid], dtype=np.uint16)[keep].tobytes())
+            )
+        live = np.flatnonzero(alive).tolist()
+        dropped = len(self._ids) - len(live)
+        self._terms, self._post_rows, self._post_tfs = terms, post_rows, post_tfs
+        self._ids = [self._ids[r] for r in live]
+        self._payloads = [self._payloads[r] for r in live]
+        self._lengths = array("I", (self._lengths[r] for r in live))
+        self._alive = bytearray(b"\1" * len(live))
+        self._row_of = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        logger.debug(f"Compacted BM25 index: dropped {dropped} rows, {len(live)} live")
+
+    # -- reads -------------------------------------------------------------
+
+    def count(self) -> int:
+        return len(self._row_of)
+
+    @telemetry.timed("lexical_search_seconds", "Time of one BM25 search, including lock wait")
+    @_locked
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        language: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+    ) -> List[SearchHit]:
+        live = len(self._row_of)
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self._terms]
+        if not live or not terms or k <= 0:
+            return []
+        alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+        avg_length = max(self._live_length / live, 1.0)
+        scores = np.zeros(len(self._ids), dtype=np.float32)
+        for term in terms:
+            tid = self._terms[term]
+            rows = np.frombuffer(self._post_rows[tid], dtype=np.uint32)
+            tfs = np.frombuffer(self._post_tfs[tid], dtype=np.uint16).astype(np.float32)
+            df = int(alive[rows].sum())
+            if not df:
+                continue
+            idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[rows] / avg_length)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        scores[~alive] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if language is not None or path_prefix is not None:
+            candidates = np.array(
+                [r for r in candidates.tolist() if self._matches(r, language, path_prefix)],
+                dtype=np.int64,
+            )
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            SearchHit(id=self._ids[r], score=float(scores[r]), payload=dict(self._payloads[r]))
+            for r in top.tolist()
+        ]
+
+    def _matches(self, row: int, language: Optional[str], path_prefix: Optional[str]) -> bool:
+        payload = self._payloads[row]
+        if language is not None and payload["language"] != language:
+            return False
+        return path_prefix is None or payload["file_path"].startswith(path_prefix)
+
+    # -- persistence -------------------------------------------------------
+
+    @_locked
+    def save(self, path: Optional[Path] = None) -> None:
+        """Write the live rows and postings as a new generation under directory `path`
+
+        `path` defaults to the directory the index was loaded from.
+        """
+        path = Path(path) if path is not None else self.path
+        if len(self._row_of) < len(self._ids):
+            self.compact()
+        # Stamps only move forward, across every process saving here
+        previous = _current_generation(path)
+        generation = max(self.generation, previous) + 1
+        target = path / f"gen-{generation}"
+        target.mkdir(parents=True, exist_ok=True)
+        offsets = np.zeros(len(self._post_rows) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in self._post_rows])
+        np.savez(
+            target / "postings.npz",
+            offsets=offsets,
+            rows=np.frombuffer(b"".join(p.tobytes() for p in self._post_rows), np.uint32),
+            tfs=np.frombuffer(b"".join(p.tobytes() for p in self._post_tfs), np.uint16),
+            lengths=np.frombuffer(self._lengths, dtype=np.uint32),
+        )
+        with open(target / "docs.jsonl", "w", encoding="utf-8") as f:
+            for chunk_id, payload in zip(self._ids, self._payloads):
+                f.write(json.dumps({"id": chunk_id, **payload}, ensure_ascii=False) + "\n")
+        (target / "terms.json").write_text(json.dumps(list(self._terms)))
+        tmp = path / "CURRENT.tmp"
+        tmp.write_text(target.name)
+        os.replace(tmp, path / "CURRENT")
+        # Keep the previous generation: a reader may still be loading it
+        for old in path.glob("gen-*"):
+            if old.name not in (target.name, f"gen-{previous}"):
+                shutil.rmtree(old, ignore_errors=True)
+        self.path = path
+        self.generation = self._saved_generation = generation
+        logger.info(f"Saved BM25 index generation {generation}: {self.count()} chunks")
+
+    def refresh(self, force: bool = False) -> None:
+        """Reload if another process saved a newer generation since the last load or save
+
+        Skipped while this instance has writes of its own that are not saved yet.
+        """
+        now = time.monotonic()
+        if self.path is None or (not force and now - self._last_refresh < self.refresh_interval):
+            return
+        self._last_refresh = now
+        generation = _current_generation(self.path)
+        with self._lock:
+            if generation <= self._saved_generation or self.generation != self._saved_generation:
+                return
+            self._clear()
+            self._read(self.path / f"gen-{generation}")
+            self.generation = self._saved_generation = generation
+        logger.info(f"Reloaded BM25 index generation {generation}: {self.count()} chunks")
+
+    @classmethod
+    def load(cls, path: Path, **kwargs) -> "BM25Index":
+        """Load the current generation saved under `path`; none yet gives an empty index"""
+        index = cls(**kwargs)
+        index.path = Path(path)
+        if not (index.path / "CURRENT").exists() and (index.path / "terms.json").exists():
+            # Saved before generations: the files sit in `path` itself
+            index._read(index.path)
+        index.refresh(force=True)
+        return index
+
+    def _read(self, path: Path) -> None:
+        with np.load(path / "postings.npz") as data:
+            offsets, rows, tfs = data["offsets"], data["rows"], data["tfs"]
+            self._lengths = array("I", data["lengths"].tobytes())
+        terms = json.loads((path / "terms.json").read_text())
+        self._terms = {term: tid for tid, term in enumerate(terms)}
+        for tid in range(len(terms)):
+            start, end = offsets[tid], offsets[tid + 1]
+            self._post_rows.append(array("I", rows[start:end].tobytes()))
+            self._post_tfs.append(array("H", tfs[start:end].tobytes()))
+        with open(path / "docs.jsonl", encoding="utf-8") as f:
+            for row, line in enumerate(f):
+                doc = json.loads(line)
+                self._ids.append(doc.pop("id"))
+                self._row_of[self._ids[-1]] = row
+                self._payloads.append(doc)
+        self._alive = bytearray(b"\1" * len(self._ids))
+        self._live_length = int(sum(self._lengths))
+
+
+def _current_generation(path: Path) -> int:
+    """Generation `CURRENT` points at under `path`; 0 before the first save"""
+    try:
+        return int((Path(path) / "CURRENT").read_text().strip()[4:])
+    except (FileNotFoundError, ValueError):
+        return 0
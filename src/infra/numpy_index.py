@@ -0,0 +1,655 @@
+# implements VectorIndex from domain/ports.py
+
+"""In-process vector index over a memory-mapped NumPy matrix"""
+
+import functools
+import json
+import mmap
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from src.domain.entities import ChunkBatch, CodeChunk, SearchHit
+from src.domain.ports import VectorIndex
+from src.app.core import telemetry
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Score this many float16 rows at a time so the float32 temporary stays small
+_BLOCK_ROWS = 65536
+# Quantized codes are scanned in cache-sized blocks; larger ones run slower
+_CODE_BLOCK_BYTES = 256 * 1024
+
+# One encoder for every row; json.dumps builds a new one per call
+_json = json.JSONEncoder(ensure_ascii=False).encode
+
+QUANTIZATIONS = ("int8", "binary")
+# Candidates rescored at full precision per requested hit
+_DEFAULT_RESCORE = {"int8": 4, "binary": 16}
+# Rows converted per step when an index is re-quantized
+_REQUANTIZE_ROWS = 65536
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _quantize_int8(vectors: np.ndarray):
+    """Symmetric per-row int8 codes and the scale that maps them back"""
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """One sign bit per dimension, packed eight to a byte"""
+    return np.packbits(vectors > 0, axis=1)
+
+
+def _locked(method):
+    """Run the method under the index's lock"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class _Snapshot(NamedTuple):
+    """Arrays a search reads, taken under the lock
+
+    Writers only append to these lists and replace (never mutate) the
+    mapped arrays, and compaction swaps in new objects, so a search can
+    finish on its snapshot without holding the lock.
+    """
+
+    matrix: np.ndarray
+    codes: Optional[np.ndarray]
+    scales: Optional[np.ndarray]
+    quantization: Optional[str]
+    rescore: int
+    ids: List[str]
+    payloads: mmap.mmap
+    payload_offsets: List[int]
+    payload_lengths: List[int]
+
+
+class _Codes:
+    """Interns strings to small integer codes for vectorized filtering"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class NumpyVectorIndex(VectorIndex):
+    """Brute-force cosine index stored as a memory-mapped matrix
+
+    Layout under `path`:
+      meta.json       dim, dtype, row count, generation and compaction count
+      vectors.bin     normalized rows (float16 or float32), append-only
+      alive.bin       one byte per row; 0 marks a deleted or replaced row
+      rows.jsonl      id, file_path, language and payload offset per row
+      payloads.jsonl  full chunk payload per row, read only for returned hits
+      codes.bin       quantized rows (int8 or packed sign bits), if quantized
+      scales.bin      float32 scale per row, for int8
+
+    With `quantization` set, search scans only the compact codes and then
+    rescores the best `rescore * k` candidates exactly against vectors.bin,
+    so only those rows of the full-precision matrix are paged in. int8 keeps
+    a quarter of the float32 footprint, binary a thirty-second; use
+    `recall_at_k` to measure what that costs on real queries. Opening an
+    index stored with another quantization re-quantizes it from vectors.bin,
+    or raises when opened read-only.
+
+    The matrix and payloads are opened with mmap, so every worker process
+    that opens the same directory shares one copy through the page cache.
+    One process writes; readers pick up its changes via `refresh()`, which
+    runs at most every `refresh_interval` seconds before a search. Deletes
+    are tombstones until dead rows exceed `compact_ratio`, at which point
+    the files are rewritten.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        dim: Optional[int] = None,
+        dtype: str = "float32",
+        read_only: bool = False,
+        compact_ratio: float = 0.3,
+        refresh_interval: float = 1.0,
+        quantization: Optional[str] = None,
+        rescore: Optional[int] = None,
+    ):
+        if quantization is not None and quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}; use one of {QUANTIZATIONS}")
+        self.path = Path(path)
+        self.read_only = read_only
+        self.compact_ratio = compact_ratio
+        self.refresh_interval = refresh_interval
+        self._meta_path = self.path / "meta.json"
+        self._vectors_path = self.path / "vectors.bin"
+        self._alive_path = self.path / "alive.bin"
+        self._rows_path = self.path / "rows.jsonl"
+        self._payloads_path = self.path / "payloads.jsonl"
+        self._codes_path = self.path / "codes.bin"
+        self._scales_path = self.path / "scales.bin"
+
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.quantization = quantization
+        self._rescore = rescore
+        self.generation = 0
+        # Guards all state; API searches and index-job writers share one instance
+        self._lock = threading.RLock()
+        self._compactions = -1
+        self._last_refresh = 0.0
+        self._reset()
+
+        if not read_only:
+            self.path.mkdir(parents=True, exist_ok=True)
+        self.refresh(force=True)
+        if self.quantization != quantization:
+            if read_only:
+                raise ValueError(
+                    f"Index at {self.path} is stored with quantization {self.quantization!r}, "
+                    f"not {quantization!r}; open it for writing to re-quantize"
+                )
+            self._requantize(quantization)
+
+    def _reset(self) -> None:
+        self._rows = 0
+        self._rows_offset = 0
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._paths = _Codes()
+        self._languages = _Codes()
+        self._path_codes: List[int] = []
+        self._lang_codes: List[int] = []
+        self._payload_offsets: List[int] = []
+        self._payload_lengths: List[int] = []
+        self._alive_buf = np.zeros(1024, dtype=bool)
+        self._alive = self._alive_buf[:0]
+        self._matrix: Optional[np.ndarray] = None
+        self._payloads: Optional[mmap.mmap] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._columns = None
+
+    # -- persistence -------------------------------------------------------
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            return json.loads(self._meta_path.read_text())
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self) -> None:
+        meta = {
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "quantization": self.quantization,
+            "rows": self._rows,
+            "generation": self.generation,
+            "compactions": max(self._compactions, 0),
+        }
+        tmp = self._meta_path.with_name("meta.json.tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self._meta_path)
+
+    @_locked
+    def refresh(self, force: bool = False) -> None:
+        """Reload rows written by another process since the last refresh
+
+        Throttled to once per `refresh_interval` unless `force` is set; a
+        reload only happens when the on-disk generation has moved on.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        self._last_refresh = now
+        meta = self._read_meta()
+        if meta is None or meta["generation"] == self.generation:
+            return
+
+        self.dim = meta["dim"]
+        self.dtype = np.dtype(meta["dtype"])
+        stored = meta.get("quantization")
+        if stored != self.quantization and self._compactions >= 0:
+            logger.warning(f"Index at {self.path} was re-quantized to {stored} by another process")
+        self.quantization = stored
+        if meta["compactions"] != self._compactions:
+            self._reset()
+            self._compactions = meta["compactions"]
+
+        # rows.jsonl is append-only between compactions: read only the tail
+        rows = meta["rows"]
+        if rows > self._rows:
+            with open(self._rows_path, "rb") as f:
+                f.seek(self._rows_offset)
+                for _ in range(rows - self._rows):
+                    line = f.readline()
+                    self._rows_offset += len(line)
+                    self._add_row(json.loads(line))
+        alive = np.fromfile(self._alive_path, dtype=np.uint8, count=rows).astype(bool)
+        self._set_alive(alive)
+        self._row_of = {self._ids[r]: r for r in np.flatnonzero(alive).tolist()}
+        self.generation = meta["generation"]
+        self._map()
+
+    def _add_row(self, row: Dict) -> None:
+        self._row_of[row["id"]] = len(self._ids)
+        self._ids.append(row["id"])
+        self._path_codes.append(self._paths.code(row["file_path"]))
+        self._lang_codes.append(self._languages.code(row["language"]))
+        self._payload_offsets.append(row["offset"])
+        self._payload_lengths.append(row["length"])
+        self._rows = len(self._ids)
+        self._columns = None
+
+    def _set_alive(self, alive: np.ndarray) -> None:
+        """Replace the alive flags, growing the backing buffer geometrically"""
+        if len(alive) > len(self._alive_buf):
+            self._alive_buf = np.zeros(max(len(alive), 2 * len(self._alive_buf)), dtype=bool)
+        self._alive_buf[: len(alive)] = alive
+        self._alive = self._alive_buf[: len(alive)]
+
+    def _append_alive(self, n: int) -> None:
+        rows = len(self._alive)
+        if rows + n > len(self._alive_buf):
+            grown = np.zeros(max(rows + n, 2 * len(self._alive_buf)), dtype=bool)
+            grown[:rows] = self._alive
+            self._alive_buf = grown
+        self._alive_buf[rows : rows + n] = True
+        self._alive = self._alive_buf[: rows + n]
+
+    @property
+    def rescore(self) -> int:
+        return self._rescore or _DEFAULT_RESCORE.get(self.quantization, 1)
+
+    def _code_shape(self):
+        if self.quantization == "binary":
+            return np.uint8, (self._rows, (self.dim + 7) // 8)
+        return np.int8, (self._rows, self.dim)
+
+    def _map(self) -> None:
+        if self._rows == 0:
+            self._matrix, self._payloads, self._codes, self._scales = None, None, None, None
+            return
+        self._matrix = np.memmap(
+            self._vectors_path, dtype=self.dtype, mode="r", shape=(self._rows, self.dim)
+        )
+        with open(self._payloads_path, "rb") as f:
+            self._payloads = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.quantization:
+            dtype, shape = self._code_shape()
+            self._codes = np.memmap(self._codes_path, dtype=dtype, mode="r", shape=shape)
+        if self.quantization == "int8":
+            self._scales = np.memmap(
+                self._scales_path, dtype=np.float32, mode="r", shape=(self._rows,)
+            )
+
+    def _write_codes(self, vectors: np.ndarray, mode: str = "ab") -> None:
+        """Write quantized codes for `vectors` (already normalized)"""
+        if self.quantization == "int8":
+            codes, scales = _quantize_int8(vectors)
+            with open(self._scales_path, mode) as f:
+                f.write(scales.tobytes())
+        elif self.quantization == "binary":
+            codes = _quantize_binary(vectors)
+        else:
+            return
+        with open(self._codes_path, mode) as f:
+            f.write(codes.tobytes())
+
+    @_locked
+    def _requantize(self, quantization: Optional[str]) -> None:
+        """Rewrite the codes for `quantization` from the full-precision vectors"""
+        logger.warning(
+            f"Re-quantizing index at {self.path} from {self.quantization} to {quantization}"
+        )
+        self.quantization = quantization
+        tmp_codes = self._codes_path.with_name("codes.bin.tmp")
+        tmp_scales = self._scales_path.with_name("scales.bin.tmp")
+        with open(tmp_codes, "wb") as codes_f, open(tmp_scales, "wb") as scales_f:
+            for start in range(0, self._rows if quantization else 0, _REQUANTIZE_ROWS):
+                vectors = np.asarray(
+                    self._matrix[start : start + _REQUANTIZE_ROWS], dtype=np.float32
+                )
+                if quantization == "int8":
+                    codes, scales = _quantize_int8(vectors)
+                    scales_f.write(scales.tobytes())
+                else:
+                    codes = _quantize_binary(vectors)
+                codes_f.write(codes.tobytes())
+        # Staged and swapped in: readers in other processes may have the old files mapped
+        self._codes, self._scales = None, None
+        for staged, final, keep in (
+            (tmp_codes, self._codes_path, quantization is not None),
+            (tmp_scales, self._scales_path, quantization == "int8"),
+        ):
+            if keep:
+                os.replace(staged, final)
+            else:
+                staged.unlink()
+                final.unlink(missing_ok=True)
+        self.generation += 1
+        self._write_meta()
+        self._map()
+
+    def _columns_arrays(self):
+        """Filter columns as arrays, rebuilt lazily after appends"""
+        if self._columns is None:
+            self._columns = (
+                np.asarray(self._path_codes, dtype=np.int32),
+                np.asarray(self._lang_codes, dtype=np.int16),
+            )
+        return self._columns
+
+    def _payload_end(self) -> int:
+        try:
+            return os.path.getsize(self._payloads_path)
+        except OSError:
+            return 0
+
+    # -- writes ------------------------------------------------------------
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise PermissionError(f"Index at {self.path} is opened read-only")
+
+    def _tombstone(self, rows: Sequence[int]) -> None:
+        if not rows:
+            return
+        with open(self._alive_path, "r+b") as f:
+            for row in sorted(rows):
+                f.seek(row)
+                f.write(b"\0")
+        self._alive[list(rows)] = False
+        for row in rows:
+            self._row_of.pop(self._ids[row], None)
+
+    def upsert(self, chunks: Sequence[CodeChunk]) -> None:
+        """Append chunks, replacing any existing rows with the same IDs"""
+        if isinstance(chunks, ChunkBatch):
+            self.upsert_batch(chunks)
+        elif chunks:
+            self.upsert_batch(ChunkBatch.from_chunks(chunks))
+
+    @telemetry.timed("vector_index_upsert_seconds", "Time to upsert one batch", backend="numpy")
+    @_locked
+    def upsert_batch(self, batch: ChunkBatch) -> None:
+        """Append an embedded batch straight from its columns"""
+        self._check_writable()
+        if not len(batch):
+            return
+        if batch.embeddings is None:
+            raise ValueError("Cannot upsert a batch without embeddings")
+        self.refresh(force=True)  # pick up rows from any other writer first
+        vectors = _normalize(batch.embeddings)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dim {vectors.shape[1]} does not match index dim {self.dim}"
+            )
+
+        # Last write wins for duplicate IDs within the batch
+        ids = batch.ids
+        latest = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        keep = sorted(latest.values())
+        replaced = [self._row_of[i] for i in ids if i in self._row_of]
+        self._tombstone(list(set(replaced)))
+
+        # Rows are encoded straight from the batch columns; strings shared by
+        # many rows (paths, languages) are encoded once
+        offset = self._payload_end()
+        rows, rows_lines, payload_lines = [], [], []
+        paths = [_json(p) for p in batch.paths]
+        languages = [_json(x) for x in batch.languages]
+        path_index, language_index = batch.path_index.tolist(), batch.language_index.tolist()
+        start_lines, end_lines = batch.start_lines.tolist(), batch.end_lines.tolist()
+        for i in keep:
+            path = paths[path_index[i]]
+            language = languages[language_index[i]]
+            encoded = (
+                f'{{"content": {_json(batch.content(i))}, "file_path": {path}, '
+                f'"language": {language}, "start_line": {start_lines[i]}, '
+                f'"end_line": {end_lines[i]}, "metadata": {_json(batch.metadata(i))}}}\n'
+            ).encode("utf-8")
+            row = {
+                "id": ids[i],
+                "file_path": batch.paths[path_index[i]],
+                "language": batch.languages[language_index[i]],
+                "offset": offset,
+                "length": len(encoded),
+            }
+            offset += len(encoded)
+            rows.append(row)
+            payload_lines.append(encoded)
+            rows_lines.append((
+                f'{{"id": {_json(ids[i])}, "file_path": {path}, "language": {language}, '
+                f'"offset": {row["offset"]}, "length": {row["length"]}}}\n'
+            ).encode("utf-8"))
+
+        with open(self._vectors_path, "ab") as f:
+            f.write(vectors[keep].astype(self.dtype).tobytes())
+        self._write_codes(vectors[keep])
+        with open(self._payloads_path, "ab") as f:
+            f.write(b"".join(payload_lines))
+        with open(self._alive_path, "ab") as f:
+            f.write(b"\1" * len(keep))
+        with open(self._rows_path, "ab") as f:
+            f.write(b"".join(rows_lines))
+
+        for row in rows:
+            self._add_row(row)
+        self._rows_offset += sum(len(line) for line in rows_lines)
+        self._append_alive(len(rows))
+        self.generation += 1
+        self._write_meta()
+        self._map()
+
+    @_locked
+    def delete(self, ids: Sequence[str]) -> None:
+        self._check_writable()
+        self.refresh(force=True)
+        rows = list({self._row_of[i] for i in ids if i in self._row_of})
+        if not rows:
+            return
+        self._tombstone(rows)
+        self.generation += 1
+        self._write_meta()
+        if self._rows and 1 - self._alive.sum() / self._rows > self.compact_ratio:
+            self.compact()
+
+    @_locked
+    def compact(self) -> None:
+        """Rewrite the files without deleted rows"""
+        self._check_writable()
+        self.refresh(force=True)
+        live = np.flatnonzero(self._alive)
+        tmp = {p: p.with_name(p.name + ".tmp") for p in (
+            self._vectors_path, self._alive_path, self._rows_path, self._payloads_path
+        )}
+        if self.quantization:
+            tmp[self._codes_path] = self._codes_path.with_name("codes.bin.tmp")
+        if self.quantization == "int8":
+            tmp[self._scales_path] = self._scales_path.with_name("scales.bin.tmp")
+        offset = 0
+        with open(tmp[self._rows_path], "wb") as rows_f, \
+                open(tmp[self._payloads_path], "wb") as payload_f:
+            for r in live.tolist():
+                start = self._payload_offsets[r]
+                payload = self._payloads[start : start + self._payload_lengths[r]]
+                payload_f.write(payload)
+                row = {
+                    "id": self._ids[r],
+                    "file_path": self._paths.values[self._path_codes[r]],
+                    "language": self._languages.values[self._lang_codes[r]],
+                    "offset": offset,
+                    "length": len(payload),
+                }
+                rows_f.write((json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8"))
+                offset += len(payload)
+        for final in (self._vectors_path, self._codes_path, self._scales_path):
+            if final in tmp:
+                tmp[final].write_bytes(b"")
+        if len(live):
+            np.ascontiguousarray(self._matrix[live]).tofile(tmp[self._vectors_path])
+            if self._codes is not None:
+                np.ascontiguousarray(self._codes[live]).tofile(tmp[self._codes_path])
+            if self._scales is not None:
+                np.ascontiguousarray(self._scales[live]).tofile(tmp[self._scales_path])
+        tmp[self._alive_path].write_bytes(b"\1" * len(live))
+
+        self._matrix, self._payloads, self._codes, self._scales = None, None, None, None
+        for final, staged in tmp.items():
+            os.replace(staged, final)
+        dropped = self._rows - len(live)
+        compactions = max(self._compactions, 0) + 1
+        generation = self.generation + 1
+
+        # Reload from the rewritten files
+        self._reset()
+        self._compactions, self._rows, self.generation = compactions, len(live), generation
+        self._write_meta()
+        self._compactions, self.generation = -1, -1
+        self.refresh(force=True)
+        logger.info(f"Compacted {self.path}: dropped {dropped} rows, {len(live)} live")
+
+    # -- reads -------------------------------------------------------------
+
+    @_locked
+    def count(self) -> int:
+        return int(self._alive.sum())
+
+    def _mask(self, language: Optional[str], path_prefix: Optional[str]) -> np.ndarray:
+        mask = self._alive.copy()
+        path_codes, lang_codes = self._columns_arrays()
+        if language is not None:
+            code = self._languages.index.get(language)
+            if code is None:
+                return np.zeros_like(mask)
+            mask &= lang_codes == code
+        if path_prefix is not None:
+            matching = [
+                c for c, p in enumerate(self._paths.values) if p.startswith(path_prefix)
+            ]
+            mask &= np.isin(path_codes, matching)
+        return mask
+
+    @staticmethod
+    def _scores(
+        snap: _Snapshot, rows: Optional[np.ndarray], query: np.ndarray
+    ) -> np.ndarray:
+        matrix = snap.matrix
+        if rows is not None:
+            return matrix[rows].astype(np.float32, copy=False) @ query
+        if matrix.dtype == np.float32:
+            return matrix @ query
+        out = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), _BLOCK_ROWS):
+            block = matrix[start : start + _BLOCK_ROWS]
+            out[start : start + len(block)] = block.astype(np.float32) @ query
+        return out
+
+    @staticmethod
+    def _coarse_scores(snap: _Snapshot, query: np.ndarray) -> np.ndarray:
+        """Approximate scores for every row from the quantized codes"""
+        codes = snap.codes
+        out = np.empty(len(codes), dtype=np.float32)
+        step = max(1, _CODE_BLOCK_BYTES // codes.shape[1])
+        if snap.quantization == "binary":
+            # Fewer differing sign bits means a smaller angle
+            bits = _quantize_binary(query[None, :])[0]
+            for start in range(0, len(codes), step):
+                block = codes[start : start + step]
+                distance = np.bitwise_count(block ^ bits).sum(axis=1, dtype=np.int32)
+                out[start : start + len(block)] = -distance
+            return out
+        for start in range(0, len(codes), step):
+            block = codes[start : start + step]
+            scales = snap.scales[start : start + len(block)]
+            out[start : start + len(block)] = (block.astype(np.float32) @ query) * scales
+        return out
+
+    @telemetry.timed("vector_index_search_seconds", "Time of one vector search", backend="numpy")
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        language: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+        exact: bool = False,
+    ) -> List[SearchHit]:
+        """Top-k by cosine; `exact` skips the quantized pass if there is one"""
+        with self._lock:
+            self.refresh()
+            if self._matrix is None or k <= 0:
+                return []
+            mask = self._mask(language, path_prefix)
+            snap = _Snapshot(
+                self._matrix, self._codes, self._scales, self.quantization, self.rescore,
+                self._ids, self._payloads, self._payload_offsets, self._payload_lengths,
+            )
+        query = _normalize(query)
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return []
+
+        # Score only the candidates when filters are selective
+        if len(candidates) < len(mask) // 4:
+            scores = self._scores(snap, candidates, query)
+            rows = candidates
+        elif snap.codes is not None and not exact:
+            # Coarse pass over the codes, then exact scores for the shortlist
+            coarse = self._coarse_scores(snap, query)
+            coarse[~mask] = -np.inf
+            n = min(k * snap.rescore, len(candidates))
+            rows = np.sort(np.argpartition(-coarse, n - 1)[:n])
+            scores = self._scores(snap, rows, query)
+        else:
+            scores = self._scores(snap, None, query)
+            scores[~mask] = -np.inf
+            rows = None
+
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            self._hit(snap, int(rows[i]) if rows is not None else int(i), float(scores[i]))
+            for i in top
+        ]
+
+    def recall_at_k(self, queries: np.ndarray, k: int = 10, **filters) -> float:
+        """Mean overlap of quantized and exact top-k over `queries`"""
+        found = total = 0
+        for query in queries:
+            exact = {h.id for h in self.search(query, k=k, exact=True, **filters)}
+            approx = {h.id for h in self.search(query, k=k, **filters)}
+            found += len(exact & approx)
+            total += len(exact)
+        return found / total if total else 1.0
+
+    @staticmethod
+    def _hit(snap: _Snapshot, row: int, score: float) -> SearchHit:
+        start = snap.payload_offsets[row]
+        payload = json.loads(snap.payloads[start : start + snap.payload_lengths[row]])
+        return SearchHit(id=snap.ids[row], score=score, payload=payload)
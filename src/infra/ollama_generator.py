@@ -0,0 +1,47 @@
+# implements Generator from domain/ports.py
+
+"""Streaming completions from an Ollama server's /api/generate"""
+
+import json
+import urllib.request
+from typing import Iterator, Optional
+
+from src.domain.ports import Generator
+from src.app.core.config import settings
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class OllamaGenerator(Generator):
+    """Streams tokens from Ollama (or any server speaking its generate API)"""
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.url = (url or settings.llm_url).rstrip("/")
+        self.model = model or settings.llm_model
+        self.timeout = timeout or settings.llm_timeout_seconds
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        body = json.dumps({"model": self.model, "prompt": prompt, "stream": True})
+        request = urllib.request.Request(
+            f"{self.url}/api/generate",
+            data=body.encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        # One JSON object per line: {"response": "<piece>", "done": false}
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            for line in response:
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if message.get("error"):
+                    raise RuntimeError(f"LLM error: {message['error']}")
+                if message.get("response"):
+                    yield message["response"]
+                if message.get("done"):
+                    return
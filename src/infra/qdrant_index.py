@@ -1 +1,312 @@
 # implements VectorIndex from domain/ports.py
+
+"""Qdrant-backed vector index with a bulk, backpressured writer"""
+
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from src.domain.entities import CodeChunk, SearchHit
+from src.domain.ports import VectorIndex
+from src.app.core import telemetry
+from src.app.core.config import settings
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Chunk IDs are hex strings; Qdrant wants UUIDs or integers
+_ID_NAMESPACE = uuid.UUID("6f0cbb4e-6d0b-4c61-9d3b-3f1b2a8c7e10")
+
+PAYLOAD_INDEXES = {
+    "file_path": models.PayloadSchemaType.KEYWORD,
+    "language": models.PayloadSchemaType.KEYWORD,
+    "path_prefixes": models.PayloadSchemaType.KEYWORD,
+}
+
+
+def point_id(chunk_id: str) -> str:
+    return str(uuid.uuid5(_ID_NAMESPACE, chunk_id))
+
+
+def path_prefixes(file_path: str) -> List[str]:
+    """Every directory prefix of a path plus the path itself, for prefix filters"""
+    parts = PurePosixPath(file_path.replace("\\", "/")).parts
+    return ["/".join(parts[: i + 1]).replace("//", "/") for i in range(len(parts))]
+
+
+@dataclass
+class WriterStats:
+    """Counters for the bulk writer"""
+
+    points: int = 0
+    deleted: int = 0
+    batches: int = 0
+    bytes: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> Dict:
+        data = dict(self.__dict__)
+        data["points_per_sec"] = self.points / self.seconds if self.seconds else 0.0
+        return data
+
+
+class BulkWriter:
+    """Runs write requests on a thread pool with a bound on requests in flight
+
+    `submit` blocks once `max_in_flight` requests are outstanding, which
+    pushes back on the producer (chunking/embedding) instead of queueing
+    unbounded batches in memory. Failed requests are retried with backoff;
+    the first error that survives its retries is raised from `flush`.
+    """
+
+    def __init__(self, workers: int = 4, max_in_flight: int = 8, retries: int = 2):
+        self.retries = retries
+        self.stats = WriterStats()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qdrant-writer")
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._pending: List[Future] = []
+        self._lock = threading.Lock()
+
+    def _run(self, fn: Callable[[], None]) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                with self._lock:
+                    self.stats.retries += 1
+                logger.warning(f"Qdrant write failed ({e}); retrying")
+                time.sleep(0.1 * 2**attempt)
+
+    def submit(self, fn: Callable[[], None]) -> None:
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(self._run, fn)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._pending = [f for f in self._pending if not f.done() or f.exception()]
+            self._pending.append(future)
+
+    def flush(self) -> None:
+        """Wait for every submitted request; re-raise the first failure"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        errors = [f.exception() for f in pending if f.exception() is not None]
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        self.flush()
+        self._pool.shutdown(wait=True)
+
+
+class QdrantVectorIndex(VectorIndex):
+    """VectorIndex on a Qdrant collection
+
+    Upserts are split into batches bounded by point count and by estimated
+    request bytes and handed to a BulkWriter, so several uploads run at once
+    with bounded memory. `upsert` returns once its requests are queued, so
+    successive calls overlap; `flush` waits for them and raises the first
+    failure. `delete` waits for earlier upserts and for itself. Works against a
+    server (`url`) or the embedded local mode (`path`), where writes are
+    serialised because local mode is not thread-safe. `generation` counts
+    this instance's writes only; writes by other processes do not move it.
+    """
+
+    def __init__(
+        self,
+        client: Optional[QdrantClient] = None,
+        collection_name: Optional[str] = None,
+        dim: Optional[int] = None,
+        path: Optional[str] = None,
+        url: Optional[str] = None,
+        batch_size: int = 256,
+        max_batch_bytes: int = 8 * 1024 * 1024,
+        workers: int = 4,
+        max_in_flight: int = 8,
+    ):
+        if client is None and url:
+            client = QdrantClient(url=url)
+        elif client is None:
+            path = path or settings.qdrant_path
+            # Local mode locks its folder: a second process opening it fails
+            logger.info(f"Opening embedded Qdrant at {path}; use QDRANT_URL for several workers")
+            client = QdrantClient(path=path)
+        self.client = client
+        self.collection_name = collection_name or settings.collection_name
+        self.dim = dim
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        if self.is_local:
+            # The embedded store is a single SQLite connection; writes must be serial
+            workers = 1
+        self.writer = BulkWriter(workers=workers, max_in_flight=max_in_flight)
+        self._ready = False
+
+    @property
+    def is_local(self) -> bool:
+        return type(getattr(self.client, "_client", None)).__name__ == "QdrantLocal"
+
+    def ensure_collection(self, dim: int) -> None:
+        """Create the collection and its payload indexes if they are missing"""
+        if self._ready:
+            return
+        if not self.client.collection_exists(self.collection_name):
+            self.client.create_collection(
+                self.collection_name,
+                vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+            )
+        existing = self.client.get_collection(self.collection_name).payload_schema or {}
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            if field_name not in existing:
+                self.client.create_payload_index(
+                    self.collection_name, field_name=field_name, field_schema=schema
+                )
+        self.dim = dim
+        self._ready = True
+
+    def _point(self, chunk: CodeChunk) -> models.PointStruct:
+        payload = chunk.to_dict()
+        payload["chunk_id"] = payload.pop("id")
+        payload["path_prefixes"] = path_prefixes(chunk.file_path)
+        return models.PointStruct(
+            id=point_id(chunk.id),
+            vector=np.asarray(chunk.embedding, dtype=np.float32).tolist(),
+            payload=payload,
+        )
+
+    def _batches(self, chunks: Sequence[CodeChunk]):
+        """Yield (points, bytes) batches bounded by count and estimated size"""
+        batch, size = [], 0
+        for chunk in chunks:
+            point = self._point(chunk)
+            # ~10 bytes per float as JSON, plus the payload
+            point_size = 10 * len(point.vector) + len(
+                json.dumps(point.payload, ensure_ascii=False)
+            )
+            if batch and (
+                len(batch) >= self.batch_size or size + point_size > self.max_batch_bytes
+            ):
+                yield batch, size
+                batch, size = [], 0
+            batch.append(point)
+            size += point_size
+        if batch:
+            yield batch, size
+
+    @telemetry.timed("vector_index_upsert_seconds", "Time to upsert one batch", backend="qdrant")
+    def upsert(self, chunks: Sequence[CodeChunk]) -> None:
+        if not chunks:
+            return
+        started = time.perf_counter()
+        self.ensure_collection(len(chunks[0].embedding))
+        for points, size in self._batches(chunks):
+            self.writer.submit(
+                lambda points=points: self.client.upsert(
+                    self.collection_name, points=points, wait=True
+                )
+            )
+            self.writer.stats.points += len(points)
+            self.writer.stats.batches += 1
+            self.writer.stats.bytes += size
+        self.generation += 1
+        self.writer.stats.seconds += time.perf_counter() - started
+
+    def delete(self, ids: Sequence[str]) -> None:
+        """Delete points by chunk ID in batches"""
+        if not ids or not self.client.collection_exists(self.collection_name):
+            return
+        started = time.perf_counter()
+        # Queued upserts of these IDs must land first, or they would bring them back
+        self.writer.flush()
+        ids = list(ids)
+        for start in range(0, len(ids), self.batch_size * 4):
+            selector = models.PointIdsList(
+                points=[point_id(i) for i in ids[start : start + self.batch_size * 4]]
+            )
+            self.writer.submit(
+                lambda selector=selector: self.client.delete(
+                    self.collection_name, points_selector=selector, wait=True
+                )
+            )
+        self.writer.flush()
+        self.generation += 1
+        self.writer.stats.deleted += len(ids)
+        self.writer.stats.seconds += time.perf_counter() - started
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+    def _filter(self, language: Optional[str], path_prefix: Optional[str]):
+        conditions = []
+        if language is not None:
+            conditions.append(
+                models.FieldCondition(key="language", match=models.MatchValue(value=language))
+            )
+        if path_prefix:
+            # Match on the deepest whole-segment prefix; partial segments are post-filtered
+            prefix = path_prefix.rstrip("/")
+            if not path_prefix.endswith("/") and "/" in prefix:
+                prefix = prefix.rsplit("/", 1)[0]
+            elif not path_prefix.endswith("/"):
+                prefix = ""
+            if prefix:
+                conditions.append(
+                    models.FieldCondition(
+                        key="path_prefixes", match=models.MatchValue(value=prefix)
+                    )
+                )
+        return models.Filter(must=conditions) if conditions else None
+
+    @telemetry.timed("vector_index_search_seconds", "Time of one vector search", backend="qdrant")
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        language: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+    ) -> List[SearchHit]:
+        if not self.client.collection_exists(self.collection_name):
+            return []
+        exact_segment = path_prefix is None or path_prefix.endswith("/")
+        response = self.client.query_points(
+            self.collection_name,
+            query=np.asarray(query, dtype=np.float32).tolist(),
+            query_filter=self._filter(language, path_prefix),
+            limit=k if exact_segment else k * 4,
+            with_payload=True,
+        )
+        hits = []
+        for point in response.points:
+            payload = dict(point.payload or {})
+            if path_prefix and not payload.get("file_path", "").startswith(path_prefix):
+                continue
+            chunk_id = payload.pop("chunk_id", str(point.id))
+            payload.pop("path_prefixes", None)
+            hits.append(SearchHit(id=chunk_id, score=float(point.score), payload=payload))
+        return hits[:k]
+
+    def count(self) -> int:
+        if not self.client.collection_exists(self.collection_name):
+            return 0
+        return self.client.count(self.collection_name, exact=True).count
+
+    def stats(self) -> Dict:
+        return self.writer.stats.as_dict()
+
+    def close(self) -> None:
+        self.writer.close()
+        self.client.close()
@@ -0,0 +1,125 @@
+# tests/helpers.py
+"""Fakes and data builders shared by the unit and integration tests"""
+
+import numpy as np
+
+from src.domain.entities import CodeChunk, SearchHit
+from src.domain.ports import Embedder, Generator, VectorIndex
+from src.domain.tokens import TokenCounter
+
+# Heuristic counts keep sizes stable whether or not a tokenizer is installed
+COUNTER = TokenCounter(use_tokenizer=False)
+
+LINES = [f"value_{i} = compute_{i}(value_{i - 1})" for i in range(1, 101)]
+
+
+class FakeEmbedder(Embedder):
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return [np.full(4, len(t), dtype=np.float32) for t in texts]
+
+
+class CountingEmbedder(Embedder):
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return [np.ones(4, dtype=np.float32) for _ in texts]
+
+
+class MemoryIndex(VectorIndex):
+    def __init__(self):
+        self.points = {}
+
+    def upsert(self, chunks):
+        for c in chunks:
+            self.points[c.id] = c
+
+    def delete(self, ids):
+        for i in ids:
+            self.points.pop(i, None)
+
+    def search(self, query, k=10, language=None, path_prefix=None):
+        return []
+
+    def count(self):
+        return len(self.points)
+
+
+class HitIndex(MemoryIndex):
+    def __init__(self, hits):
+        super().__init__()
+        self.hits = hits
+
+    def search(self, query, k=10, language=None, path_prefix=None):
+        return self.hits[:k]
+
+
+class FixedIndex(VectorIndex):
+    def __init__(self, hits):
+        self.hits = hits
+
+    def upsert(self, chunks):
+        pass
+
+    def delete(self, ids):
+        pass
+
+    def search(self, query, k=10, language=None, path_prefix=None):
+        return self.hits[:k]
+
+    def count(self):
+        return len(self.hits)
+
+
+class EchoGenerator(Generator):
+    def __init__(self):
+        self.prompts = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        yield from ["see ", "a.py"]
+
+
+def make_hit(chunk_id, path, start, end, score, lines=LINES):
+    return SearchHit(
+        id=chunk_id,
+        score=score,
+        payload={
+            "content": "\n".join(lines[start - 1:end]),
+            "file_path": path,
+            "language": "python",
+            "start_line": start,
+            "end_line": end,
+        },
+    )
+
+
+def embedded_chunk(i: int, vec, path: str = "src/a.py", language: str = "python") -> CodeChunk:
+    return CodeChunk(
+        id=f"c{i}",
+        content=f"def f{i}(): pass",
+        file_path=path,
+        language=language,
+        start_line=i,
+        end_line=i,
+        metadata={"chunk_type": "structural"},
+        embedding=np.asarray(vec, dtype=np.float32),
+    )
+
+
+def random_chunks(n: int, dim: int = 16, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [
+        embedded_chunk(
+            i,
+            rng.normal(size=dim),
+            path="src/a.py" if i % 2 else "lib/b.go",
+            language="python" if i % 2 else "go",
+        )
+        for i in range(n)
+    ]
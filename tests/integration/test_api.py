@@ -0,0 +1,133 @@
+# tests/integration/test_api.py
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app.api.v1.routes.chat import get_chat_service, get_query_batcher
+from src.app.api.v1.routes.health import get_registry
+from src.app.api.v1.routes.indexing import get_scheduler
+from src.app.core.config import settings
+from src.app.core.models import ModelRegistry
+from src.app.main import create_app
+from src.domain.chat import ChatService
+from src.domain.jobs import IndexJobScheduler
+from src.domain.microbatch import MicroBatcher
+from src.domain.search import SearchService
+from tests.helpers import EchoGenerator, FakeEmbedder, HitIndex, make_hit
+
+
+@pytest.fixture
+def release():
+    return threading.Event()
+
+
+@pytest.fixture
+def registry():
+    return ModelRegistry(loader=lambda name: FakeEmbedder(), default="fake")
+
+
+@pytest.fixture
+def client(release, registry, monkeypatch):
+    monkeypatch.setattr(settings, "model_warmup", False)
+
+    def runner(job, report):
+        report(files_total=3)
+        while not release.wait(0.01):
+            if job.cancel_event.is_set():
+                raise RuntimeError("cancelled")
+        report(files_done=3, chunks=12, embeddings=12)
+        return {"files_scanned": 3}
+
+    scheduler = IndexJobScheduler(runner, max_concurrent=1, niceness=0)
+    app = create_app()
+    app.dependency_overrides[get_scheduler] = lambda: scheduler
+    app.dependency_overrides[get_registry] = lambda: registry
+    with TestClient(app) as client:
+        yield client
+    release.set()
+    scheduler.close()
+
+
+def test_index_job_lifecycle(client, release, tmp_path):
+    body = {"repo_path": str(tmp_path), "tenant": "acme", "commit": "abc"}
+    first = client.post("/api/v1/index-jobs", json=body)
+    assert first.status_code == 202
+    job = first.json()
+    assert client.post("/api/v1/index-jobs", json=body).json()["id"] == job["id"]
+
+    other = client.post("/api/v1/index-jobs", json={**body, "commit": "def"}).json()
+    cancelled = client.delete(f"/api/v1/index-jobs/{other['id']}").json()
+    assert cancelled["state"] == "cancelled"
+
+    release.set()
+    with client.stream("GET", f"/api/v1/index-jobs/{job['id']}/events?poll_seconds=0.01") as r:
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = [line for line in r.iter_lines() if line.startswith("event:")]
+    assert events[-1] == "event: done"
+
+    done = client.get(f"/api/v1/index-jobs/{job['id']}").json()
+    assert done["state"] == "succeeded"
+    assert done["progress"]["files_done"] == 3 and done["result"] == {"files_scanned": 3}
+    assert [j["id"] for j in client.get("/api/v1/index-jobs?tenant=acme").json()] == [
+        job["id"], other["id"]
+    ]
+
+
+def test_index_job_errors(client, tmp_path):
+    missing = client.post("/api/v1/index-jobs", json={"repo_path": str(tmp_path / "nope")})
+    assert missing.status_code == 400
+    assert client.get("/api/v1/index-jobs/unknown").status_code == 404
+
+
+def test_metrics_endpoint(client):
+    client.get("/api/v1/index-jobs")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_seconds_count{method="GET",route="/api/v1/index-jobs",status="200"}' in (
+        response.text
+    )
+    client.get("/api/v1/index-jobs/unknown")
+    assert 'route="/api/v1/index-jobs/{job_id}",status="404"' in client.get("/metrics").text
+
+
+def test_readiness_waits_for_warm_up(client, registry):
+    cold = client.get("/health/ready")
+    assert cold.status_code == 503 and cold.json()["state"] == "cold"
+    assert client.get("/health").json()["status"] == "ok"
+
+    registry.warm_up()
+
+    assert client.get("/health/ready").status_code == 200
+    stats = client.get("/health").json()["models"]
+    assert stats["models"] == ["fake"] and stats["warmup_seconds"] is not None
+
+
+def test_chat_sends_merged_context(client):
+    hits = [make_hit("w1", "a.py", 1, 20, 0.9), make_hit("w2", "a.py", 16, 35, 0.8)]
+    embedder = FakeEmbedder()
+    batcher = MicroBatcher(embedder.encode)
+    service = ChatService(SearchService(embedder, HitIndex(hits)), EchoGenerator())
+    client.app.dependency_overrides[get_chat_service] = lambda: service
+    client.app.dependency_overrides[get_query_batcher] = lambda: batcher
+
+    body = client.post("/api/v1/chat", json={"query": "how is value_18 computed?"}).json()
+    assert body["answer"] == "see a.py"
+    assert batcher.stats.items == 1  # the query was embedded through the batcher
+    assert [(s["file_path"], s["start_line"], s["end_line"]) for s in body["sources"]] == [
+        ("a.py", 1, 35)
+    ]
+    assert body["context"]["merged"] == 1
+
+    with client.stream("GET", "/api/v1/chat/stream?query=value_18") as r:
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = [line for line in r.iter_lines() if line.startswith("event:")]
+    assert events == ["event: sources", "event: token", "event: token", "event: done"]
+    assert batcher.stats.items == 2
+
+
+def test_chat_without_llm(client, monkeypatch):
+    monkeypatch.setattr(settings, "llm_url", None)
+    assert client.post("/api/v1/chat", json={"query": "hi"}).status_code == 503
@@ -0,0 +1,31 @@
+# tests/unit/test_batching.py
+from src.domain.batching import EncodeStats, plan_batches
+
+
+def test_plan_groups_similar_lengths_under_budget():
+    lengths = [200, 5, 6, 190, 4, 7, 210, 5]
+
+    plan = plan_batches(lengths, token_budget=420, max_batch_size=32)
+
+    assert sorted(i for batch in plan for i in batch) == list(range(len(lengths)))
+    for batch in plan:
+        assert max(lengths[i] for i in batch) * len(batch) <= 420
+    # short texts share a batch, long ones are kept apart from them
+    short = {1, 2, 4, 5, 7}
+    assert any(set(batch) == short for batch in plan)
+
+
+def test_plan_respects_max_batch_size_and_oversized_items():
+    plan = plan_batches([1] * 10 + [10_000], token_budget=100, max_batch_size=4)
+
+    assert all(len(batch) <= 4 for batch in plan)
+    assert [10] in plan  # an item longer than the budget still gets its own batch
+
+
+def test_encode_stats_report_throughput_and_padding():
+    stats = EncodeStats()
+    stats.record([10, 10], seconds=0.5)
+    stats.record([5, 20], seconds=0.5)
+
+    assert stats.texts_per_sec == 4.0
+    assert stats.padding_ratio == 1 - 45 / 60
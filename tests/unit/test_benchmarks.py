@@ -0,0 +1,53 @@
+# tests/unit/test_benchmarks.py
+import copy
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from benchmarks.suite import StubModel, compare, run_suite
+from benchmarks.synthetic_repo import generate_repo
+from src.domain.embeddings import EmbeddingManager
+
+
+def _tree(root: Path):
+    return {p.relative_to(root): p.read_bytes() for p in root.rglob("*") if p.is_file()}
+
+
+def test_generated_repo_is_deterministic(tmp_path: Path):
+    info = generate_repo(tmp_path / "a", files=14, lines=40, seed=3)
+    generate_repo(tmp_path / "b", files=14, lines=40, seed=3)
+
+    assert _tree(tmp_path / "a") == _tree(tmp_path / "b")
+    suffixes = {p.suffix for p in _tree(tmp_path / "a")}
+    assert suffixes == {".py", ".js", ".ts", ".go", ".rs", ".java", ".md"}
+    assert info["files"] == 14 and info["bytes"] > 0
+
+
+def test_stub_model_drives_embedding_manager():
+    manager = EmbeddingManager("stub", model=StubModel(dim=32), store_dir=None)
+    first = manager.encode(["def f(): pass", "return total"])
+    again = StubModel(dim=32).encode(["def f(): pass"])
+
+    assert np.allclose(first[0], again[0])
+    assert np.isclose(np.linalg.norm(first[1]), 1.0)
+
+
+def test_suite_reports_and_compares(tmp_path: Path):
+    report = run_suite(files=14, lines=40, dim=16, queries=20, repeat=1, workdir=tmp_path)
+
+    assert report["chunking"]["files"] == 14
+    assert report["embedding"]["texts"] == report["chunking"]["chunks"]
+    assert report["indexing"]["chunks"] == report["chunking"]["chunks"]
+    assert report["search"]["p50_ms"] <= report["search"]["p99_ms"]
+    assert compare(report, report) == []
+
+    slower = copy.deepcopy(report)
+    slower["chunking"]["files_per_sec"] /= 2
+    slower["search"]["p95_ms"] *= 2
+    regressions = {r["metric"] for r in compare(slower, report, threshold=0.25)}
+    assert regressions == {"chunking.files_per_sec", "search.p95_ms"}
+
+    slower["config"] = dict(report["config"], files=15)
+    with pytest.raises(ValueError):
+        compare(slower, report)
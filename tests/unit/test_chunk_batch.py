@@ -0,0 +1,93 @@
+# tests/unit/test_chunk_batch.py
+import pickle
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.domain.chunker import CodeChunker
+from src.domain.entities import ChunkBatch, CodeChunk
+from src.infra.numpy_index import NumpyVectorIndex
+from tests.helpers import COUNTER, FakeEmbedder, random_chunks
+
+
+def _plain(n: int):
+    return [
+        CodeChunk(
+            id=f"{i:016x}",
+            content="",
+            file_path="".join(["src/pkg/mod_", str(i // 10), ".py"]),
+            language="python",
+            start_line=i,
+            end_line=i + 20,
+            metadata={"chunk_type": "structural", "kind": "function", "tokens": 180},
+        )
+        for i in range(n)
+    ]
+
+
+def test_code_chunk_is_slotted_and_interned():
+    a, b = _plain(2)
+
+    assert not hasattr(a, "__dict__")
+    assert a.file_path is b.file_path
+    assert pickle.loads(pickle.dumps(a)) == a
+
+
+def test_batch_round_trips_chunks():
+    chunks = random_chunks(10)
+    chunks[3].content = "naïve — unicode"
+    chunks[4].metadata = {}
+
+    batch = ChunkBatch.from_chunks(chunks)
+
+    assert len(batch) == 10
+    assert batch.ids == [c.id for c in chunks]
+    assert batch.embeddings.shape == (10, 16) and batch.embeddings.flags.c_contiguous
+    for original, restored in zip(chunks, batch):
+        assert restored.to_dict() == original.to_dict()
+        assert np.array_equal(restored.embedding, original.embedding)
+    assert batch.paths == ["lib/b.go", "src/a.py"]
+    assert [c.id for c in batch[2:5]] == ["c2", "c3", "c4"]
+    assert [c.id for c in batch.select([7, 1])] == ["c7", "c1"]
+    assert ChunkBatch.concat([batch[:4], batch[4:]]).ids == batch.ids
+
+
+def test_batch_pickles_and_takes_embeddings():
+    batch = ChunkBatch.from_chunks(c for c in _plain(5))
+    assert batch.embeddings is None
+
+    embedded = FakeEmbedder().encode_batch(batch)
+    assert embedded.embeddings.shape == (5, 4)
+    restored = pickle.loads(pickle.dumps(embedded))
+    assert restored.to_dict(4) == batch.to_dict(4)
+    with pytest.raises(ValueError):
+        batch.with_embeddings(np.zeros((3, 4)))
+
+
+def test_batch_is_much_smaller_than_chunk_objects():
+    tracemalloc.start()
+    chunks = _plain(5000)
+    objects = tracemalloc.get_traced_memory()[0]
+    batch = ChunkBatch.from_chunks(chunks)
+    columnar = tracemalloc.get_traced_memory()[0] - objects
+    tracemalloc.stop()
+
+    assert columnar < objects / 4
+    assert batch.nbytes < objects / 4
+
+
+def test_chunker_and_index_exchange_batches(tmp_path: Path):
+    for i in range(3):
+        (tmp_path / f"m{i}.py").write_text(f"def f{i}():\n    return {i}\n", encoding="utf-8")
+    chunker = CodeChunker(max_tokens=200, overlap=20, token_counter=COUNTER)
+    files = sorted(tmp_path.glob("*.py"))
+
+    batch = FakeEmbedder().encode_batch(chunker.chunk_batch(files))
+    index = NumpyVectorIndex(tmp_path / "index")
+    index.upsert_batch(batch)
+
+    assert index.count() == len(batch) == 3
+    hits = index.search(batch.embeddings[0], k=1, path_prefix=str(files[0]))
+    assert hits[0].to_chunk().content == batch.content(0)
@@ -0,0 +1,115 @@
+# tests/unit/test_chunk_file.py
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.cli.chunker_cli import main as chunker_main
+from src.domain.chunk_file import ChunkFile, ChunkFileWriter, load_chunk_file
+from src.domain.entities import ChunkBatch
+from src.infra.numpy_index import NumpyVectorIndex
+from tests.helpers import FakeEmbedder, random_chunks
+
+
+def _unembedded(n: int):
+    chunks = random_chunks(n)
+    for c in chunks:
+        c.embedding = None
+    return ChunkBatch.from_chunks(chunks)
+
+
+def _write(path: Path, batches, dtype="float16"):
+    with ChunkFileWriter(path, dtype=dtype) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+    return path
+
+
+def test_round_trip_preserves_chunks_and_embeddings(tmp_path: Path):
+    chunks = random_chunks(25)
+    chunks[3].content = "naïve — unicode"
+    chunks[4].metadata = {}
+    batch = ChunkBatch.from_chunks(chunks)
+    path = _write(tmp_path / "c.bin", [batch[:10], batch[10:]], dtype="float32")
+
+    with ChunkFile(path) as cf:
+        assert len(cf) == 25 and cf.dim == 16 and cf.dtype == np.float32
+        restored = cf.batch()
+        assert [restored.to_dict(i) for i in range(25)] == [c.to_dict() for c in chunks]
+        assert np.array_equal(cf.embeddings, batch.embeddings)
+        assert sorted(cf.paths) == ["lib/b.go", "src/a.py"]
+        assert [c.id for c in cf.batch(5, 8)] == ["c5", "c6", "c7"]
+    assert not list(tmp_path.glob(".chunks-*"))
+
+
+def test_batches_are_views_of_the_mapping(tmp_path: Path):
+    batch = ChunkBatch.from_chunks(random_chunks(100))
+    path = _write(tmp_path / "c.bin", [batch])
+
+    with ChunkFile(path) as cf:
+        view = cf.batch(10, 50)
+        assert isinstance(view.text_buffer, memoryview)
+        assert not view.embeddings.flags.owndata
+        assert view.embeddings.dtype == np.float16
+        assert np.allclose(view.embeddings, batch.embeddings[10:50], atol=1e-2)
+        assert [len(b) for b in cf.iter_batches(40)] == [40, 40, 20]
+
+
+def test_writer_rejects_inconsistent_batches(tmp_path: Path):
+    embedded = ChunkBatch.from_chunks(random_chunks(4))
+    plain = _unembedded(4)
+
+    writer = ChunkFileWriter(tmp_path / "c.bin")
+    writer.write_batch(embedded)
+    with pytest.raises(ValueError):
+        writer.write_batch(plain)
+    with pytest.raises(ValueError):
+        writer.write_batch(embedded.with_embeddings(np.zeros((4, 8))))
+    writer.discard()
+    assert not (tmp_path / "c.bin").exists()
+    with pytest.raises(ValueError):
+        ChunkFileWriter(tmp_path / "c.bin", dtype="int8")
+
+
+def test_load_chunk_file_feeds_index(tmp_path: Path):
+    batch = ChunkBatch.from_chunks(random_chunks(30))
+    path = _write(tmp_path / "c.bin", [batch], dtype="float32")
+    index = NumpyVectorIndex(tmp_path / "index")
+
+    assert load_chunk_file(path, index, batch_size=7) == 30
+    assert index.count() == 30
+    hits = index.search(batch.embeddings[12], k=1)
+    assert hits[0].id == "c12"
+    assert hits[0].to_chunk().to_dict() == batch.to_dict(12)
+
+
+def test_load_requires_embeddings(tmp_path: Path):
+    path = _write(tmp_path / "c.bin", [_unembedded(3)])
+
+    with pytest.raises(ValueError):
+        load_chunk_file(path, NumpyVectorIndex(tmp_path / "index"))
+
+
+def test_rejects_foreign_files(tmp_path: Path):
+    path = tmp_path / "c.bin"
+    path.write_bytes(b"not a chunk file at all")
+    with pytest.raises(ValueError):
+        ChunkFile(path)
+
+
+def test_cli_writes_bin_format(tmp_path: Path):
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(3):
+        (src / f"m{i}.py").write_text(f"def f{i}():\n    return {i}\n", encoding="utf-8")
+    out = tmp_path / "chunks.bin"
+
+    chunker_main([str(src), "-r", "--format", "bin", "-o", str(out)])
+
+    with ChunkFile(out) as cf:
+        assert len(cf) == 3 and cf.embeddings is None
+        assert sorted(Path(c.file_path).name for c in cf.batch()) == ["m0.py", "m1.py", "m2.py"]
+        embedded = FakeEmbedder().encode_batch(cf.batch())
+    assert embedded.embeddings.shape == (3, 4)
+    with pytest.raises(SystemExit):
+        chunker_main([str(src), "--format", "bin"])
@@ -1,8 +1,9 @@
 # tests/test_chunker.py
 from pathlib import Path
 
-from src.core.chunker import CodeChunker
+from src.domain.chunker import CodeChunker
 from src.domain.entities import CodeChunk
+from tests.helpers import COUNTER
 
 
 def _make_file(tmp_path: Path, name: str, text: str) -> Path:
@@ -21,11 +22,13 @@ class Bar:
         return 2
 """
     path = _make_file(tmp_path, "example.py", code)
-    chunker = CodeChunker(max_tokens=200, overlap=20)
+    chunker = CodeChunker(max_tokens=200, overlap=20, token_counter=COUNTER)
 
     chunks = chunker.chunk_file(path)
 
-    assert len(chunks) >= 2  # def foo + class Bar
+    # small adjacent definitions are packed into one chunk, but none is dropped
+    assert any("def foo" in c.content for c in chunks)
+    assert any("class Bar" in c.content for c in chunks)
     assert all(isinstance(c, CodeChunk) for c in chunks)
     assert all(c.language == "python" for c in chunks)
     assert all(c.metadata.get("chunk_type") == "structural" for c in chunks)
@@ -35,7 +38,7 @@ def test_window_chunking_for_non_code_files(tmp_path: Path):
     lines = "\n".join(f"line {i}" for i in range(1, 13))  # 12 lines
     path = _make_file(tmp_path, "README.md", lines)
     # Pick values that make windowing deterministic enough
-    chunker = CodeChunker(max_tokens=100, overlap=10)
+    chunker = CodeChunker(max_tokens=100, overlap=10, token_counter=COUNTER)
 
     chunks = chunker.chunk_file(path)
 
@@ -48,8 +51,131 @@ def test_window_chunking_for_non_code_files(tmp_path: Path):
 
 def test_missing_file_returns_empty_list(tmp_path: Path):
     missing = tmp_path / "does_not_exist.py"
-    chunker = CodeChunker(max_tokens=100, overlap=10)
+    chunker = CodeChunker(max_tokens=100, overlap=10, token_counter=COUNTER)
 
     chunks = chunker.chunk_file(missing)
 
     assert chunks == []
+
+
+def test_python_keeps_module_code_and_splits_large_definitions(tmp_path: Path):
+    methods = "\n".join(
+        f"    def m{i}(self):\n        return {' + '.join(['x'] * 20)}\n" for i in range(6)
+    )
+    body = "\n".join(f"    total += {i} * value" for i in range(60))
+    code = (
+        "import os\n\nCONSTANT = 1\n\n"
+        f"class Big:\n    attr = 1\n\n{methods}\n"
+        f"def long_function(value):\n    total = 0\n{body}\n    return total\n\n"
+        "if __name__ == '__main__':\n    long_function(1)\n"
+    )
+    path = _make_file(tmp_path, "big.py", code)
+    chunker = CodeChunker(max_tokens=40, overlap=0, token_counter=COUNTER)
+
+    chunks = chunker.chunk_file(path)
+
+    assert "CONSTANT = 1" in chunks[0].content
+    assert "__main__" in chunks[-1].content
+    symbols = {s for c in chunks for s in c.metadata.get("symbol", "").split(",")}
+    assert {f"Big.m{i}" for i in range(6)} <= symbols
+    pieces = [c for c in chunks if c.metadata.get("symbol") == "long_function"]
+    assert len(pieces) > 1
+    assert all(c.metadata["tokens"] <= 40 for c in pieces)
+    # Nothing is dropped: every non-blank line is in some chunk
+    covered = set()
+    for c in chunks:
+        covered.update(range(c.start_line, c.end_line + 1))
+    lines = code.split("\n")
+    assert all(i + 1 in covered for i, line in enumerate(lines) if line.strip())
+
+
+def test_python_syntax_error_falls_back_to_window(tmp_path: Path):
+    path = _make_file(tmp_path, "broken.py", "def broken(:\n    pass\n")
+    chunker = CodeChunker(max_tokens=100, overlap=10, token_counter=COUNTER)
+
+    chunks = chunker.chunk_file(path)
+
+    assert chunks and chunks[0].metadata["chunk_type"] == "window"
+
+
+def test_typescript_structural_chunking_ignores_braces_in_strings(tmp_path: Path):
+    code = """import { x } from "./x";
+
+export class Foo {
+  get value(): number {
+    return 1;
+  }
+
+  load(id: string): string {
+    const t = `/api/${id} { not a brace`;
+    const u = "}";
+    return t + u;
+  }
+}
+
+export function helper(a: number): number {
+  return a * 2; // }
+}
+"""
+    path = _make_file(tmp_path, "foo.ts", code)
+    chunker = CodeChunker(max_tokens=40, overlap=0, token_counter=COUNTER)
+
+    chunks = chunker.chunk_file(path)
+    symbols = [c.metadata.get("symbol", "").split(",") for c in chunks]
+
+    assert all(c.metadata["chunk_type"] == "structural" for c in chunks)
+    assert any("helper" in s for s in symbols)
+    load = next(c for c, s in zip(chunks, symbols) if "Foo.load" in s)
+    assert load.content.strip().startswith("load(")
+    assert load.start_line == 8 and load.end_line >= 12
+
+
+def test_go_and_java_chunks_follow_declarations(tmp_path: Path):
+    go = _make_file(
+        tmp_path,
+        "main.go",
+        "package main\n\ntype S struct {\n\tn int\n}\n\n"
+        "func (s *S) Get() int {\n\treturn s.n\n}\n\nfunc main() {\n\t_ = `{`\n}\n",
+    )
+    java = _make_file(
+        tmp_path,
+        "A.java",
+        "class A {\n    @Override\n    public String toString() {\n        return \"}\";\n"
+        "    }\n\n    int add(int a,\n            int b) {\n        return a + b;\n    }\n}\n",
+    )
+
+    chunker = CodeChunker(max_tokens=15, overlap=0, token_counter=COUNTER)
+    go_chunks = chunker.chunk_file(go)
+    java_chunks = chunker.chunk_file(java)
+
+    assert any("S.Get" in c.metadata.get("symbol", "").split(",") for c in go_chunks)
+    methods = {c.metadata.get("symbol"): c for c in java_chunks if c.metadata["kind"] == "method"}
+    assert methods["A.toString"].start_line == 2  # annotation stays with its method
+    assert methods["A.add"].start_line == 7  # wrapped signature is kept whole
+
+
+def test_window_chunks_fit_the_token_budget(tmp_path: Path):
+    text = "\n".join(f"word{i} " * 7 for i in range(50))
+    path = _make_file(tmp_path, "notes.md", text)
+    chunker = CodeChunker(max_tokens=40, overlap=20, token_counter=COUNTER)
+
+    chunks = chunker.chunk_file(path)
+
+    assert len(chunks) > 1
+    assert all(c.metadata["tokens"] <= 40 for c in chunks)
+    assert chunks[-1].end_line == 50
+    # consecutive windows share roughly `overlap` tokens
+    assert all(b.start_line <= a.end_line for a, b in zip(chunks, chunks[1:]))
+    stats = chunker.stats.as_dict()
+    assert stats["chunks"] == len(chunks) and 0 < stats["utilization"] <= 1
+
+
+def test_small_adjacent_definitions_are_packed(tmp_path: Path):
+    code = "\n\n".join(f"def get_{i}(self):\n    return self._{i}" for i in range(10))
+    path = _make_file(tmp_path, "getters.py", code)
+    chunker = CodeChunker(max_tokens=200, overlap=20, token_counter=COUNTER)
+
+    chunks = chunker.chunk_file(path)
+
+    assert len(chunks) == 1
+    assert chunks[0].metadata["symbol"] == ",".join(f"get_{i}" for i in range(10))
@@ -0,0 +1,49 @@
+# tests/unit/test_chunker_cli.py
+import json
+from pathlib import Path
+
+from src.cli.chunker_cli import iter_chunked, main
+
+
+def _make_repo(tmp_path: Path, n: int = 12) -> list:
+    files = []
+    for i in range(n):
+        p = tmp_path / f"mod_{i:02d}.py"
+        p.write_text(f"def f{i}():\n    return {i}\n", encoding="utf-8")
+        files.append(p)
+    return files
+
+
+def test_parallel_ordered_matches_serial(tmp_path: Path):
+    files = _make_repo(tmp_path)
+
+    serial = list(iter_chunked(files, jobs=1))
+    parallel = list(iter_chunked(files, jobs=3, ordered=True, max_in_flight=2))
+
+    assert [r.path for r in parallel] == [str(f) for f in files]
+    assert [r.records for r in parallel] == [r.records for r in serial]
+
+
+def test_parallel_unordered_yields_every_file(tmp_path: Path):
+    files = _make_repo(tmp_path)
+
+    results = list(iter_chunked(files, jobs=2))
+
+    assert sorted(r.path for r in results) == sorted(str(f) for f in files)
+
+
+def test_cli_streams_valid_json_formats(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _make_repo(repo, n=3)
+
+    for fmt in ("jsonl", "json", "pretty"):
+        out = tmp_path / f"out.{fmt}"
+        main([str(repo), "-r", "-f", fmt, "-o", str(out), "--jobs", "2"])
+        text = out.read_text(encoding="utf-8")
+        if fmt == "jsonl":
+            records = [json.loads(line) for line in text.splitlines()]
+        else:
+            records = json.loads(text)
+        assert len(records) == 3
+        assert {r["language"] for r in records} == {"python"}
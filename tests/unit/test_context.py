@@ -0,0 +1,107 @@
+# tests/unit/test_context.py
+from pathlib import Path
+
+import numpy as np
+
+from src.domain.chat import ChatService
+from src.domain.context import ContextAssembler, merge_hits
+from src.domain.entities import SearchHit
+from src.domain.search import SearchService
+from src.domain.symbols import SymbolTable, SymbolTableBuilder, extract_symbols
+from tests.helpers import LINES, EchoGenerator, FakeEmbedder, HitIndex, make_hit
+
+
+def test_merge_overlapping_adjacent_and_nested_hits():
+    hits = [
+        make_hit("w1", "a.py", 1, 20, 0.9),
+        make_hit("w2", "a.py", 16, 35, 0.7),  # overlapping window
+        make_hit("w3", "a.py", 36, 40, 0.5),  # adjacent
+        make_hit("m1", "a.py", 5, 10, 0.8),  # nested in w1
+        make_hit("far", "a.py", 60, 70, 0.6),
+        make_hit("b1", "b.py", 1, 10, 0.95),
+        SearchHit("commit", 0.4, {"content": "Fix cache", "file_path": "", "language": "git",
+                                  "start_line": 0, "end_line": 0}),
+    ]
+
+    blocks = merge_hits(hits)
+
+    assert [(b.file_path, b.start_line, b.end_line) for b in blocks] == [
+        ("b.py", 1, 10), ("a.py", 1, 40), ("a.py", 60, 70), ("", 0, 0)
+    ]
+    merged = blocks[1]
+    assert merged.content == "\n".join(LINES[:40])
+    assert merged.score == 0.9 and sorted(merged.chunk_ids) == ["m1", "w1", "w2", "w3"]
+
+
+def test_mmr_drops_near_duplicates_from_other_files():
+    hits = [
+        make_hit("a", "a.py", 1, 10, 0.9),
+        make_hit("copy", "vendor/a.py", 1, 10, 0.85),
+        make_hit("b", "b.py", 50, 60, 0.5),
+    ]
+
+    context = ContextAssembler(max_tokens=10_000).assemble(hits)
+
+    assert [b.file_path for b in context.blocks] == ["a.py", "b.py"]
+    assert context.stats.duplicates == 1
+
+
+def test_packs_into_budget_best_score_first():
+    hits = [make_hit(f"h{i}", f"f{i}.py", 10 * i + 1, 10 * i + 8, 1.0 - i / 10) for i in range(8)]
+    assembler = ContextAssembler(max_tokens=300, diversity=0.0)
+    unlimited = assembler.assemble(hits, max_tokens=100_000)
+
+    context = assembler.assemble(hits)
+
+    assert context.stats.tokens <= 300 < unlimited.stats.tokens
+    assert context.stats.over_budget > 0
+    assert [b.file_path for b in context.blocks] == [
+        b.file_path for b in unlimited.blocks[:len(context.blocks)]
+    ]
+    assert context.stats.saved_ratio > 0
+
+
+def test_oversized_top_block_is_truncated():
+    context = ContextAssembler(max_tokens=120).assemble([make_hit("big", "a.py", 1, 100, 1.0)])
+
+    (block,) = context.blocks
+    assert block.tokens <= 120 and 1 < block.end_line < 100
+    assert block.content == "\n".join(LINES[:block.end_line])
+
+
+def test_chat_service_prompt_has_each_line_once():
+    hits = [make_hit("w1", "a.py", 1, 20, 0.9), make_hit("w2", "a.py", 16, 35, 0.8)]
+    generator = EchoGenerator()
+    service = ChatService(SearchService(FakeEmbedder(), HitIndex(hits)), generator)
+
+    prepared = service.prepare("how is value_18 computed?")
+
+    assert service.answer(prepared) == "see a.py"
+    assert generator.prompts[0].count(LINES[17]) == 1
+    assert "### a.py:1-35" in prepared.prompt
+    assert prepared.context.stats.tokens < prepared.context.stats.hit_tokens
+    assert np.isclose(prepared.context.blocks[0].score, 0.9)
+
+
+def test_chat_service_answers_navigation_from_symbols(tmp_path: Path):
+    source = tmp_path / "app.py"
+    source.write_text("def helper():\n    return 1\n\n\ndef serve():\n    return helper()\n")
+    builder = SymbolTableBuilder()
+    builder.update(str(source), *extract_symbols(source.read_text(), "python", str(source)))
+    builder.write(tmp_path / "symbols.bin")
+    embedder = FakeEmbedder()
+    service = ChatService(
+        SearchService(embedder, HitIndex([make_hit("w1", "a.py", 1, 20, 0.9)])), EchoGenerator(),
+        symbols=lambda: [SymbolTable(tmp_path / "symbols.bin")],
+    )
+
+    defined = service.prepare("where is `helper` defined?")
+    callers = service.prepare("who calls helper?")
+    assert embedder.calls == []
+    assert [(b.file_path, b.start_line, b.end_line) for b in defined.context.blocks] == [
+        (str(source), 1, 2)
+    ]
+    assert callers.context.blocks[0].content == "def serve():\n    return helper()"
+
+    assert service.prepare("who calls missing?").context.blocks[0].file_path == "a.py"
+    assert len(embedder.calls) == 1
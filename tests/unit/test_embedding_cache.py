@@ -0,0 +1,77 @@
+# tests/unit/test_embedding_cache.py
+from pathlib import Path
+
+import numpy as np
+
+from src.domain.embedding_cache import (
+    DiskEmbeddingStore,
+    LRUEmbeddingCache,
+    TieredEmbeddingCache,
+    content_key,
+)
+
+
+def _vec(value: float, dim: int = 8) -> np.ndarray:
+    return np.full(dim, value, dtype=np.float32)
+
+
+def test_lru_is_bounded_by_bytes():
+    cache = LRUEmbeddingCache(max_bytes=_vec(0).nbytes * 2)
+    cache.put(b"a", _vec(1))
+    cache.put(b"b", _vec(2))
+    cache.get(b"a")  # a is now most recently used
+    cache.put(b"c", _vec(3))
+
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") is not None
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.evictions == 1
+
+
+def test_disk_store_survives_restart_and_is_shared(tmp_path: Path):
+    writer = DiskEmbeddingStore(tmp_path, "BAAI/bge-m3")
+    reader = DiskEmbeddingStore(tmp_path, "BAAI/bge-m3", read_only=True)
+    keys = [content_key("def foo(): pass"), content_key("def bar(): pass")]
+
+    assert writer.put_many(keys, [_vec(1), _vec(2)]) == 2
+    assert writer.put_many(keys, [_vec(1), _vec(2)]) == 0  # already stored
+
+    # A reader opened before the write picks up appended rows on a miss
+    np.testing.assert_array_equal(reader.get(keys[1]), _vec(2))
+
+    restarted = DiskEmbeddingStore(tmp_path, "BAAI/bge-m3")
+    np.testing.assert_array_equal(restarted.get(keys[0]), _vec(1))
+    assert DiskEmbeddingStore(tmp_path, "other-model").get(keys[0]) is None
+
+
+def test_tiered_cache_counts_hits_misses_and_promotes(tmp_path: Path):
+    keys = [content_key("x"), content_key("y")]
+    first = TieredEmbeddingCache(1 << 20, DiskEmbeddingStore(tmp_path, "m"))
+    assert first.get_many(keys) == [None, None]
+    first.put_many(keys, [_vec(1), _vec(2)])
+
+    second = TieredEmbeddingCache(1 << 20, DiskEmbeddingStore(tmp_path, "m"))
+    second.get_many(keys)  # served from disk
+    second.get_many(keys)  # served from memory
+
+    stats = second.stats()
+    assert stats["disk_hits"] == 2
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 0
+    assert stats["hit_ratio"] == 1.0
+    assert first.stats()["misses"] == 2
+
+
+def test_raw_and_normalized_vectors_have_different_keys():
+    assert content_key("x") != content_key("x", normalized=False)
+    assert content_key("x") == content_key("x", normalized=True)
+
+
+def test_tiered_cache_refreshes_the_store_once_per_lookup(tmp_path: Path, monkeypatch):
+    store = DiskEmbeddingStore(tmp_path, "m")
+    cache = TieredEmbeddingCache(1 << 20, store)
+    refreshes = []
+    monkeypatch.setattr(store, "refresh", lambda: refreshes.append(1))
+
+    assert cache.get_many([content_key(str(i)) for i in range(50)]) == [None] * 50
+    assert len(refreshes) == 1
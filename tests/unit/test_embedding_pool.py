@@ -0,0 +1,65 @@
+# tests/unit/test_embedding_pool.py
+import functools
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from benchmarks.suite import StubModel
+from src.domain.embedding_pool import ProcessEmbeddingPool, core_sets
+from src.domain.embeddings import EmbeddingManager
+
+
+class FailingModel(StubModel):
+    def encode(self, texts, *args, **kwargs):
+        if any("boom" in t for t in texts):
+            raise ValueError("bad input")
+        return super().encode(texts, *args, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ProcessEmbeddingPool(functools.partial(StubModel, dim=8), processes=2) as pool:
+        yield pool
+
+
+def test_core_sets_split_and_wrap():
+    sets = core_sets(3, cores_per_process=2)
+    assert len(sets) == 3 and all(len(s) == 2 for s in sets)
+    assert all(len(s) >= 1 for s in core_sets(4))
+
+
+def test_pool_matches_in_process_model(pool):
+    texts = [f"def f{i}(x): return x + {i}" for i in range(23)]
+    expected = StubModel(dim=8).encode(texts)
+
+    np.testing.assert_allclose(pool.encode(texts, batch_size=4), expected, rtol=1e-6)
+    assert pool.dim == 8
+    # A bigger call grows the shared output; a smaller one reuses it
+    np.testing.assert_allclose(pool.encode(texts * 3)[-23:], expected, rtol=1e-6)
+    np.testing.assert_allclose(pool.encode(texts[:2]), expected[:2], rtol=1e-6)
+
+
+def test_embedding_manager_plans_batches_onto_pool(pool):
+    manager = EmbeddingManager("stub", model=pool, store_dir=None)
+    texts = [("word " * n).strip() for n in range(1, 40)]
+
+    embeddings = manager.encode(texts, batch_size=8)
+
+    np.testing.assert_allclose(
+        np.stack(embeddings), StubModel(dim=8).encode(texts), rtol=1e-6
+    )
+    stats = manager.throughput_stats()
+    assert stats["texts"] == len(texts) and stats["batches"] >= 5 and stats["seconds"] > 0
+
+
+def test_worker_errors_are_raised_and_pool_keeps_working():
+    with ProcessEmbeddingPool(functools.partial(FailingModel, dim=4), processes=1) as pool:
+        with pytest.raises(RuntimeError, match="bad input"):
+            pool.encode(["fine", "boom"])
+        assert pool.encode(["fine"]).shape == (1, 4)
+        name = pool._shm.name
+
+    assert not pool._workers
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
@@ -0,0 +1,110 @@
+# tests/unit/test_history.py
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from src.domain.history import (
+    GitError,
+    GitHistoryIndexer,
+    HistoryCheckpoints,
+    commit_chunk,
+    iter_commits,
+)
+from tests.helpers import FakeEmbedder, MemoryIndex
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _git(repo: Path, *args: str) -> str:
+    out = subprocess.run(
+        ["git", "-C", str(repo), *args], capture_output=True, text=True, check=True
+    )
+    return out.stdout.strip()
+
+
+def _commit(repo: Path, files: dict, message: str) -> str:
+    for name, text in files.items():
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", message)
+    return _git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+    _git(repo, "config", "user.name", "Ada")
+    _git(repo, "config", "user.email", "ada@example.com")
+    _commit(repo, {"src/app.py": "def serve():\n    return 1\n"}, "Add server")
+    _commit(
+        repo,
+        {"src/app.py": "def serve():\n    return 2\n\n\ndef stop():\n    pass\n",
+         "README.md": "# demo\n"},
+        "Change serve and add stop\n\nThe old value broke clients.\n-- not a diff line",
+    )
+    _commit(repo, {"src/util.py": "class Helper:\n    pass\n"}, "Add helper")
+    return repo
+
+
+def test_iter_commits_streams_newest_first(repo: Path):
+    commits = list(iter_commits(repo, ["HEAD"], symbols=True))
+
+    assert [c.subject for c in commits] == ["Add helper", "Change serve and add stop", "Add server"]
+    change = commits[1]
+    assert change.body == "The old value broke clients.\n-- not a diff line"
+    assert change.author == "Ada" and len(change.parents) == 1
+    assert {(f.path, f.added, f.deleted) for f in change.files} == {
+        ("README.md", 1, 0), ("src/app.py", 5, 1)
+    }
+    assert change.symbols["src/app.py"] == ["serve", "stop"]
+    assert commits[0].symbols == {"src/util.py": ["Helper"]}
+    # Without symbols no patch is requested; file stats are the same
+    plain = list(iter_commits(repo, ["HEAD"]))
+    assert [c.files for c in plain] == [c.files for c in commits]
+    assert all(c.symbols == {} for c in plain)
+    with pytest.raises(GitError, match="no-such-branch"):
+        list(iter_commits(repo, ["no-such-branch"]))
+
+
+def test_commit_chunk_links_files_and_symbols(repo: Path):
+    commit = list(iter_commits(repo, ["HEAD"], symbols=True))[1]
+    chunk = commit_chunk(commit)
+
+    assert chunk.id == commit_chunk(commit).id
+    assert chunk.metadata["chunk_type"] == "commit"
+    assert chunk.metadata["symbols"] == ["serve", "stop"]
+    assert chunk.file_path == ""  # README.md and src/app.py share no directory
+    assert "src/app.py (+5 -1): serve, stop" in chunk.content
+
+
+def test_history_indexing_is_incremental_per_branch(repo: Path, tmp_path: Path):
+    checkpoints = tmp_path / "state" / "history.json"
+    index = MemoryIndex()
+    indexer = GitHistoryIndexer(FakeEmbedder(), index, checkpoint_path=checkpoints, batch_size=2)
+
+    stats = indexer.index_history(repo)
+    assert stats.commits == stats.chunks_embedded == len(index.points) == 3
+
+    _git(repo, "checkout", "-q", "-b", "feature")
+    _commit(repo, {"src/feature.py": "def flag():\n    return True\n"}, "Add feature flag")
+    _git(repo, "checkout", "-q", "main")
+    _commit(repo, {"src/app.py": "def serve():\n    return 3\n"}, "Drop stop")
+
+    embedder = FakeEmbedder()
+    stats = GitHistoryIndexer(embedder, index, checkpoint_path=checkpoints).index_history(repo)
+    assert stats.commits == 2
+    assert stats.branches_indexed == 2
+    assert len(index.points) == 5
+    assert sum(len(call) for call in embedder.calls) == 2
+
+    saved = HistoryCheckpoints.load(checkpoints).branches
+    assert saved == {"main": _git(repo, "rev-parse", "main"),
+                     "feature": _git(repo, "rev-parse", "feature")}
+    again = GitHistoryIndexer(FakeEmbedder(), index, checkpoint_path=checkpoints)
+    assert again.index_history(repo).branches_unchanged == 2
@@ -0,0 +1,141 @@
+# tests/unit/test_indexer.py
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.domain.chunker import CodeChunker
+from src.domain.manifest import FileManifest
+from src.domain.services import IndexingCancelled, IndexingService
+from src.domain.symbols import SymbolTable
+from tests.helpers import COUNTER, FakeEmbedder, MemoryIndex
+
+
+def _write(path: Path, text: str) -> Path:
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def _service(tmp_path: Path):
+    embedder, index = FakeEmbedder(), MemoryIndex()
+    service = IndexingService(
+        CodeChunker(max_tokens=200, overlap=20, token_counter=COUNTER),
+        embedder,
+        index,
+        manifest_path=tmp_path / "state" / "manifest.json",
+    )
+    return service, embedder, index
+
+
+def test_chunk_ids_are_deterministic(tmp_path: Path):
+    path = _write(tmp_path / "a.py", "def foo():\n    return 1\n")
+    chunker = CodeChunker(max_tokens=200, overlap=20, token_counter=COUNTER)
+
+    first = [c.id for c in chunker.chunk_file(path)]
+    second = [c.id for c in chunker.chunk_file(path)]
+
+    assert first == second
+
+
+def test_rerun_without_changes_embeds_nothing(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    files = [
+        _write(repo / "a.py", "def foo():\n    return 1\n"),
+        _write(repo / "b.py", "def bar():\n    return 2\n"),
+    ]
+    service, embedder, index = _service(tmp_path)
+    stats = service.index_files(files)
+    assert stats.files_changed == 2
+    assert stats.chunks_embedded == len(index.points) > 0
+
+    embedder.calls.clear()
+    service, embedder, index2 = _service(tmp_path)
+    stats = service.index_files(files)
+
+    assert stats.files_unchanged == 2
+    assert stats.chunks_embedded == 0
+    assert embedder.calls == []
+
+
+def test_only_changed_and_removed_files_touch_the_index(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    a = _write(repo / "a.py", "def foo():\n    return 1\n")
+    b = _write(repo / "b.py", "def bar():\n    return 2\n")
+    c = _write(repo / "c.py", "def baz():\n    return 3\n")
+    service, embedder, index = _service(tmp_path)
+    service.index_files([a, b, c])
+    c_ids = set(FileManifest.load(service.manifest_path).get(str(c)).chunk_ids)
+
+    _write(a, "def foo():\n    return 42\n")
+    os.utime(b, ns=(0, 0))  # touched but identical content
+    embedder.calls.clear()
+    stats = service.index_files([a, b])
+
+    assert stats.files_changed == 1
+    assert stats.files_removed == 1
+    assert embedder.calls == [["def foo():\n    return 42"]]
+    assert not c_ids & set(index.points)
+    assert all(p.file_path != str(c) for p in index.points.values())
+    assert str(c) not in FileManifest.load(service.manifest_path)
+
+
+def test_full_reindex_deletes_previous_chunks(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    a = _write(repo / "a.py", "def foo():\n    return 1\n")
+    service, embedder, index = _service(tmp_path)
+    service.index_files([a])
+    old_ids = set(index.points)
+
+    _write(a, "def foo():\n    return 42\n")
+    stats = service.index_files([a], full=True)
+
+    assert stats.files_changed == 1
+    assert not old_ids & set(index.points)
+    assert set(index.points) == set(FileManifest.load(service.manifest_path).get(str(a)).chunk_ids)
+
+
+def test_symbol_table_follows_changed_and_removed_files(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    a = _write(repo / "a.py", "def foo():\n    return bar()\n")
+    b = _write(repo / "b.py", "def bar():\n    return 2\n")
+    symbols_path = tmp_path / "state" / "symbols.bin"
+    service = IndexingService(
+        CodeChunker(max_tokens=200, overlap=20, token_counter=COUNTER),
+        FakeEmbedder(),
+        MemoryIndex(),
+        manifest_path=tmp_path / "state" / "manifest.json", symbols_path=symbols_path,
+    )
+    service.index_files([a, b])
+    table = SymbolTable(symbols_path)
+    assert table.definitions("bar")[0].file_path == str(b)
+    assert table.callers("bar") == ["foo"]
+    table.close()
+
+    _write(a, "def foo():\n    return 1\n")
+    service.index_files([a])
+    table = SymbolTable(symbols_path)
+    assert table.definitions("foo")[0].file_path == str(a)
+    assert table.definitions("bar") == [] and table.callers("bar") == []
+
+
+def test_cancel_stops_before_saving_the_manifest(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    files = [_write(repo / f"m{i}.py", f"def f{i}():\n    return {i}\n") for i in range(3)]
+    service, _, _ = _service(tmp_path)
+    cancel = threading.Event()
+    seen = []
+
+    def progress(stats):
+        seen.append(stats.files_scanned)
+        cancel.set()
+
+    with pytest.raises(IndexingCancelled):
+        service.index_files(files, progress=progress, cancel=cancel)
+    assert seen == [1]
+    assert not service.manifest_path.exists()
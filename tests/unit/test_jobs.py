@@ -0,0 +1,149 @@
+# tests/unit/test_jobs.py
+import threading
+
+import pytest
+
+from src.domain.jobs import (
+    CANCELLED,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    IndexJobScheduler,
+    JobStore,
+)
+
+
+class GatedRunner:
+    """Runs jobs only as far as the test allows"""
+
+    def __init__(self):
+        self.started = []
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+
+    def __call__(self, job, report):
+        with self.lock:
+            self.started.append((job.repo, job.full))
+        report(files_total=10)
+        while not self.release.wait(0.01):
+            if job.cancel_event.is_set():
+                raise RuntimeError("stopped")
+        if job.repo == "broken":
+            raise ValueError("bad repo")
+        report(files_done=10, chunks=40, embeddings=30, elapsed=2.0)
+        return {"files": 10}
+
+
+@pytest.fixture
+def runner():
+    return GatedRunner()
+
+
+def test_dedupes_prioritises_incremental_and_reports_progress(runner):
+    scheduler = IndexJobScheduler(runner, max_concurrent=1, niceness=0)
+    first = scheduler.submit("t1", "big", "c1", full=True)
+    scheduler.wait(first.id, version=first.version, timeout=2)  # now running
+
+    other = scheduler.submit("t1", "other", "c1", full=True)
+    small = scheduler.submit("t2", "small", "c9")
+    assert scheduler.submit("t2", "small", "c9").id == small.id
+    mid = scheduler.submit("t2", "mid", "c5")
+    assert scheduler.submit("t2", "mid", "c5", full=True).id == mid.id
+    assert mid.full  # upgraded while queued
+    broken = scheduler.submit("t3", "broken")
+
+    runner.release.set()
+    jobs = (first, other, small, mid, broken)
+    for job in jobs:
+        while not scheduler.wait(job.id, job.version, timeout=2).done:
+            pass
+    scheduler.close()
+
+    # Incremental jobs first; among full rebuilds, t1 started longest ago
+    assert [repo for repo, _ in runner.started] == ["big", "small", "broken", "other", "mid"]
+    assert first.state == SUCCEEDED and first.result == {"files": 10}
+    progress = first.progress.as_dict()
+    assert progress["files_done"] == 10 and progress["embeddings_per_sec"] > 0
+    assert broken.state == FAILED and "bad repo" in broken.error
+
+
+def test_cancel_queued_and_running_jobs(runner):
+    scheduler = IndexJobScheduler(runner, max_concurrent=1, niceness=0)
+    running = scheduler.submit("t1", "a")
+    scheduler.wait(running.id, running.version, timeout=2)
+    queued = scheduler.submit("t1", "b")
+
+    assert scheduler.cancel(queued.id).state == CANCELLED
+    scheduler.cancel(running.id)
+    while not scheduler.wait(running.id, running.version, timeout=2).done:
+        pass
+    assert running.state == CANCELLED
+    assert [repo for repo, _ in runner.started] == ["a"]
+    again = scheduler.submit("t1", "a")
+    assert again.id != running.id
+    scheduler.close()
+    assert again.state == CANCELLED
+
+
+def test_fair_across_tenants(runner):
+    runner.release.set()
+    order = []
+    done = threading.Event()
+
+    def record(job, report):
+        order.append(job.tenant)
+        if len(order) == 4:
+            done.set()
+
+    scheduler = IndexJobScheduler(record, max_concurrent=1, niceness=0)
+    gate = threading.Event()
+    scheduler.runner = lambda job, report: gate.wait(2)
+    blocker = scheduler.submit("t0", "blocker")
+    scheduler.wait(blocker.id, blocker.version, timeout=2)
+    scheduler.runner = record
+    for repo in ("a1", "a2", "a3"):
+        scheduler.submit("tenant-a", repo)
+    scheduler.submit("tenant-b", "b1")
+    gate.set()
+    assert done.wait(2)
+    scheduler.close()
+    assert order[:2] == ["tenant-a", "tenant-b"]
+
+
+def test_schedulers_sharing_a_state_dir_share_jobs_and_the_limit(runner, tmp_path):
+    a = IndexJobScheduler(runner, niceness=0, state_dir=tmp_path, poll_seconds=0.02)
+    b = IndexJobScheduler(runner, niceness=0, state_dir=tmp_path, poll_seconds=0.02)
+    first = a.submit("t1", "a")
+    a.wait(first.id, first.version, timeout=2)
+    second = b.submit("t1", "b")
+    third = b.submit("t1", "c")
+
+    assert b.get(first.id).state == RUNNING and b.submit("t1", "a").id == first.id
+    assert [j.id for j in a.list()] == [first.id, second.id, third.id]
+    assert a.get(second.id).state == QUEUED  # a holds the only slot
+    b.cancel(third.id)
+    assert a.cancel(third.id).state == CANCELLED
+    b.cancel(first.id)  # a notices the request
+    while not a.wait(first.id, first.version, timeout=2).done:
+        pass
+    assert first.state == CANCELLED
+
+    runner.release.set()
+    while not b.wait(second.id, second.version, timeout=2).done:
+        pass
+    assert a.get(second.id).state == SUCCEEDED
+    a.close()
+    b.close()
+
+
+def test_unfinished_jobs_of_an_exited_worker_fail(runner, tmp_path):
+    scheduler = IndexJobScheduler(runner, niceness=0, state_dir=tmp_path)
+    job = scheduler.submit("t1", "a")
+    scheduler.wait(job.id, job.version, timeout=2)
+    scheduler.store.close()  # as if the process died mid-job
+
+    left = JobStore(tmp_path, 1).load(job.id)
+    assert left.state == FAILED and left.error == "Index worker exited"
+    runner.release.set()
+    scheduler.close()
@@ -0,0 +1,60 @@
+# tests/unit/test_microbatch.py
+import asyncio
+
+import pytest
+
+from src.domain.microbatch import MicroBatcher
+
+
+def test_concurrent_submits_are_coalesced():
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return [t.upper() for t in texts]
+
+    async def run():
+        batcher = MicroBatcher(encode, max_batch_size=8, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(f"q{i}") for i in range(20)))
+        await batcher.close()
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+
+    assert results == [f"Q{i}" for i in range(20)]
+    assert all(len(c) <= 8 for c in calls)
+    assert len(calls) == 3
+    assert batcher.stats.as_dict()["items"] == 20
+
+
+def test_batch_failure_is_propagated_to_every_caller():
+    def encode(texts):
+        raise ValueError("model exploded")
+
+    async def run():
+        batcher = MicroBatcher(encode, max_batch_size=4, max_wait_ms=1)
+        results = await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+        )
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_single_request_is_not_held_past_max_wait():
+    async def run():
+        batcher = MicroBatcher(lambda xs: xs, max_batch_size=64, max_wait_ms=5)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await batcher.submit("only")
+        elapsed = loop.time() - started
+        await batcher.close()
+        return result, elapsed
+
+    result, elapsed = asyncio.run(run())
+
+    assert result == "only"
+    assert elapsed < 0.5
@@ -0,0 +1,70 @@
+# tests/unit/test_models.py
+import multiprocessing
+import threading
+
+import numpy as np
+
+from benchmarks.suite import StubModel
+from src.app.core.models import COLD, FAILED, LOADED, READY, ModelRegistry
+from src.domain.embeddings import EmbeddingManager
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, name):
+        self.calls.append(name)
+        return EmbeddingManager(name, model=StubModel(dim=8), store_dir=None)
+
+
+def test_loads_once_and_warms_up_outside_the_cache():
+    loader = CountingLoader()
+    registry = ModelRegistry(loader=loader, default="stub")
+    assert registry.state == COLD
+
+    threads = [threading.Thread(target=registry.get) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loader.calls == ["stub"] and registry.state == LOADED
+
+    registry.warm_up()
+    model = registry.get()
+    assert registry.ready and registry.warmup_seconds is not None
+    assert model.cache_stats()["misses"] == 0 and model.stats.texts == 0
+    assert registry.stats()["models"] == ["stub"] and not registry.inherited
+
+
+def test_failed_load_is_reported():
+    def broken(name):
+        raise OSError("no weights")
+
+    registry = ModelRegistry(loader=broken, default="missing")
+    registry.start().join()
+
+    assert registry.state == FAILED and "no weights" in registry.error
+
+
+def _child(registry, out):
+    registry.warm_up()
+    out.put((registry.inherited, registry.state, float(registry.get().encode("x")[0])))
+
+
+def test_preloaded_weights_are_inherited_by_forked_workers():
+    loader = CountingLoader()
+    registry = ModelRegistry(loader=loader, default="stub")
+    registry.preload()
+    expected = float(registry.get().encode("x")[0])
+
+    ctx = multiprocessing.get_context("fork")
+    out = ctx.Queue()
+    child = ctx.Process(target=_child, args=(registry, out))
+    child.start()
+    inherited, state, value = out.get(timeout=30)
+    child.join()
+
+    assert inherited and state == READY
+    assert np.isclose(value, expected)
+    assert loader.calls == ["stub"]
@@ -0,0 +1,240 @@
+# tests/unit/test_pipeline.py
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.domain.chunker import CodeChunker
+from src.domain import pipeline
+from src.domain.pipeline import Pipeline, PipelinedIndexingService
+from src.domain.services import IndexingCancelled, IndexingService
+from tests.helpers import COUNTER, FakeEmbedder, MemoryIndex
+
+
+class SlowEmbedder(FakeEmbedder):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.second_call = threading.Event()
+
+    def encode(self, texts):
+        if self.calls:
+            self.second_call.set()
+        time.sleep(self.delay)
+        return super().encode(texts)
+
+
+class SlowIndex(MemoryIndex):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def upsert(self, chunks):
+        time.sleep(self.delay)
+        super().upsert(chunks)
+
+
+def _repo(tmp_path: Path, n: int) -> list:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    files = []
+    for i in range(n):
+        path = repo / f"m{i}.py"
+        path.write_text(f"def f{i}():\n    return {i}\n", encoding="utf-8")
+        files.append(path)
+    return files
+
+
+def _pipelined(tmp_path: Path, embedder=None, index=None, **kwargs):
+    return PipelinedIndexingService(
+        CodeChunker(max_tokens=200, overlap=20, token_counter=COUNTER),
+        embedder or FakeEmbedder(),
+        index or MemoryIndex(),
+        manifest_path=tmp_path / "state" / "manifest.json",
+        **kwargs,
+    )
+
+
+def test_pipeline_runs_stages_concurrently():
+    out = []
+    sink_started = threading.Event()
+    overlapped = []
+
+    def source(emit):
+        for i in range(10):
+            emit(i)
+
+    def first(item, emit):
+        if item == 1:
+            # Only returns True if "b" runs item 0 while "a" is still on item 1
+            overlapped.append(sink_started.wait(timeout=5))
+        emit(item * 2)
+
+    def sink(item, emit):
+        sink_started.set()
+        out.append(item)
+
+    pipeline = Pipeline(queue_size=2).source("src", source).stage("a", first).stage("b", sink)
+    stats = pipeline.run()
+
+    assert sorted(out) == [i * 2 for i in range(10)]
+    assert overlapped == [True]
+    assert [s.items_in for s in stats.stages] == [0, 10, 10]
+    assert all(s.queue_max <= 2 for s in stats.stages)
+
+
+def test_pipeline_batches_and_reports_bottleneck():
+    batches = []
+
+    def source(emit):
+        for i in range(20):
+            emit(i)
+
+    def batched(items, emit):
+        time.sleep(0.02)
+        batches.append(list(items))
+
+    stats = (
+        Pipeline(queue_size=8)
+        .source("src", source)
+        .stage("cheap", lambda item, emit: emit(item), workers=2)
+        .stage("batch", batched, batch_size=8, max_wait=0.5)
+        .run()
+    )
+
+    assert sorted(i for b in batches for i in b) == list(range(20))
+    assert max(len(b) for b in batches) == 8
+    assert stats.bottleneck == "batch"
+    assert stats.as_dict()["stages"][2]["utilization"] > 0
+
+
+def test_pipeline_batches_by_item_size():
+    batches = []
+
+    def source(emit):
+        for n in [3, 3, 1, 5, 2]:
+            emit(list(range(n)))
+
+    stats = (
+        Pipeline()
+        .source("src", source)
+        .stage("batch", lambda items, emit: batches.append([len(i) for i in items]),
+               batch_size=4, max_wait=0.5, size=len)
+        .run()
+    )
+
+    assert batches == [[3, 3], [1, 5], [2]]
+    assert stats.stages[1].items_in == 14
+
+
+def test_pipeline_reraises_stage_errors():
+    def source(emit):
+        for i in range(1000):
+            emit(i)
+
+    def boom(item, emit):
+        if item == 3:
+            raise ValueError("bad item")
+
+    with pytest.raises(ValueError, match="bad item"):
+        Pipeline(queue_size=4).source("src", source).stage("boom", boom).run()
+
+
+def test_pipelined_service_matches_sequential(tmp_path: Path):
+    files = _repo(tmp_path, 12)
+    sequential_index = MemoryIndex()
+    IndexingService(
+        CodeChunker(max_tokens=200, overlap=20, token_counter=COUNTER),
+        FakeEmbedder(),
+        sequential_index,
+    ).index_files(files)
+
+    service = _pipelined(tmp_path, batch_size=4)
+    stats = service.index_files(files)
+
+    assert set(service.index.points) == set(sequential_index.points)
+    assert stats.files_changed == 12
+    assert stats.chunks_embedded == len(service.index.points)
+    assert all(c.embedding is not None for c in service.index.points.values())
+    assert [s.name for s in service.pipeline_stats.stages] == [
+        "walk", "read", "chunk", "embed", "upsert"
+    ]
+
+    files[0].write_text("def changed():\n    return 0\n", encoding="utf-8")
+    rerun = _pipelined(tmp_path, batch_size=4).index_files(files[:-1])
+    assert rerun.files_changed == 1
+    assert rerun.files_unchanged == 10
+    assert rerun.files_removed == 1
+    assert rerun.chunks_embedded == 1
+
+
+def test_pipelined_full_reindex_deletes_previous_chunks(tmp_path: Path):
+    files = _repo(tmp_path, 3)
+    service = _pipelined(tmp_path)
+    service.index_files(files)
+    old_ids = set(service.index.points)
+
+    files[0].write_text("def changed():\n    return 0\n", encoding="utf-8")
+    service.index_files(files, full=True)
+
+    current = set(service.index.points)
+    assert len(current) == 3 and len(old_ids - current) == 1
+
+
+def test_pipelined_service_chunks_in_processes(tmp_path: Path):
+    files = _repo(tmp_path, 6)
+    service = _pipelined(tmp_path, chunk_processes=2, symbols_path=tmp_path / "symbols.bin")
+
+    stats = service.index_files(files)
+
+    assert stats.files_changed == 6
+    assert len(service.index.points) == stats.chunks_embedded > 0
+    assert (tmp_path / "symbols.bin").exists()
+    in_thread = _pipelined(tmp_path / "in_thread")
+    in_thread.index_files(files)
+    assert set(service.index.points) == set(in_thread.index.points)
+
+
+def test_pool_chunker_uses_the_same_token_counter():
+    pipeline._init_chunker(50, 5, ("some/model", "/tmp/cache", False))
+
+    assert pipeline._chunker.max_tokens == 50 and pipeline._chunker.overlap == 5
+    tokens = pipeline._chunker.tokens
+    assert (tokens.model_name, tokens.cache_dir, tokens.use_tokenizer) == (
+        "some/model", "/tmp/cache", False
+    )
+
+
+def test_pipelined_service_overlaps_embedding_and_upsert(tmp_path: Path):
+    files = _repo(tmp_path, 16)
+    embedder, index = SlowEmbedder(0.04), SlowIndex(0.04)
+    overlapped = []
+
+    def upsert(chunks):
+        # Only returns True if the next batch is embedded while this one is upserted
+        if not index.points:
+            overlapped.append(embedder.second_call.wait(timeout=5))
+        SlowIndex.upsert(index, chunks)
+
+    index.upsert = upsert
+    service = _pipelined(tmp_path, embedder=embedder, index=index,
+                         batch_size=2, max_batch_wait=1.0)
+
+    service.index_files(files)
+
+    assert overlapped == [True]
+    stats = {s.name: s for s in service.pipeline_stats.stages}
+    assert stats["embed"].items_out == stats["upsert"].items_in == 8
+    assert service.pipeline_stats.bottleneck in {"embed", "upsert"}
+
+
+def test_pipelined_service_cancel(tmp_path: Path):
+    files = _repo(tmp_path, 3)
+    cancel = threading.Event()
+    cancel.set()
+    service = _pipelined(tmp_path)
+
+    with pytest.raises(IndexingCancelled):
+        service.index_files(files, cancel=cancel)
+    assert not (tmp_path / "state" / "manifest.json").exists()
@@ -0,0 +1,86 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.domain.entities import CodeChunk
+
+qdrant_index = pytest.importorskip("src.infra.qdrant_index")
+QdrantVectorIndex = qdrant_index.QdrantVectorIndex
+path_prefixes = qdrant_index.path_prefixes
+
+
+def make_chunk(i, path, language="python", dim=8):
+    rng = np.random.default_rng(i)
+    return CodeChunk(
+        id=f"chunk{i:04d}",
+        content=f"def f{i}(): pass",
+        file_path=path,
+        start_line=1,
+        end_line=1,
+        language=language,
+        embedding=rng.standard_normal(dim).astype(np.float32),
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = QdrantVectorIndex(
+        path=str(tmp_path / "qdrant"), collection_name="test", batch_size=16, workers=2
+    )
+    yield idx
+    idx.close()
+
+
+def test_path_prefixes():
+    assert path_prefixes("src/app/main.py") == ["src", "src/app", "src/app/main.py"]
+
+
+def test_bulk_upsert_search_delete(index):
+    chunks = [make_chunk(i, f"src/mod{i % 3}/f{i}.py") for i in range(100)]
+    chunks += [make_chunk(100 + i, f"web/app{i}.ts", "typescript") for i in range(20)]
+    index.upsert(chunks)
+    index.flush()
+    assert index.count() == 120
+    assert index.stats()["batches"] == 8
+
+    hits = index.search(chunks[5].embedding, k=3)
+    assert hits[0].id == "chunk0005"
+    assert hits[0].payload["file_path"] == "src/mod2/f5.py"
+
+    hits = index.search(chunks[5].embedding, k=50, language="typescript")
+    assert len(hits) == 20 and all(h.payload["language"] == "typescript" for h in hits)
+
+    hits = index.search(chunks[5].embedding, k=50, path_prefix="src/mod1/")
+    assert hits and all(h.payload["file_path"].startswith("src/mod1/") for h in hits)
+    hits = index.search(chunks[5].embedding, k=50, path_prefix="web/app1")
+    assert {h.payload["file_path"] for h in hits} == {"web/app1.ts"} | {
+        f"web/app{i}.ts" for i in range(10, 20)
+    }
+
+    index.upsert([make_chunk(5, "src/mod2/f5.py")])
+    index.flush()
+    assert index.count() == 120
+
+    index.delete([c.id for c in chunks[:50]] + ["missing"])
+    assert index.count() == 70
+    assert all(h.id not in {c.id for c in chunks[:50]} for h in index.search(chunks[5].embedding))
+
+
+def test_successive_upserts_overlap_until_flush(index):
+    release = threading.Event()
+    upsert = index.client.upsert
+
+    def slow_upsert(*args, **kwargs):
+        release.wait(timeout=5)
+        return upsert(*args, **kwargs)
+
+    index.client.upsert = slow_upsert
+    chunks = [make_chunk(i, f"src/f{i}.py") for i in range(64)]
+    for start in range(0, 64, 16):
+        index.upsert(chunks[start:start + 16])  # returns with its request still queued
+
+    assert index.stats()["batches"] == 4 and index.count() == 0
+    release.set()
+    index.delete([c.id for c in chunks[:16]])  # waits for the queued upserts first
+    assert index.count() == 48
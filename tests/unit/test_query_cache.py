@@ -0,0 +1,92 @@
+# tests/unit/test_query_cache.py
+from pathlib import Path
+
+import numpy as np
+
+from src.domain.entities import SearchHit
+from src.domain.query_cache import QueryResultCache, normalize_query
+from src.domain.search import SearchService
+from src.infra.numpy_index import NumpyVectorIndex
+from tests.helpers import CountingEmbedder, FixedIndex, random_chunks
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_exact_hits_ttl_lru_and_generation():
+    clock = Clock()
+    cache = QueryResultCache(max_entries=2, ttl_seconds=10, clock=clock)
+    assert normalize_query("  How do I   run tests?") == "how do i run tests"
+
+    cache.put("How do I run tests?", ["a"], {"language": "python"}, generation=1,
+              cost_seconds=0.5)
+    assert cache.get("how do i run   TESTS", {"language": "python"}, generation=1) == ["a"]
+    assert cache.get("how do i run tests", {"language": "go"}, generation=1) is None
+
+    cache.put("q2", ["b"], generation=1)
+    cache.put("q3", ["c"], generation=1)  # evicts the least recently used
+    assert cache.get("how do i run tests", {"language": "python"}, generation=1) is None
+    assert cache.get("q3", generation=1) == ["c"]
+
+    clock.now = 11
+    assert cache.get("q3", generation=1) is None  # expired
+    cache.put("q3", ["c"], generation=1)
+    assert cache.get("q3", generation=2) is None  # re-indexed
+    assert len(cache) == 0
+
+    stats = cache.stats.as_dict()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 4, 1)
+    assert (stats["expirations"], stats["invalidations"]) == (1, 1)
+    assert stats["saved_seconds"] == 0.5 and stats["hit_rate"] == 2 / 6
+
+
+def test_near_duplicate_queries_share_results():
+    cache = QueryResultCache(similarity_threshold=0.95)
+    base = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    cache.put("how to run the tests", ["hit"], generation=0, embedding=base)
+
+    assert cache.get("how can I run tests", generation=0) is None
+    near = np.array([1.0, 0.1, 0.0], dtype=np.float32)
+    assert cache.get("how can I run tests", generation=0, embedding=near) == ["hit"]
+    far = np.array([0.5, 1.0, 0.0], dtype=np.float32)
+    assert cache.get("deploying", generation=0, embedding=far) is None
+    assert (cache.stats.near_hits, cache.stats.misses) == (1, 1)
+
+
+def test_search_service_caches_until_the_index_changes():
+    embedder = CountingEmbedder()
+    index = FixedIndex([SearchHit("a", 0.9, {})])
+    service = SearchService(embedder, index, cache=QueryResultCache())
+
+    assert [h.id for h in service.search("how do I run tests?")] == ["a"]
+    assert [h.id for h in service.search("How do I run tests")] == ["a"]
+    assert embedder.calls == 1
+    assert service.search("how do I run tests", k=5) and embedder.calls == 2  # other k
+
+    index.generation += 1
+    service.search("how do I run tests?")
+    assert embedder.calls == 3
+    assert service.cache_stats()["hits"] == 1
+
+
+def test_cache_notices_a_reindex_by_another_process(tmp_path: Path):
+    chunks = random_chunks(20, dim=4)
+    writer = NumpyVectorIndex(tmp_path)
+    writer.upsert(chunks[:10])
+    # A second instance over the same files, as in another API worker
+    reader = NumpyVectorIndex(tmp_path, read_only=True, refresh_interval=0)
+    service = SearchService(CountingEmbedder(), reader, cache=QueryResultCache())
+
+    first = service.search("how do I run tests", k=20)
+    assert len(first) == 10
+    assert len(service.search("how do I run tests", k=20)) == 10  # served from the cache
+
+    writer.upsert(chunks[10:])
+
+    assert len(service.search("how do I run tests", k=20)) == 20
+    assert service.cache_stats()["invalidations"] == 1
@@ -0,0 +1,112 @@
+# tests/unit/test_search.py
+from pathlib import Path
+
+from src.domain.entities import CodeChunk, SearchHit
+from src.domain.search import SearchService, exact_identifiers, reciprocal_rank_fusion
+from src.infra.bm25_index import BM25Index, tokenize
+from tests.helpers import CountingEmbedder, FixedIndex
+
+
+def _chunk(chunk_id: str, content: str, path: str = "src/a.py", language: str = "python"):
+    return CodeChunk(
+        id=chunk_id, content=content, file_path=path, language=language,
+        start_line=1, end_line=content.count("\n") + 1,
+    )
+
+
+CHUNKS = [
+    _chunk("gen", "def _generate_chunk_id(file_path, start_line, content):\n    return md5"),
+    _chunk("use", "chunk_id = self._generate_chunk_id(path, 1, text)"),
+    _chunk("cfg", 'qdrant_path: str = Field(default="./qdrant_data", env="QDRANT_PATH")',
+           path="src/app/core/config.py"),
+    _chunk("ts", "export class HttpServer { parseRequestBody() {} }", "web/server.ts",
+           "typescript"),
+    _chunk("doc", "Generate an id for each chunk of the file", "README.md", "markdown"),
+]
+
+
+def test_tokenize_splits_identifiers_and_keeps_them_whole():
+    assert tokenize("_generate_chunk_id") == ["generate_chunk_id", "generate", "chunk", "id"]
+    assert tokenize("parseHTTPRequest") == ["parsehttprequest", "parse", "http", "request"]
+    assert tokenize("QDRANT_PATH = 1") == ["qdrant_path", "qdrant", "path", "1"]
+
+
+def test_bm25_ranks_exact_identifier_first_and_updates_incrementally(tmp_path: Path):
+    index = BM25Index()
+    index.add(CHUNKS)
+    hits = index.search("_generate_chunk_id", k=5)
+    assert {h.id for h in hits[:2]} == {"gen", "use"}
+    assert hits[-1].id == "doc"  # matches only the split words
+    assert index.search("request body", k=1)[0].id == "ts"
+    assert [h.id for h in index.search("chunk", language="markdown")] == ["doc"]
+    assert [h.id for h in index.search("qdrant", path_prefix="src/app/")] == ["cfg"]
+
+    index.add([_chunk("use", "nothing relevant here")])
+    assert index.count() == 5
+    assert [h.id for h in index.search("generate_chunk_id")] == ["gen", "doc"]
+
+    index.delete(["gen", "cfg", "missing"])  # passes compact_ratio: rows renumbered
+    assert index.count() == 3
+    assert index.search("QDRANT_PATH") == []
+    assert [h.id for h in index.search("HttpServer")] == ["ts"]
+
+    index.save(tmp_path / "bm25")
+    loaded = BM25Index.load(tmp_path / "bm25")
+    assert loaded.count() == 3
+    assert [h.id for h in loaded.search("HttpServer")] == ["ts"]
+    assert loaded.search("generate")[0].payload["file_path"] == "README.md"
+
+
+def test_bm25_reloads_generations_saved_by_another_process(tmp_path: Path):
+    a = BM25Index.load(tmp_path / "bm25")
+    b = BM25Index.load(tmp_path / "bm25")
+    a.add(CHUNKS[:2])
+    a.save()
+    b.refresh(force=True)
+    assert b.count() == 2
+
+    # b builds on a's save, so its own save keeps a's chunks
+    b.add(CHUNKS[2:])
+    b.save()
+    assert b.generation > 1 and a.count() == 2
+    a.refresh()  # throttled
+    assert a.count() == 2
+    a.refresh(force=True)
+    assert a.count() == len(CHUNKS)
+    assert a.generation == b.generation
+    assert len(list((tmp_path / "bm25").glob("gen-*"))) == 2
+
+    a.add([_chunk("new", "fresh words")])
+    b.save()
+    a.refresh(force=True)  # unsaved writes are not thrown away
+    assert a.search("fresh")[0].id == "new"
+
+
+def test_exact_identifiers():
+    assert exact_identifiers("where is `_generate_chunk_id` used") == ["_generate_chunk_id"]
+    assert exact_identifiers("QDRANT_PATH") == ["QDRANT_PATH"]
+    assert exact_identifiers("parseRequestBody()") == ["parseRequestBody"]
+    assert exact_identifiers("settings") == []
+    assert exact_identifiers("how are chunk ids generated") == []
+
+
+def test_rrf_rewards_agreement():
+    a = [SearchHit("x", 0.9), SearchHit("y", 0.8)]
+    b = [SearchHit("y", 3.0), SearchHit("z", 2.0)]
+    assert [h.id for h in reciprocal_rank_fusion([a, b], k=3)] == ["y", "x", "z"]
+
+
+def test_identifier_queries_skip_the_embedder():
+    lexical = BM25Index()
+    lexical.add(CHUNKS)
+    embedder = CountingEmbedder()
+    vector = FixedIndex([SearchHit("doc", 0.9, {}), SearchHit("ts", 0.8, {})])
+    service = SearchService(embedder, vector, lexical)
+
+    assert service.search("QDRANT_PATH", k=3)[0].id == "cfg"
+    assert service.search("where is `_generate_chunk_id` used")[0].id in {"gen", "use"}
+    assert embedder.calls == 0
+
+    hits = service.search("how is a chunk id generated", k=3)
+    assert embedder.calls == 1
+    assert hits[0].id == "doc"  # first in both rankings
@@ -0,0 +1,118 @@
+# tests/unit/test_symbols.py
+from pathlib import Path
+
+from src.domain.chunker import CodeChunker
+from src.domain.symbols import (
+    OpenSymbolTables,
+    SymbolTable,
+    SymbolTableBuilder,
+    extract_symbols,
+    parse_navigation,
+)
+from src.domain.tokens import TokenCounter
+
+PY = '''\
+import os
+
+
+class Store:
+    def load(self, path):
+        return os.path.exists(path)
+
+    def save(self):
+        return helper(self.load("x"))
+
+
+def helper(value):
+    return value
+'''
+
+GO = '''\
+package main
+
+type Server struct{}
+
+func (s *Server) Handle(r Request) error {
+    return parse(r)
+}
+
+func parse(r Request) error {
+    return nil
+}
+'''
+
+
+def _symbols(text: str, name: str):
+    chunker = CodeChunker(max_tokens=200, token_counter=TokenCounter(use_tokenizer=False))
+    chunks = chunker.chunk_text(text, Path(name))
+    return extract_symbols(text, chunks[0].language, name, chunks), chunks
+
+
+def test_extracts_python_and_go_symbols():
+    (defs, refs), chunks = _symbols(PY, "store.py")
+    assert [(d.name, d.kind, d.start_line, d.end_line) for d in defs] == [
+        ("Store", "class", 4, 9),
+        ("Store.load", "method", 5, 6),
+        ("Store.save", "method", 8, 9),
+        ("helper", "function", 12, 13),
+    ]
+    chunk_ids = {c.id for c in chunks}
+    assert all(d.chunk_id in chunk_ids for d in defs)
+    calls = {(r.name, r.caller) for r in refs if r.call}
+    assert calls == {("exists", "Store.load"), ("helper", "Store.save"), ("load", "Store.save")}
+
+    (defs, refs), _ = _symbols(GO, "server.go")
+    assert {d.name for d in defs} == {"Server", "Server.Handle", "parse"}
+    assert [(r.name, r.caller, r.line) for r in refs] == [("parse", "Server.Handle", 6)]
+
+
+def test_table_round_trip_and_incremental_update(tmp_path: Path):
+    path = tmp_path / "symbols.bin"
+    builder = SymbolTableBuilder()
+    builder.update("store.py", *_symbols(PY, "store.py")[0])
+    builder.update("server.go", *_symbols(GO, "server.go")[0])
+    builder.write(path)
+
+    table = SymbolTable(path)
+    assert [(d.file_path, d.start_line) for d in table.definitions("helper")] == [("store.py", 12)]
+    assert table.definitions("Store.save") == table.definitions("save")
+    assert table.definitions("missing") == []
+    assert table.callers("parse") == ["Server.Handle"]
+    assert {r.line for r in table.references("os")} == {6}
+    answer = table.navigate("who calls `helper`?")
+    assert answer["intent"] == "callers" and answer["results"][0]["caller"] == "Store.save"
+    assert table.navigate("how does saving work") is None
+
+    builder = SymbolTableBuilder.load(path)
+    table.close()
+    builder.remove("server.go")
+    builder.write(path)
+    table = SymbolTable(path)
+    assert table.definitions("parse") == [] and table.callers("helper") == ["Store.save"]
+    assert len(table.files()["store.py"][0]) == 4
+
+
+def test_open_tables_are_reused_until_the_file_is_replaced(tmp_path: Path):
+    builder = SymbolTableBuilder()
+    builder.update("store.py", *_symbols(PY, "store.py")[0])
+    builder.write(tmp_path / "a" / "symbols.bin")
+    tables = OpenSymbolTables(tmp_path)
+
+    first = tables()
+    assert tables() == first and len(first) == 1
+
+    builder.remove("store.py")
+    builder.write(tmp_path / "a" / "symbols.bin")
+    builder.write(tmp_path / "b" / "symbols.bin")
+    replaced = tables()
+    assert len(replaced) == 2 and replaced[0] is not first[0]
+    assert replaced[0].definitions("helper") == []
+    assert first[0].definitions("helper")  # still usable by a lookup in flight
+
+
+def test_parse_navigation():
+    assert parse_navigation("where is `_generate_chunk_id` defined") == (
+        "definitions", "_generate_chunk_id"
+    )
+    assert parse_navigation("Who calls chunk_text()?") == ("callers", "chunk_text")
+    assert parse_navigation("explain the chunker") is None
@@ -0,0 +1,66 @@
+# tests/unit/test_telemetry.py
+from pathlib import Path
+
+import pytest
+
+from src.app.core import telemetry
+from src.domain.chunker import CodeChunker
+from src.domain.search import SearchService
+from src.infra.bm25_index import BM25Index
+from tests.helpers import COUNTER, FakeEmbedder, MemoryIndex
+
+
+def test_registry_renders_prometheus_text():
+    registry = telemetry.Registry()
+    registry.counter("jobs_total", "Jobs run").inc(2, status='o"k')
+    latency = registry.histogram("op_seconds", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, op="read")
+    registry.register_gauges("cache", lambda: {"hits": 3, "hit_rate": 0.75, "name": "x"})
+
+    text = registry.render()
+
+    assert "# HELP jobs_total Jobs run\n# TYPE jobs_total counter" in text
+    assert 'jobs_total{status="o\\"k"} 2.0' in text
+    assert 'op_seconds_bucket{op="read",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{op="read",le="1.0"} 2' in text
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 3' in text
+    assert 'op_seconds_count{op="read"} 3' in text
+    assert "cache_hit_rate 0.75" in text and "cache_hits 3.0" in text
+    assert "cache_name" not in text
+    with pytest.raises(ValueError):
+        registry.histogram("jobs_total")
+
+
+def test_timed_is_free_when_disabled(monkeypatch):
+    def work():
+        return 42
+
+    monkeypatch.setattr(telemetry, "_enabled", False)
+    assert telemetry.timed("work_seconds")(work) is work
+    telemetry.count("never_total")
+    assert "never_total" not in telemetry.REGISTRY.render()
+
+    monkeypatch.setattr(telemetry, "_enabled", True)
+    wrapped = telemetry.timed("work_seconds", kind="unit")(work)
+    assert wrapped is not work and wrapped() == 42
+    assert telemetry.REGISTRY.histogram("work_seconds").count(kind="unit") == 1
+
+
+def test_hot_paths_are_instrumented(tmp_path: Path):
+    if not telemetry.enabled():
+        pytest.skip("metrics disabled")
+    path = tmp_path / "m.py"
+    path.write_text("def parse_token():\n    return 1\n", encoding="utf-8")
+    files = telemetry.REGISTRY.histogram("chunker_file_seconds")
+    searches = telemetry.REGISTRY.counter("search_queries_total")
+    before = files.count(), searches.value(route="lexical")
+
+    chunks = CodeChunker(max_tokens=200, overlap=20, token_counter=COUNTER).chunk_file(path)
+    lexical = BM25Index()
+    lexical.add(chunks)
+    SearchService(FakeEmbedder(), MemoryIndex(), lexical).search("parse_token")
+
+    assert files.count() == before[0] + 1
+    assert searches.value(route="lexical") == before[1] + 1
+    assert "lexical_search_seconds_count" in telemetry.REGISTRY.render()
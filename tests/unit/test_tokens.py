@@ -0,0 +1,33 @@
+# tests/unit/test_tokens.py
+from src.domain.tokens import TokenCounter, heuristic_count
+
+
+class CountingTokenizer:
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, texts, add_special_tokens=False):
+        self.seen.extend(texts)
+        return {"input_ids": [t.split() for t in texts]}
+
+
+def test_heuristic_splits_words_and_punctuation():
+    assert heuristic_count("def foo(a, b):") == 8
+
+
+def test_counts_are_cached_per_text():
+    counter = TokenCounter(use_tokenizer=False)
+    tokenizer = CountingTokenizer()
+    counter._tokenizer, counter._loaded = tokenizer, True
+
+    assert counter.count_many(["a b", "c", "a b"]) == [2, 1, 2]
+    assert counter.count("a b") == 2
+
+    assert tokenizer.seen == ["a b", "c"]
+
+
+def test_cache_is_bounded():
+    counter = TokenCounter(use_tokenizer=False, cache_size=2)
+    counter.count_many(["a", "b", "c"])
+
+    assert len(counter._cache) == 2
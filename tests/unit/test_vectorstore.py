@@ -0,0 +1,148 @@
+# tests/unit/test_vectorstore.py
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.infra.numpy_index import NumpyVectorIndex
+from tests.helpers import embedded_chunk, random_chunks
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_search_returns_exact_top_k(tmp_path: Path, dtype: str):
+    chunks = random_chunks(200)
+    index = NumpyVectorIndex(tmp_path, dtype=dtype)
+    index.upsert(chunks[:120])
+    index.upsert(chunks[120:])
+
+    query = chunks[7].embedding
+    hits = index.search(query, k=5)
+
+    matrix = np.stack([c.embedding / np.linalg.norm(c.embedding) for c in chunks])
+    expected = np.argsort(-(matrix @ (query / np.linalg.norm(query))))[:5]
+    assert [h.id for h in hits] == [f"c{i}" for i in expected]
+    assert hits[0].id == "c7" and hits[0].score == pytest.approx(1.0, abs=1e-2)
+    assert hits[0].to_chunk().content == "def f7(): pass"
+
+
+def test_filters_by_language_and_path_prefix(tmp_path: Path):
+    chunks = random_chunks(50)
+    index = NumpyVectorIndex(tmp_path)
+    index.upsert(chunks)
+
+    go_hits = index.search(chunks[1].embedding, k=50, language="go")
+    src_hits = index.search(chunks[1].embedding, k=50, path_prefix="src/")
+
+    assert len(go_hits) == 25 and all(h.payload["language"] == "go" for h in go_hits)
+    assert len(src_hits) == 25 and all(h.payload["file_path"].startswith("src/") for h in src_hits)
+    assert index.search(chunks[1].embedding, language="rust") == []
+
+
+def test_upsert_replaces_delete_compacts_and_readers_refresh(tmp_path: Path):
+    chunks = random_chunks(20)
+    writer = NumpyVectorIndex(tmp_path, compact_ratio=0.5)
+    writer.upsert(chunks)
+    reader = NumpyVectorIndex(tmp_path, read_only=True, refresh_interval=0)
+
+    replacement = embedded_chunk(3, chunks[4].embedding)
+    writer.upsert([replacement])
+    assert writer.count() == 20
+    assert writer.search(chunks[4].embedding, k=2)[1].id in {"c3", "c4"}
+
+    writer.delete([f"c{i}" for i in range(12)])
+    assert writer.count() == 8
+    assert (tmp_path / "vectors.bin").stat().st_size == 8 * 16 * 4  # compacted
+
+    reader.refresh(force=True)
+    assert reader.count() == 8
+    assert {h.id for h in reader.search(chunks[15].embedding, k=20)} == {
+        f"c{i}" for i in range(12, 20)
+    }
+    with pytest.raises(PermissionError):
+        reader.delete(["c15"])
+
+    reopened = NumpyVectorIndex(tmp_path)
+    assert reopened.count() == 8
+    assert reopened.search(chunks[15].embedding, k=1)[0].id == "c15"
+
+
+def test_concurrent_writes_and_searches_share_one_instance(tmp_path: Path):
+    chunks = random_chunks(400)
+    index = NumpyVectorIndex(tmp_path, refresh_interval=0, compact_ratio=0.2)
+    index.upsert(chunks[:50])
+    errors = []
+
+    def write():
+        for start in range(50, 400, 25):
+            index.upsert(chunks[start:start + 25])
+            index.delete([f"c{i}" for i in range(start - 50, start - 30)])
+
+    def search():
+        while writer.is_alive():
+            try:
+                for hit in index.search(chunks[0].embedding, k=5):
+                    assert hit.payload["content"] == f"def {hit.id.replace('c', 'f')}(): pass"
+            except Exception as e:  # surfaced below; pytest cannot see thread errors
+                errors.append(e)
+                return
+
+    writer = threading.Thread(target=write)
+    readers = [threading.Thread(target=search) for _ in range(3)]
+    writer.start()
+    for t in readers:
+        t.start()
+    writer.join()
+    for t in readers:
+        t.join()
+
+    assert errors == []
+    reopened = NumpyVectorIndex(tmp_path)
+    assert reopened.generation == index.generation
+    assert reopened.count() == index.count()
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_quantized_search_rescores_exactly(tmp_path: Path, quantization: str):
+    chunks = random_chunks(400, dim=64)
+    index = NumpyVectorIndex(tmp_path, quantization=quantization, compact_ratio=0.2)
+    index.upsert(chunks)
+    code_bytes = 64 if quantization == "int8" else 8
+    assert (tmp_path / "codes.bin").stat().st_size == 400 * code_bytes
+
+    hits = index.search(chunks[7].embedding, k=5)
+    exact = index.search(chunks[7].embedding, k=5, exact=True)
+    assert hits[0].id == "c7" and hits[0].score == pytest.approx(1.0, abs=1e-5)
+    # Scores of shortlisted rows come from the full-precision vectors
+    shared = {h.id: h.score for h in exact}
+    assert all(h.score == pytest.approx(shared[h.id]) for h in hits if h.id in shared)
+
+    rng = np.random.default_rng(1)
+    queries = np.stack([chunks[i].embedding for i in range(0, 400, 40)])
+    queries = queries + rng.normal(scale=0.3, size=queries.shape)
+    assert index.recall_at_k(queries, k=5) >= 0.8
+
+    index.delete([f"c{i}" for i in range(100)])
+    assert (tmp_path / "codes.bin").stat().st_size == 300 * code_bytes
+    reopened = NumpyVectorIndex(tmp_path, read_only=True, quantization=quantization)
+    assert reopened.search(chunks[150].embedding, k=1)[0].id == "c150"
+
+
+def test_reopening_with_another_quantization_requantizes(tmp_path: Path):
+    chunks = random_chunks(300, dim=64)
+    NumpyVectorIndex(tmp_path).upsert(chunks)
+    with pytest.raises(ValueError, match="quantization None"):
+        NumpyVectorIndex(tmp_path, read_only=True, quantization="int8")
+
+    index = NumpyVectorIndex(tmp_path, quantization="int8")
+    assert (tmp_path / "codes.bin").stat().st_size == 300 * 64
+    assert index.search(chunks[7].embedding, k=1)[0].id == "c7"
+    reader = NumpyVectorIndex(tmp_path, read_only=True, quantization="int8")
+    assert reader.search(chunks[8].embedding, k=1)[0].id == "c8"
+
+    index = NumpyVectorIndex(tmp_path, quantization="binary")
+    assert (tmp_path / "codes.bin").stat().st_size == 300 * 8
+    assert not (tmp_path / "scales.bin").exists()
+    index = NumpyVectorIndex(tmp_path)
+    assert not (tmp_path / "codes.bin").exists()
+    assert index.search(chunks[9].embedding, k=1)[0].id == "c9"
@@ -0,0 +1,86 @@
+# tests/unit/test_walker.py
+from pathlib import Path
+
+import pytest
+
+from src.cli.chunker_cli import iter_files
+from src.domain.walker import IgnoreFile, RepoWalker
+
+
+def _tree(root: Path, files: dict) -> None:
+    for name, data in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(data, bytes):
+            path.write_bytes(data)
+        else:
+            path.write_text(data, encoding="utf-8")
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    _tree(tmp_path, {
+        ".gitignore": "*.log\n/generated/\nsrc/**/fixtures\n!keep.log\n",
+        "main.py": "print(1)\n",
+        "keep.log": "not chunkable anyway\n",
+        "notes.txt": "plain text\n",
+        "node_modules/lib/index.js": "module.exports = 1\n",
+        "generated/api.py": "x = 1\n",
+        "src/app.py": "def app():\n    pass\n",
+        "src/deep/fixtures/sample.py": "x = 2\n",
+        "src/generated/kept.py": "x = 3\n",
+        "src/blob.json": b'{"a": 1}\x00\x01\x02',
+        "src/big.md": "#" * 5000,
+        "src/.ignore": "local_*.py\n",
+        "src/local_tmp.py": "x = 4\n",
+    })
+    return tmp_path
+
+
+def _rel(root: Path, paths) -> list:
+    return sorted(p.relative_to(root).as_posix() for p in paths)
+
+
+def test_walker_applies_ignores_extensions_size_and_binary(repo: Path):
+    walker = RepoWalker(ignore_patterns={"node_modules", ".git"}, max_file_bytes=4096)
+
+    files = _rel(repo, walker.walk(repo))
+
+    assert files == ["main.py", "src/app.py", "src/generated/kept.py"]
+    stats = walker.stats
+    assert stats.dirs_pruned == 3  # node_modules, generated, src/deep/fixtures
+    assert stats.skipped_binary == 1
+    assert stats.skipped_size == 1
+    assert stats.skipped_ignored == 1  # src/local_tmp.py via src/.ignore
+    assert stats.files_yielded == 3
+    assert stats.as_dict()["files_skipped"] == stats.files_scanned - 3
+
+
+def test_parallel_walk_finds_the_same_files(repo: Path):
+    serial = RepoWalker(ignore_patterns={"node_modules"}, max_file_bytes=4096)
+    parallel = RepoWalker(ignore_patterns={"node_modules"}, max_file_bytes=4096, workers=4)
+
+    assert _rel(repo, parallel.walk(repo)) == _rel(repo, serial.walk(repo))
+    assert parallel.stats.dirs_scanned == serial.stats.dirs_scanned
+
+
+def test_ignore_file_semantics():
+    ignore = IgnoreFile("pkg", ["build/", "*.tmp", "!important.tmp", "/top.py", "a/**/z"])
+
+    assert ignore.match("pkg/build", is_dir=True) is True
+    assert ignore.match("pkg/build", is_dir=False) is None
+    assert ignore.match("pkg/x/y.tmp", is_dir=False) is True
+    assert ignore.match("pkg/x/important.tmp", is_dir=False) is False
+    assert ignore.match("pkg/top.py", is_dir=False) is True
+    assert ignore.match("pkg/sub/top.py", is_dir=False) is None
+    assert ignore.match("pkg/a/b/c/z", is_dir=False) is True
+    assert ignore.match("other/x.tmp", is_dir=False) is None
+
+
+def test_cli_iter_files_uses_walker(repo: Path):
+    files = list(iter_files([repo, repo / "main.py"], recursive=True, exts={".py"}))
+
+    assert "node_modules/lib/index.js" not in _rel(repo, files)
+    assert _rel(repo, files) == ["main.py", "src/app.py", "src/generated/kept.py"]
+    top_level = list(iter_files([repo], recursive=False, exts={".py"}))
+    assert _rel(repo, top_level) == ["main.py"]